@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
-from accounts.models import User
+from accounts.models import AdminActionLog, User
+from accounts.admin_actions import BulkUpdateAction
 from django.contrib import admin
 from accounts.constants import (
     STATUS_INACTIVE_BOOL,
     STATUS_ACTIVE_BOOL,
+    USER_ADMIN_BACKGROUND_THRESHOLD,
     USER_ADMIN_STATUS_UNACTIVE_DESCRIPTION,
     USER_ADMIN_STATUS_ACTIVE_DESCRIPTION,
 )
@@ -56,16 +58,39 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ["username"]
     list_filter = ["is_staff", "is_active", "is_superuser"]
     ordering = ["id"]
-    actions = ["mark_inactive", "mark_active"]
+    actions = [
+        BulkUpdateAction(
+            "mark_inactive",
+            USER_ADMIN_STATUS_UNACTIVE_DESCRIPTION,
+            {"is_active": STATUS_INACTIVE_BOOL},
+            background_threshold=USER_ADMIN_BACKGROUND_THRESHOLD,
+        ),
+        BulkUpdateAction(
+            "mark_active",
+            USER_ADMIN_STATUS_ACTIVE_DESCRIPTION,
+            {"is_active": STATUS_ACTIVE_BOOL},
+            background_threshold=USER_ADMIN_BACKGROUND_THRESHOLD,
+        ),
+    ]
+
+
+@admin.register(AdminActionLog)
+class AdminActionLogAdmin(admin.ModelAdmin):
+    list_display = [
+        "run",
+        "action",
+        "content_type",
+        "batch",
+        "updated",
+        "progress",
+        "user",
+        "created",
+    ]
+    list_filter = ["action", "content_type"]
+    ordering = ["-id"]
 
-    @admin.action(description=USER_ADMIN_STATUS_UNACTIVE_DESCRIPTION)
-    def mark_inactive(self, request, queryset):
-        for instantce in queryset:
-            instantce.is_active = STATUS_INACTIVE_BOOL
-            instantce.save(update_fields=["is_active"])
+    def has_add_permission(self, request):
+        return False
 
-    @admin.action(description=USER_ADMIN_STATUS_ACTIVE_DESCRIPTION)
-    def mark_active(self, request, queryset):
-        for instantce in queryset:
-            instantce.is_active = STATUS_ACTIVE_BOOL
-            instantce.save(update_fields=["is_active"])
+    def has_change_permission(self, request, obj=None):
+        return False
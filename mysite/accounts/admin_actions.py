@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from django.contrib import messages
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, transaction
+from django.urls import reverse
+from django.utils.html import format_html
+
+from accounts.constants import (
+    ADMIN_ACTION_CHUNK_SIZE,
+    ADMIN_ACTION_DONE_MESSAGE,
+    ADMIN_ACTION_QUEUED_MESSAGE,
+)
+from accounts.models import AdminActionLog
+
+logger = logging.getLogger(__name__)
+
+BatchHook = Callable[[List[Any]], None]
+
+
+class BulkUpdateAction:
+    """
+    Admin action running a set-based UPDATE over the selected rows.
+
+    The selected primary keys are updated ``chunk_size`` at a time, each
+    chunk with one UPDATE in its own transaction together with the optional
+    ``before_batch``/``after_batch`` hooks and one AdminActionLog row. No
+    model is loaded or saved, so no ``save()`` or model signals run.
+
+    Selections larger than ``background_threshold`` run in a daemon thread
+    after the request's transaction commits, and the admin links to the
+    action log of the run for progress.
+
+    Usage::
+
+        actions = [
+            BulkUpdateAction(
+                "mark_inactive", "Mark Selected Items Unactive", {"is_active": False}
+            )
+        ]
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        values: Union[Dict[str, Any], Callable[[], Dict[str, Any]]],
+        chunk_size: int = ADMIN_ACTION_CHUNK_SIZE,
+        background_threshold: Optional[int] = None,
+        before_batch: Optional[BatchHook] = None,
+        after_batch: Optional[BatchHook] = None,
+    ):
+        self.__name__ = name
+        self.short_description = description
+        self.allowed_permissions = ("change",)
+        self.values = values
+        self.chunk_size = chunk_size
+        self.background_threshold = background_threshold
+        self.before_batch = before_batch
+        self.after_batch = after_batch
+
+    def __call__(self, modeladmin, request, queryset):
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True))
+        run = uuid.uuid4()
+        user_id = request.user.pk
+        model = queryset.model
+        if (
+            self.background_threshold is not None
+            and len(ids) > self.background_threshold
+        ):
+            thread = threading.Thread(
+                target=self.run_in_background,
+                args=(model, ids, run, user_id),
+                daemon=True,
+            )
+            transaction.on_commit(thread.start)
+            log_url = "%s?run=%s" % (
+                reverse("admin:accounts_adminactionlog_changelist"),
+                run,
+            )
+            modeladmin.message_user(
+                request,
+                format_html(
+                    '{} <a href="{}">Progress</a>',
+                    ADMIN_ACTION_QUEUED_MESSAGE.format(
+                        action=self.short_description, total=len(ids)
+                    ),
+                    log_url,
+                ),
+                messages.INFO,
+            )
+            return
+        updated, batches = self.execute(model, ids, run, user_id)
+        modeladmin.message_user(
+            request,
+            ADMIN_ACTION_DONE_MESSAGE.format(
+                action=self.short_description,
+                updated=updated,
+                total=len(ids),
+                batches=batches,
+            ),
+            messages.SUCCESS,
+        )
+
+    def execute(self, model, ids: List[Any], run: uuid.UUID, user_id=None):
+        """
+        Update ``ids`` chunk by chunk.
+
+        :return: Tuple of (updated rows, batches).
+        """
+        content_type = ContentType.objects.get_for_model(model)
+        updated = 0
+        batches = 0
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start : start + self.chunk_size]
+            values = self.values() if callable(self.values) else self.values
+            with transaction.atomic():
+                if self.before_batch:
+                    self.before_batch(chunk)
+                count = model._default_manager.filter(pk__in=chunk).update(**values)
+                if self.after_batch:
+                    self.after_batch(chunk)
+                batches += 1
+                updated += count
+                AdminActionLog.objects.create(
+                    run=run,
+                    action=self.__name__,
+                    content_type=content_type,
+                    user_id=user_id,
+                    batch=batches,
+                    first_id=chunk[0],
+                    last_id=chunk[-1],
+                    updated=count,
+                    processed=start + len(chunk),
+                    total=len(ids),
+                )
+        return updated, batches
+
+    def run_in_background(self, model, ids, run, user_id) -> None:
+        try:
+            self.execute(model, ids, run, user_id)
+        except Exception:
+            logger.exception("Admin action %s run %s failed", self.__name__, run)
+        finally:
+            connections.close_all()
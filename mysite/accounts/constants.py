@@ -11,6 +11,16 @@ USER_ADMIN_STATUS_ACTIVE_DESCRIPTION = "Mark Selected Items Active"
 QUESTION_TOTAL_VOTES_RESET_DESCRIPTION = "Mark Selected Items to Reset Total Votes"
 CHOICE_TOTAL_VOTES_RESET_DESCRIPTION = "Mark Selected Items to Reset Votes"
 
+ADMIN_ACTION_QUEUED_MESSAGE = "{action} is running in the background for {total} items."
+ADMIN_ACTION_DONE_MESSAGE = (
+    "{action} updated {updated} of {total} items in {batches} batches."
+)
+
+# Admin Actions
+
+ADMIN_ACTION_CHUNK_SIZE = 1000
+USER_ADMIN_BACKGROUND_THRESHOLD = 10_000
+
 # Validation Error
 LOGIN_ERROR = "Incorrect username or password."
 
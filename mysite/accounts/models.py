@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.contenttypes.models import ContentType
+from django_extensions.db.models import TimeStampedModel
 from phonenumber_field.modelfields import PhoneNumberField
 
 
@@ -12,3 +14,34 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+class AdminActionLog(TimeStampedModel):
+    """
+    Audit row written per batch of a set-based admin action, see
+    accounts.admin_actions.
+    """
+
+    run = models.UUIDField(db_index=True)
+    action = models.CharField(max_length=100)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="admin_action_logs",
+    )
+    batch = models.PositiveIntegerField()
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    updated = models.IntegerField()
+    processed = models.IntegerField()
+    total = models.IntegerField()
+
+    def __str__(self):
+        return "{action} Batch {batch}".format(action=self.action, batch=self.batch)
+
+    @property
+    def progress(self):
+        return "{0:.0%}".format(self.processed / self.total if self.total else 1)
@@ -1,4 +1,104 @@
 # -*- coding: utf-8 -*-
+import uuid
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts import urls
+from accounts.admin_actions import BulkUpdateAction
+from accounts.models import AdminActionLog, User
+from mysite.querybudget import QueryBudgetMixin
 
 # Create your tests here.
+
+
+class BulkUpdateActionTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="x")
+        self.users = [
+            User.objects.create_user(username="user%d" % index) for index in range(5)
+        ]
+
+    def test_chunks_are_updated_set_based_with_a_log_row_per_batch(self):
+        """
+        Each chunk costs one UPDATE and one audit row, whatever its size.
+        """
+        action = BulkUpdateAction(
+            "mark_inactive", "Mark Inactive", {"is_active": False}, chunk_size=2
+        )
+        ids = [user.id for user in self.users]
+        ContentType.objects.get_for_model(User)
+        # savepoint, UPDATE, audit INSERT and release per chunk
+        with self.assertNumQueries(3 * 4):
+            updated, batches = action.execute(User, ids, uuid.uuid4(), self.admin.id)
+        self.assertEqual((updated, batches), (5, 3))
+        self.assertFalse(User.objects.filter(id__in=ids, is_active=True).exists())
+        logs = AdminActionLog.objects.order_by("batch")
+        self.assertEqual([log.processed for log in logs], [2, 4, 5])
+        self.assertEqual(logs.last().progress, "100%")
+
+    def test_user_admin_mark_inactive(self):
+        """
+        The UserAdmin action updates the selection without per-row saves.
+        """
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("admin:accounts_user_changelist"),
+            {
+                "action": "mark_inactive",
+                "_selected_action": [user.id for user in self.users[:3]],
+            },
+            follow=True,
+        )
+        self.assertContains(response, "updated 3 of 3 items in 1 batches")
+        self.assertEqual(User.objects.filter(is_active=False).count(), 3)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "login": 2,
+        "signup": 2,
+        "logout": 4,
+        "profile": 3,
+        "password_change": 2,
+        "password_change_done": 2,
+        "password_reset": 2,
+        "password_reset_done": 2,
+        # the route has no <uidb64>/<token>, so the view raises
+        # ImproperlyConfigured before any query; it is not requested
+        "password_reset_confirm": 0,
+        "password_reset_complete": 2,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="reader")
+        self.client.force_login(self.user)
+
+    def budget_requests(self):
+        return [
+            (name, lambda name=name: self.client.get(reverse(name)))
+            for name in (
+                "login",
+                "signup",
+                "password_change",
+                "password_change_done",
+                "password_reset",
+                "password_reset_done",
+                "password_reset_complete",
+            )
+        ] + [
+            (
+                "profile",
+                lambda: self.client.get(reverse("profile", args=[self.user.pk])),
+            ),
+            ("logout", lambda: self.client.get(reverse("logout"))),
+        ]
+
+    def test_every_url_has_a_budget(self):
+        self.assertQueryBudgetsCover(urls.urlpatterns)
+
+    def test_views_stay_within_their_query_budget(self):
+        self.assertQueryBudgets()
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
 from django.contrib import admin
-from .models import TablespaceExample, Pizza, Topping, Restaurant, PdfFileModel
+from .models import (
+    TablespaceExample,
+    Pizza,
+    Topping,
+    Restaurant,
+    PdfFileModel,
+    OutboundEmail,
+)
 
 admin.site.register(TablespaceExample)
 admin.site.register(Pizza)
@@ -13,3 +20,12 @@ class PdfFileModelAdmin(admin.ModelAdmin):
     list_display = ["id", "title"]
     readonly_fields = ["id"]
     fieldsets = [("PDF Details", {"fields": ["id", "title", "pdf"]})]
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ["id", "subject", "status", "attempts", "latency", "created"]
+    list_filter = ["status"]
+    search_fields = ["subject"]
+    exclude = ["attachment"]
+    readonly_fields = ["batch", "claim", "sent", "send_seconds", "latency"]
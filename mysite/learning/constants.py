@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Uploads
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_PARTIAL_DIR = "uploads/partial"
+UPLOAD_PDF_DIR = "pdfs"
+UPLOAD_SESSION_MAX_AGE = 24 * 60 * 60
+# Largest file a resumable upload may declare, in bytes
+UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+UPLOAD_CONTENT_RANGE_ERROR = "Send a Content-Range: bytes start-end/size header"
+UPLOAD_OFFSET_ERROR = "Upload is at offset {offset}"
+UPLOAD_STORAGE_ERROR = "Resumable uploads need a storage with local paths"
+UPLOAD_SUCCESS_MESSAGE = "Uploaded {title}"
+UPLOAD_DEDUPLICATED_MESSAGE = "Uploaded {title}, the same file was already stored"
+
+# Upload Metrics
+
+UPLOAD_METRICS_KEY = "learning:upload-metrics:{name}"
+UPLOAD_METRICS = ["uploads", "bytes", "microseconds", "chunks", "deduplicated"]
+
+# Outbound Mail Queue
+
+MAIL_PENDING = "pending"
+MAIL_SENDING = "sending"
+MAIL_SENT = "sent"
+MAIL_FAILED = "failed"
+MAIL_STATUS_CHOICES = [
+    (MAIL_PENDING, "Pending"),
+    (MAIL_SENDING, "Sending"),
+    (MAIL_SENT, "Sent"),
+    (MAIL_FAILED, "Failed"),
+]
+MAIL_RECIPIENT_BATCH_SIZE = 50
+MAIL_CLAIM_BATCH_SIZE = 100
+MAIL_CLAIM_TIMEOUT = 10 * 60
+MAIL_MAX_ATTEMPTS = 5
+MAIL_RETRY_DELAY = 30
+MAIL_RETRY_MAX_DELAY = 60 * 60
+MAIL_POLL_INTERVAL = 5.0
+MAIL_QUEUED_MESSAGE = "Mail Queued for {count} Recipients"
+MAIL_RECIPIENT_ERROR = "{address} is not a valid email address"
+
+# Access Control
+
+ACCESS_PUBLIC = "public"
+ACCESS_LOGIN = "login"
+ACCESS_LOGIN_REDIRECT = "/learn/http"
+ACCESS_LOGIN_MESSAGE = "Please Login to View This Page"
+ACCESS_DECISION_CACHE_SIZE = 4096
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 from django import forms
+from django.core.validators import validate_email
+
+from learning.constants import MAIL_RECIPIENT_ERROR, UPLOAD_MAX_SIZE
 
 
 class UploadFileForm(forms.Form):
@@ -35,3 +38,24 @@ class SendEmail(forms.Form):
         required=False,
         widget=forms.FileInput(attrs={"class": "form-control", "accepts": "image"}),
     )
+
+    def clean_receiver(self):
+        receivers = [
+            address.strip()
+            for address in self.cleaned_data["receiver"].split(",")
+            if address.strip()
+        ]
+        for address in receivers:
+            try:
+                validate_email(address)
+            except forms.ValidationError:
+                raise forms.ValidationError(
+                    MAIL_RECIPIENT_ERROR.format(address=address)
+                )
+        return receivers
+
+
+class UploadSessionForm(forms.Form):
+    title = forms.CharField(max_length=255)
+    filename = forms.CharField(max_length=255)
+    size = forms.IntegerField(min_value=1, max_value=UPLOAD_MAX_SIZE)
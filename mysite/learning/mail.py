@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import datetime
+import logging
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from learning.constants import (
+    MAIL_CLAIM_BATCH_SIZE,
+    MAIL_CLAIM_TIMEOUT,
+    MAIL_FAILED,
+    MAIL_MAX_ATTEMPTS,
+    MAIL_PENDING,
+    MAIL_POLL_INTERVAL,
+    MAIL_RECIPIENT_BATCH_SIZE,
+    MAIL_RETRY_DELAY,
+    MAIL_RETRY_MAX_DELAY,
+    MAIL_SENDING,
+    MAIL_SENT,
+)
+from learning.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# (file name, content, mimetype)
+Attachment = Tuple[str, bytes, str]
+
+
+def enqueue_email(
+    subject: str,
+    body: str,
+    from_email: str,
+    recipients: Iterable[str],
+    html_body: str = "",
+    attachment: Optional[Attachment] = None,
+    batch_size: int = MAIL_RECIPIENT_BATCH_SIZE,
+) -> List[OutboundEmail]:
+    """
+    Queue an email for the mail queue worker.
+
+    The recipients are split in batches of ``batch_size``, each sent as its
+    own message, and duplicate addresses are dropped.
+
+    :return: List of the queued OutboundEmail, one per batch.
+    """
+    recipients = list(dict.fromkeys(recipients))
+    batch = uuid.uuid4()
+    name, content, mimetype = attachment or ("", None, "")
+    return OutboundEmail.objects.bulk_create(
+        [
+            OutboundEmail(
+                batch=batch,
+                subject=subject,
+                from_email=from_email,
+                to=recipients[start : start + batch_size],
+                body=body,
+                html_body=html_body,
+                attachment_name=name,
+                attachment_type=mimetype or "",
+                attachment=content,
+            )
+            for start in range(0, len(recipients), batch_size)
+        ]
+    )
+
+
+def retry_delay(attempts: int) -> int:
+    """
+    Seconds before the next attempt, doubling after every failed one.
+    """
+    return min(MAIL_RETRY_DELAY * 2 ** (attempts - 1), MAIL_RETRY_MAX_DELAY)
+
+
+def claim_messages(limit: int = MAIL_CLAIM_BATCH_SIZE) -> List[OutboundEmail]:
+    """
+    Claim up to ``limit`` due messages, oldest first.
+
+    Messages are claimed with a conditional UPDATE, so concurrent workers
+    never send the same message. Messages left ``sending`` by a worker that
+    died are claimed again after ``MAIL_CLAIM_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    due = Q(status=MAIL_PENDING, next_attempt__lte=now) | Q(
+        status=MAIL_SENDING,
+        modified__lt=now - datetime.timedelta(seconds=MAIL_CLAIM_TIMEOUT),
+    )
+    ids = list(
+        OutboundEmail.objects.filter(due)
+        .order_by("next_attempt", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    claim = uuid.uuid4()
+    OutboundEmail.objects.filter(due, id__in=ids).update(
+        status=MAIL_SENDING, claim=claim, modified=now
+    )
+    return list(
+        OutboundEmail.objects.filter(claim=claim).order_by("next_attempt", "id")
+    )
+
+
+def build_email(message: OutboundEmail, connection) -> EmailMultiAlternatives:
+    email = EmailMultiAlternatives(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email,
+        to=message.to,
+        connection=connection,
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, "text/html")
+    if message.attachment is not None:
+        email.attach(
+            message.attachment_name,
+            bytes(message.attachment),
+            message.attachment_type or None,
+        )
+    return email
+
+
+class MailQueueWorker:
+    """
+    Sends queued mail over one connection from ``get_connection()``.
+
+    The connection is opened for the first message and reused for every
+    following one until the queue is empty; a failed send closes it, so the
+    next message starts on a fresh connection. Failed messages are retried
+    with exponential backoff and marked failed after ``MAIL_MAX_ATTEMPTS``.
+    Delivery is at least once: a worker dying between sending a message and
+    recording it sends it again after the claim timeout.
+    """
+
+    def __init__(self, connection=None, batch_size: int = MAIL_CLAIM_BATCH_SIZE):
+        self.connection = connection or get_connection()
+        self.batch_size = batch_size
+        self.opened = False
+
+    def run_once(self) -> Tuple[int, int]:
+        """
+        Send due messages until none is left.
+
+        :return: Tuple of (sent messages, failed attempts).
+        """
+        sent = failed = 0
+        try:
+            while True:
+                messages = claim_messages(self.batch_size)
+                if not messages:
+                    break
+                for message in messages:
+                    if self.send(message):
+                        sent += 1
+                    else:
+                        failed += 1
+        finally:
+            self.close()
+        return sent, failed
+
+    def run(self, interval: float = MAIL_POLL_INTERVAL) -> None:
+        while True:
+            self.run_once()
+            time.sleep(interval)
+
+    def send(self, message: OutboundEmail) -> bool:
+        email = build_email(message, self.connection)
+        started = time.perf_counter()
+        try:
+            if not self.opened:
+                self.connection.open()
+                self.opened = True
+            self.connection.send_messages([email])
+        except Exception as error:
+            self.close()
+            self.failed(message, error)
+            return False
+        self.delivered(message, time.perf_counter() - started)
+        return True
+
+    def delivered(self, message: OutboundEmail, seconds: float) -> None:
+        now = timezone.now()
+        latency = (now - message.created).total_seconds()
+        OutboundEmail.objects.filter(pk=message.pk, claim=message.claim).update(
+            status=MAIL_SENT,
+            attempts=message.attempts + 1,
+            sent=now,
+            send_seconds=seconds,
+            latency=latency,
+            last_error="",
+            attachment=None,
+            modified=now,
+        )
+        logger.info(
+            "Sent mail %s to %d recipients in %.3fs, %.3fs after queueing",
+            message.pk,
+            len(message.to),
+            seconds,
+            latency,
+            extra={"mail": message.pk, "seconds": seconds, "latency": latency},
+        )
+
+    def failed(self, message: OutboundEmail, error: Exception) -> None:
+        now = timezone.now()
+        attempts = message.attempts + 1
+        status = MAIL_FAILED if attempts >= MAIL_MAX_ATTEMPTS else MAIL_PENDING
+        OutboundEmail.objects.filter(pk=message.pk, claim=message.claim).update(
+            status=status,
+            attempts=attempts,
+            next_attempt=now + datetime.timedelta(seconds=retry_delay(attempts)),
+            last_error=repr(error),
+            claim=None,
+            modified=now,
+        )
+        logger.warning(
+            "Sending mail %s failed (attempt %d): %r", message.pk, attempts, error
+        )
+
+    def close(self) -> None:
+        if self.opened:
+            self.opened = False
+            try:
+                self.connection.close()
+            except Exception:
+                logger.exception("Closing the mail connection failed")
+
+
+def queue_stats() -> Dict[str, object]:
+    """
+    Messages per status, with the average and worst latency of sent ones.
+    """
+    stats: Dict[str, object] = {status: 0 for status in (MAIL_PENDING, MAIL_SENDING)}
+    stats.update(
+        OutboundEmail.objects.order_by()
+        .values_list("status")
+        .annotate(count=Count("id"))
+    )
+    stats.update(
+        OutboundEmail.objects.filter(status=MAIL_SENT).aggregate(
+            average_latency=Avg("latency"), max_latency=Max("latency")
+        )
+    )
+    return stats
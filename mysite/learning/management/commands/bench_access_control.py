@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.base import BaseHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+ACCESS_CONTROL = "learning.middleware.AccessControlMiddleware"
+CHECK_AFTER_VIEW = "learning.middleware.simple_middleware"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time anonymous requests through the full middleware stack, checking "
+        "access after the view (simple_middleware) and before it "
+        "(AccessControlMiddleware)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10_000,
+            help="Seed sample questions up to this many",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per path"
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Clear the cache before every request, so no cached page is served",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Path to request, /polls/ by default",
+        )
+
+    def handle(self, *args, **options):
+        if options["rows"]:
+            call_command("seed_polls", questions=options["rows"], stdout=self.stdout)
+        paths = options["paths"] or ["/polls/"]
+        before = [name for name in settings.MIDDLEWARE if name != ACCESS_CONTROL]
+        before.insert(
+            before.index("mysite.middleware.StampedeUpdateCacheMiddleware"),
+            CHECK_AFTER_VIEW,
+        )
+        # outside INTERNAL_IPS, so the debug toolbar stays out of the timings
+        factory = RequestFactory(SERVER_NAME="localhost", REMOTE_ADDR="10.0.0.1")
+        for label, middleware in (
+            ("after view", before),
+            ("before view", settings.MIDDLEWARE),
+        ):
+            with override_settings(MIDDLEWARE=middleware):
+                handler = BaseHandler()
+                handler.load_middleware()
+            for path in paths:
+                self.report(
+                    label, handler, factory, path, options["requests"], options["cold"]
+                )
+
+    def report(self, label, handler, factory, path, requests, cold):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        handler.get_response(factory.get(path))
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            for _ in range(requests):
+                if cold:
+                    cache.clear()
+                response = handler.get_response(factory.get(path))
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "%-11s %-24s %8.2f ms/request %6.1f queries/request  -> %d"
+            % (
+                label,
+                path,
+                elapsed * 1000 / requests,
+                len(queries) / requests,
+                response.status_code,
+            )
+        )
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from learning.constants import UPLOAD_SESSION_MAX_AGE
+from learning.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete idle resumable upload sessions and abandoned partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=UPLOAD_SESSION_MAX_AGE,
+            help="Seconds an upload may be idle before it is deleted.",
+        )
+
+    def handle(self, *args, **options):
+        sessions, files = expire_uploads(options["max_age"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Deleted %d upload sessions and %d partial files" % (sessions, files)
+            )
+        )
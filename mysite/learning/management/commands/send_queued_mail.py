@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from learning.constants import MAIL_CLAIM_BATCH_SIZE, MAIL_POLL_INTERVAL
+from learning.mail import MailQueueWorker, queue_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the queued outbound mail over one reused connection, once or "
+        "polling the queue with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling the queue."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=MAIL_POLL_INTERVAL,
+            help="Seconds between polls with --loop.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=MAIL_CLAIM_BATCH_SIZE,
+            help="Messages claimed at a time.",
+        )
+
+    def handle(self, *args, **options):
+        worker = MailQueueWorker(batch_size=options["batch_size"])
+        if options["loop"]:
+            worker.run(options["interval"])
+            return
+        sent, failed = worker.run_once()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Sent %d messages, %d failed attempts; queue %s"
+                % (sent, failed, queue_stats())
+            )
+        )
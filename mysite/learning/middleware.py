@@ -1,7 +1,20 @@
 # -*- coding: utf-8 -*-
+import functools
+import re
+from typing import List, Tuple
+
+from django.conf import settings
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from learning.constants import (
+    ACCESS_DECISION_CACHE_SIZE,
+    ACCESS_LOGIN,
+    ACCESS_LOGIN_MESSAGE,
+    ACCESS_LOGIN_REDIRECT,
+    ACCESS_PUBLIC,
+)
+
 
 def simple_middleware(get_response):
     # One-time configuration and initialization.
@@ -37,3 +50,56 @@ class SimpleMiddleware:
         # the view is called.
 
         return response
+
+
+def access_rules() -> List[Tuple[str, str]]:
+    """
+    The ``ACCESS_CONTROL_RULES`` setting, after the static and media url
+    prefixes, which are always public.
+    """
+    rules = []
+    for url in (settings.STATIC_URL, settings.MEDIA_URL):
+        # absolute urls are served by another host
+        if url and "://" not in url:
+            rules.append(("/" + url.lstrip("/"), ACCESS_PUBLIC))
+    return rules + list(getattr(settings, "ACCESS_CONTROL_RULES", []))
+
+
+class AccessControlMiddleware:
+    """
+    Checks access to a path before the view runs.
+
+    ``ACCESS_CONTROL_RULES`` maps path prefixes to ``"public"`` or
+    ``"login"``; the longest matching prefix wins and unmatched paths are
+    public. The prefixes are compiled into one regular expression at
+    startup and the rule of every path is cached, so a request costs one
+    dictionary lookup. Only paths needing a login read the session and
+    user; anonymous requests to them are redirected without running the
+    view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        rules = sorted(access_rules(), key=lambda rule: len(rule[0]), reverse=True)
+        self.rules = [rule for _, rule in rules]
+        self.pattern = re.compile(
+            "|".join("(%s)" % re.escape(prefix) for prefix, _ in rules) or "(?!)"
+        )
+        self.rule_for_path = functools.lru_cache(maxsize=ACCESS_DECISION_CACHE_SIZE)(
+            self.match_rule
+        )
+
+    def match_rule(self, path: str) -> str:
+        match = self.pattern.match(path)
+        if match is None:
+            return ACCESS_PUBLIC
+        return self.rules[match.lastindex - 1]
+
+    def __call__(self, request):
+        if (
+            self.rule_for_path(request.path_info) == ACCESS_LOGIN
+            and not request.user.is_authenticated
+        ):
+            messages.info(request, ACCESS_LOGIN_MESSAGE)
+            return redirect(ACCESS_LOGIN_REDIRECT)
+        return self.get_response(request)
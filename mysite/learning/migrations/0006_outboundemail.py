@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 12:05
+
+import django.utils.timezone
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning", "0005_pdffilemodel_sha256_uploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                ("batch", models.UUIDField(db_index=True)),
+                ("subject", models.CharField(max_length=255)),
+                ("from_email", models.CharField(max_length=254)),
+                ("to", models.JSONField(default=list)),
+                ("body", models.TextField(blank=True)),
+                ("html_body", models.TextField(blank=True)),
+                ("attachment_name", models.CharField(blank=True, max_length=255)),
+                ("attachment_type", models.CharField(blank=True, max_length=255)),
+                ("attachment", models.BinaryField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sending", "Sending"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("claim", models.UUIDField(blank=True, db_index=True, null=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("sent", models.DateTimeField(blank=True, null=True)),
+                ("send_seconds", models.FloatField(blank=True, null=True)),
+                (
+                    "latency",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Seconds from queueing to delivery",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt"],
+                        name="learning_ou_status_6ebfef_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
+import uuid
+
 from django.db import models
-from django_extensions.db.models import TitleDescriptionModel
+from django.utils import timezone
+from django_extensions.db.models import TitleDescriptionModel, TimeStampedModel
+
+from learning.constants import MAIL_PENDING, MAIL_STATUS_CHOICES
 
 
 # Create your models here.
@@ -42,6 +47,66 @@ class Restaurant(models.Model):
 
 class PdfFileModel(TitleDescriptionModel):
     pdf = models.FileField(upload_to="pdfs")
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    size = models.BigIntegerField(null=True, blank=True)
 
     def __str__(self):
         return "{title} Pdf".format(title=self.title)
+
+
+class UploadSession(TimeStampedModel):
+    """
+    A resumable upload: the client PUTs ``Content-Range`` chunks and
+    ``received`` bytes are written so far.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    pdf = models.ForeignKey(
+        PdfFileModel, null=True, blank=True, on_delete=models.SET_NULL
+    )
+
+    def __str__(self):
+        return "{title} ({received}/{size})".format(
+            title=self.title, received=self.received, size=self.size
+        )
+
+
+class OutboundEmail(TimeStampedModel):
+    """
+    A queued email to one batch of recipients, sent by the mail queue worker
+    (see learning.mail).
+    """
+
+    batch = models.UUIDField(db_index=True)
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    attachment_name = models.CharField(max_length=255, blank=True)
+    attachment_type = models.CharField(max_length=255, blank=True)
+    attachment = models.BinaryField(null=True, blank=True)
+    status = models.CharField(
+        max_length=10, choices=MAIL_STATUS_CHOICES, default=MAIL_PENDING
+    )
+    claim = models.UUIDField(null=True, blank=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent = models.DateTimeField(null=True, blank=True)
+    send_seconds = models.FloatField(null=True, blank=True)
+    latency = models.FloatField(
+        null=True, blank=True, help_text="Seconds from queueing to delivery"
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt"])]
+
+    def __str__(self):
+        return "{subject} to {count} ({status})".format(
+            subject=self.subject, count=len(self.to), status=self.status
+        )
@@ -1,3 +1,464 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
+import datetime
+import hashlib
+import io
+import shutil
+import smtplib
+import tempfile
+import unittest
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from learning.constants import (
+    MAIL_FAILED,
+    MAIL_MAX_ATTEMPTS,
+    MAIL_PENDING,
+    MAIL_SENDING,
+    MAIL_SENT,
+    UPLOAD_MAX_SIZE,
+)
+from learning.mail import MailQueueWorker, claim_messages, enqueue_email
+from learning.middleware import AccessControlMiddleware
+from accounts.models import User
+from learning import urls
+from learning.models import OutboundEmail, PdfFileModel, Pizza, Topping, UploadSession
+from learning.uploads import (
+    StreamedUploadedFile,
+    StreamingUploadHandler,
+    expire_uploads,
+    get_upload_metrics,
+    pdf_storage,
+    receive_chunk,
+)
+from mysite.querybudget import QueryBudgetMixin
+
+
+class UploadTests(TestCase):
+    databases = {"default", "sqlite"}
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+        self.content = b"%PDF-1.4 " + b"x" * 3000
+        self.client.force_login(User.objects.create_user(username="uploader"))
+
+    def upload(self, content=None, title="Guide"):
+        return self.client.post(
+            reverse("file-form"),
+            {
+                "title": title,
+                "file": SimpleUploadedFile("Guide.PDF", content or self.content),
+            },
+        )
+
+    def test_handler_streams_and_hashes_chunks(self):
+        handler = StreamingUploadHandler()
+        handler.chunk_size = 1024
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file("file", "guide.pdf", "application/pdf", None)
+        for start in range(0, len(self.content), 1024):
+            self.assertIsNone(
+                handler.receive_data_chunk(self.content[start : start + 1024], start)
+            )
+        upload = handler.file_complete(len(self.content))
+        self.assertIsInstance(upload, StreamedUploadedFile)
+        self.assertEqual(upload.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(pdf_storage().open(upload.storage_name).read(), self.content)
+        upload.discard()
+        self.assertFalse(pdf_storage().exists(upload.storage_name))
+
+    def test_file_form_stores_content_once(self):
+        response = self.upload()
+        pdf = PdfFileModel.objects.get()
+        self.assertRedirects(response, reverse("pdf-detail", args=[pdf.pk]))
+        self.assertEqual(pdf.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(pdf.size, len(self.content))
+        self.assertTrue(pdf.pdf.name.endswith("%s.pdf" % pdf.sha256))
+        self.assertEqual(pdf.pdf.read(), self.content)
+
+        self.upload(title="Same Guide")
+        copy = PdfFileModel.objects.exclude(pk=pdf.pk).get()
+        self.assertEqual(copy.pdf.name, pdf.pdf.name)
+        self.assertEqual(pdf_storage().listdir("uploads/partial")[1], [])
+        metrics = get_upload_metrics()
+        self.assertEqual(metrics["uploads"], 2)
+        self.assertEqual(metrics["deduplicated"], 1)
+        self.assertEqual(metrics["bytes"], 2 * len(self.content))
+
+    def test_invalid_form_discards_streamed_file(self):
+        response = self.client.post(
+            reverse("file-form"),
+            {"title": "", "file": SimpleUploadedFile("guide.pdf", self.content)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(PdfFileModel.objects.exists())
+        self.assertEqual(pdf_storage().listdir("uploads/partial")[1], [])
+
+    def put_chunk(self, url, start, end, total=None):
+        return self.client.put(
+            url,
+            self.content[start : end + 1],
+            content_type="application/octet-stream",
+            headers={
+                "content-range": "bytes %d-%d/%d"
+                % (start, end, total or len(self.content))
+            },
+        )
+
+    def test_resumable_upload(self):
+        response = self.client.post(
+            reverse("upload-sessions"),
+            {"title": "Guide", "filename": "guide.pdf", "size": len(self.content)},
+        )
+        self.assertEqual(response.status_code, 201)
+        url = response.json()["url"]
+
+        response = self.put_chunk(url, 0, 999)
+        self.assertEqual(response.json()["offset"], 1000)
+        # a retried or out of order chunk is refused with the offset to resume
+        response = self.put_chunk(url, 500, 1499)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 1000)
+        self.assertEqual(self.put_chunk(url, 1000, 1999, total=5).status_code, 400)
+        self.assertEqual(self.client.get(url).json()["offset"], 1000)
+
+        response = self.put_chunk(url, 1000, len(self.content) - 1)
+        self.assertEqual(response.status_code, 201)
+        pdf = PdfFileModel.objects.get(pk=response.json()["pdf"])
+        self.assertEqual(pdf.pdf.read(), self.content)
+        self.assertEqual(pdf.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(UploadSession.objects.get().pdf, pdf)
+        self.assertEqual(get_upload_metrics()["chunks"], 2)
+
+    def test_interrupted_chunk_keeps_received_bytes(self):
+        session = UploadSession.objects.create(
+            title="Guide", filename="guide.pdf", size=len(self.content)
+        )
+        # the client disconnected after 700 of 1000 bytes
+        receive_chunk(session, 0, 1000, io.BytesIO(self.content[:700]))
+        self.assertEqual(UploadSession.objects.get().received, 700)
+        response = self.put_chunk(
+            reverse("upload-session", args=[session.pk]), 700, len(self.content) - 1
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(PdfFileModel.objects.get().pdf.read(), self.content)
+
+    def test_resumable_upload_access_and_size(self):
+        session = UploadSession.objects.create(
+            title="Guide", filename="guide.pdf", size=len(self.content)
+        )
+        response = self.client.post(
+            reverse("upload-sessions"),
+            {"title": "Guide", "filename": "guide.pdf", "size": UPLOAD_MAX_SIZE + 1},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("size", response.json()["errors"])
+        # the metrics are staff only, the upload endpoints need a login
+        response = self.client.get(reverse("upload-metrics"))
+        self.assertEqual(response.status_code, 302)
+        self.client.logout()
+        response = self.client.post(
+            reverse("upload-sessions"),
+            {"title": "Guide", "filename": "guide.pdf", "size": 10},
+        )
+        self.assertEqual(response.status_code, 302)
+        url = reverse("upload-session", args=[session.pk])
+        self.assertEqual(self.put_chunk(url, 0, 999).status_code, 302)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+        self.assertEqual(UploadSession.objects.count(), 1)
+
+    def test_expire_uploads(self):
+        UploadSession.objects.create(title="Guide", filename="guide.pdf", size=10)
+        pdf_storage().save("uploads/partial/stale.part", io.BytesIO(b"x"))
+        self.assertEqual(expire_uploads(max_age=-1), (1, 1))
+        self.assertFalse(UploadSession.objects.exists())
+
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+class CountingBackend(EmailBackend):
+    """
+    locmem backend counting opened connections, failing while ``failures``
+    is positive.
+    """
+
+    opened = 0
+    failures = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+
+    def send_messages(self, messages):
+        if CountingBackend.failures:
+            CountingBackend.failures -= 1
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        return super().send_messages(messages)
+
+
+class MailQueueTests(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+        CountingBackend.failures = 0
+
+    def worker(self):
+        return MailQueueWorker(connection=CountingBackend())
+
+    def test_enqueue_batches_recipients(self):
+        recipients = ["user%d@example.com" % number for number in range(5)]
+        queued = enqueue_email(
+            "Subject",
+            "Body",
+            "sender@example.com",
+            recipients + recipients[:2],
+            batch_size=2,
+        )
+        self.assertEqual([message.to for message in queued][-1], recipients[4:])
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+        self.assertEqual(len({message.batch for message in queued}), 1)
+
+    def test_view_queues_without_sending(self):
+        response = self.client.post(
+            reverse("send_email"),
+            {
+                "subject": "Hello",
+                "sender": "sender@example.com",
+                "receiver": "a@example.com, b@example.com,",
+                "attachment": SimpleUploadedFile("photo.jpeg", b"jpeg", "image/jpeg"),
+            },
+        )
+        self.assertRedirects(
+            response, "/learn/send_email", fetch_redirect_response=False
+        )
+        self.assertEqual(mail.outbox, [])
+        message = OutboundEmail.objects.get()
+        self.assertEqual(message.to, ["a@example.com", "b@example.com"])
+        self.assertEqual(bytes(message.attachment), b"jpeg")
+
+        self.assertEqual(self.worker().run_once(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ["a@example.com", "b@example.com"])
+        self.assertEqual(mail.outbox[0].attachments[0][:2], ("photo.jpeg", b"jpeg"))
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+
+    def test_invalid_receiver(self):
+        response = self.client.post(
+            reverse("send_email"),
+            {
+                "subject": "Hello",
+                "sender": "sender@example.com",
+                "receiver": "a@example.com, not-an-address",
+            },
+        )
+        self.assertContains(response, "not-an-address is not a valid email address")
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_worker_reuses_connection_and_records_latency(self):
+        for number in range(3):
+            enqueue_email("Subject", "Body", "sender@example.com", ["a@example.com"])
+        self.assertEqual(self.worker().run_once(), (3, 0))
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        for message in OutboundEmail.objects.all():
+            self.assertEqual(message.status, MAIL_SENT)
+            self.assertIsNotNone(message.latency)
+            self.assertIsNotNone(message.send_seconds)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        enqueue_email("Subject", "Body", "sender@example.com", ["a@example.com"])
+        CountingBackend.failures = 1
+        self.assertEqual(self.worker().run_once(), (0, 1))
+        message = OutboundEmail.objects.get()
+        self.assertEqual(message.status, MAIL_PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt, timezone.now())
+        self.assertIn("SMTPServerDisconnected", message.last_error)
+        # not due yet
+        self.assertEqual(self.worker().run_once(), (0, 0))
+
+        OutboundEmail.objects.update(next_attempt=timezone.now())
+        self.assertEqual(self.worker().run_once(), (1, 0))
+        self.assertEqual(OutboundEmail.objects.get().status, MAIL_SENT)
+
+    def test_message_fails_after_max_attempts(self):
+        enqueue_email("Subject", "Body", "sender@example.com", ["a@example.com"])
+        OutboundEmail.objects.update(attempts=MAIL_MAX_ATTEMPTS - 1)
+        CountingBackend.failures = 1
+        self.worker().run_once()
+        self.assertEqual(OutboundEmail.objects.get().status, MAIL_FAILED)
+
+    def test_claimed_messages_are_not_claimed_twice(self):
+        enqueue_email("Subject", "Body", "sender@example.com", ["a@example.com"])
+        self.assertEqual(len(claim_messages()), 1)
+        self.assertEqual(claim_messages(), [])
+        # a worker that died holding the claim
+        OutboundEmail.objects.update(
+            modified=timezone.now() - datetime.timedelta(hours=1)
+        )
+        self.assertEqual(claim_messages()[0].status, MAIL_SENDING)
+
+    @unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+    def test_smtp_delivery(self):
+        from aiosmtpd.handlers import Sink
+
+        class Recorder(Sink):
+            envelopes = []
+
+            async def handle_DATA(self, server, session, envelope):
+                self.envelopes.append(envelope)
+                return "250 OK"
+
+        handler = Recorder()
+        controller = Controller(handler, hostname="127.0.0.1", port=0)
+        controller.start()
+        self.addCleanup(controller.stop)
+        for number in range(3):
+            enqueue_email("Subject", "Body", "sender@example.com", ["a@example.com"])
+        with self.settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=controller.server.sockets[0].getsockname()[1],
+            EMAIL_USE_SSL=False,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        ):
+            self.assertEqual(MailQueueWorker().run_once(), (3, 0))
+        self.assertEqual(len(handler.envelopes), 3)
+
+
+class AccessControlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_request_skips_the_view(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("index"))
+        self.assertRedirects(response, "/learn/http", fetch_redirect_response=False)
+
+    def test_authenticated_request_reaches_the_view(self):
+        from accounts.models import User
+
+        self.client.force_login(User.objects.create_user(username="reader"))
+        self.assertEqual(self.client.get(reverse("index")).status_code, 200)
+
+    @override_settings(
+        ACCESS_CONTROL_RULES=[("/polls/", "login"), ("/polls/public/", "public")]
+    )
+    def test_longest_prefix_wins_and_static_skips_the_user(self):
+        middleware = AccessControlMiddleware(lambda request: HttpResponse())
+        self.assertEqual(middleware.rule_for_path("/polls/1/"), "login")
+        self.assertEqual(middleware.rule_for_path("/polls/public/1"), "public")
+        self.assertEqual(middleware.rule_for_path("/learn/http/"), "public")
+
+        class Unreadable:
+            @property
+            def is_authenticated(self):
+                raise AssertionError("user loaded for a public path")
+
+        for path in ("/static/css/site.css", "/media/pdfs/a.pdf"):
+            request = RequestFactory().get(path)
+            request.user = Unreadable()
+            self.assertEqual(middleware(request).status_code, 200)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    databases = {"default", "sqlite"}
+    query_budgets = {
+        "send_email": 2,
+        "request-object": 2,
+        "redirect-view": 0,
+        "file-form": 2,
+        "upload-sessions": 3,
+        "upload-metrics": 2,
+        "upload-session": 3,
+        "pizza-add": 4,
+        "pizza-list": 2,
+        "pizza-details": 2,
+        "pdf-detail": 3,
+        "pdf-lists": 3,
+        "pizza-delete": 2,
+    }
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+        toppings = [Topping.objects.create(name=name) for name in "ABCD"]
+        for number in range(4):
+            self.pizza = Pizza.objects.create(name="Pizza %d" % number)
+            self.pizza.toppings.set(toppings)
+        for number in range(4):
+            self.pdf = PdfFileModel.objects.create(
+                title="Guide %d" % number, pdf="pdfs/guide%d.pdf" % number
+            )
+        self.session = UploadSession.objects.create(
+            title="Guide", filename="guide.pdf", size=10
+        )
+        self.client.force_login(User.objects.create_superuser(username="admin"))
+
+    def budget_requests(self):
+        upload = SimpleUploadedFile("Guide.pdf", b"%PDF-1.4 guide")
+        return [
+            ("send_email", lambda: self.client.get(reverse("send_email"))),
+            ("request-object", lambda: self.client.get(reverse("request-object"))),
+            ("redirect-view", lambda: self.client.get(reverse("redirect-view"))),
+            (
+                "file-form",
+                lambda: self.client.post(
+                    reverse("file-form"), {"title": "Guide", "file": upload}
+                ),
+            ),
+            (
+                "upload-sessions",
+                lambda: self.client.post(
+                    reverse("upload-sessions"),
+                    {"title": "Guide", "filename": "guide.pdf", "size": 10},
+                ),
+            ),
+            ("upload-metrics", lambda: self.client.get(reverse("upload-metrics"))),
+            (
+                "upload-session",
+                lambda: self.client.get(
+                    reverse("upload-session", args=[self.session.pk])
+                ),
+            ),
+            ("pizza-add", lambda: self.client.get(reverse("pizza-add"))),
+            ("pizza-list", lambda: self.client.get(reverse("pizza-list"))),
+            (
+                "pizza-details",
+                lambda: self.client.get(reverse("pizza-details", args=[self.pizza.pk])),
+            ),
+            (
+                "pdf-detail",
+                lambda: self.client.get(reverse("pdf-detail", args=[self.pdf.pk])),
+            ),
+            ("pdf-lists", lambda: self.client.get(reverse("pdf-lists"))),
+            (
+                "pizza-delete",
+                lambda: self.client.get(reverse("pizza-delete", args=[self.pizza.pk])),
+            ),
+        ]
+
+    def test_every_url_has_a_budget(self):
+        self.assertQueryBudgetsCover(urls.urlpatterns)
+
+    def test_views_stay_within_their_query_budget(self):
+        self.assertQueryBudgets()
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.utils import timezone
+
+from learning.constants import (
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_METRICS,
+    UPLOAD_METRICS_KEY,
+    UPLOAD_PARTIAL_DIR,
+    UPLOAD_PDF_DIR,
+    UPLOAD_SESSION_MAX_AGE,
+)
+from learning.models import PdfFileModel, UploadSession
+
+logger = logging.getLogger(__name__)
+
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+def pdf_storage():
+    return PdfFileModel._meta.get_field("pdf").storage
+
+
+def has_local_paths(storage) -> bool:
+    try:
+        storage.path("")
+    except NotImplementedError:
+        return False
+    return True
+
+
+def partial_name(key) -> str:
+    return "%s/%s.part" % (UPLOAD_PARTIAL_DIR, key)
+
+
+def content_name(sha256: str, filename: str) -> str:
+    """
+    Content addressed storage name, so equal files share one name.
+    """
+    extension = os.path.splitext(filename)[1][:10].lower()
+    return "%s/%s/%s%s" % (UPLOAD_PDF_DIR, sha256[:2], sha256, extension)
+
+
+class PartialFile:
+    """
+    A file written straight into its storage location from ``offset`` on,
+    counting the bytes written.
+    """
+
+    def __init__(self, storage, name: str, offset: int = 0):
+        self.storage = storage
+        self.name = name
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "r+b" if offset else "wb")
+        self.file.seek(offset)
+        self.written = 0
+        self.started = time.perf_counter()
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.written += len(data)
+
+    def close(self) -> float:
+        """
+        Drop bytes left past the written ones by an earlier attempt and close
+        the file.
+
+        :return: Seconds since the file was opened.
+        """
+        self.file.truncate()
+        self.file.close()
+        return time.perf_counter() - self.started
+
+    def discard(self) -> None:
+        self.file.close()
+        self.storage.delete(self.name)
+
+
+class StreamedUploadedFile(UploadedFile):
+    """
+    An upload StreamingUploadHandler already wrote to ``storage_name``, with
+    the ``sha256`` of its content.
+    """
+
+    def __init__(
+        self,
+        storage,
+        storage_name,
+        sha256,
+        seconds,
+        name,
+        content_type,
+        size,
+        charset,
+        content_type_extra=None,
+    ):
+        super().__init__(
+            open(storage.path(storage_name), "rb"),
+            name,
+            content_type,
+            size,
+            charset,
+            content_type_extra,
+        )
+        self.storage = storage
+        self.storage_name = storage_name
+        self.sha256 = sha256
+        self.seconds = seconds
+
+    def discard(self) -> None:
+        self.close()
+        self.storage.delete(self.storage_name)
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    """
+    Upload handler writing files straight into the storage of
+    ``PdfFileModel.pdf`` and hashing them as they arrive.
+
+    Django's default handlers keep the file in memory or spool it to a
+    temporary file that is copied into storage afterwards; here every chunk
+    is written once, to storage, so memory stays at one chunk whatever the
+    file size. Storages without local paths are left to the default
+    handlers after this one.
+    """
+
+    chunk_size = UPLOAD_CHUNK_SIZE
+
+    def __init__(self, request=None, storage=None):
+        super().__init__(request)
+        self.storage = storage or pdf_storage()
+        self.partial = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if not has_local_paths(self.storage):
+            return
+        self.partial = PartialFile(self.storage, partial_name(uuid.uuid4()))
+        self.hasher = hashlib.sha256()
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.partial is None:
+            return raw_data
+        self.partial.write(raw_data)
+        self.hasher.update(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.partial is None:
+            return None
+        partial, self.partial = self.partial, None
+        seconds = partial.close()
+        return StreamedUploadedFile(
+            storage=self.storage,
+            storage_name=partial.name,
+            sha256=self.hasher.hexdigest(),
+            seconds=seconds,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if self.partial is not None:
+            self.partial.discard()
+            self.partial = None
+
+
+def stored_copy(storage, sha256: str) -> Optional[str]:
+    """
+    Return the storage name of a stored file with this content, if any.
+    """
+    name = (
+        PdfFileModel.objects.filter(sha256=sha256)
+        .exclude(pdf="")
+        .values_list("pdf", flat=True)
+        .first()
+    )
+    return name if name and storage.exists(name) else None
+
+
+def store_pdf(
+    title: str, storage_name: str, sha256: str, size: int, filename: str
+) -> Tuple[PdfFileModel, bool]:
+    """
+    Move a completely written partial file to its content addressed name and
+    create its PdfFileModel.
+
+    Content already in storage is not stored twice: the partial file is
+    dropped and the new row points to the stored file.
+
+    :return: Tuple of (PdfFileModel, whether the content was already stored).
+    """
+    storage = pdf_storage()
+    name = stored_copy(storage, sha256)
+    deduplicated = name is not None
+    if deduplicated:
+        storage.delete(storage_name)
+    else:
+        name = content_name(sha256, filename)
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # same file system, so a rename rather than a copy
+        os.replace(storage.path(storage_name), path)
+    pdf = PdfFileModel.objects.create(title=title, pdf=name, sha256=sha256, size=size)
+    return pdf, deduplicated
+
+
+def save_upload(title: str, upload: UploadedFile) -> Tuple[PdfFileModel, bool]:
+    """
+    Store an uploaded file as a PdfFileModel.
+
+    :param title: Title of the pdf.
+    :param upload: File from request.FILES, streamed to storage by
+        StreamingUploadHandler or read by one of Django's handlers.
+    :return: Tuple of (PdfFileModel, whether the content was already stored).
+    """
+    if isinstance(upload, StreamedUploadedFile):
+        upload.close()
+        pdf, deduplicated = store_pdf(
+            title, upload.storage_name, upload.sha256, upload.size, upload.name
+        )
+        record_metrics(
+            uploads=1,
+            bytes=upload.size,
+            microseconds=int(upload.seconds * 1e6),
+            deduplicated=int(deduplicated),
+        )
+        log_throughput(pdf, upload.size, upload.seconds)
+        return pdf, deduplicated
+    started = time.perf_counter()
+    hasher = hashlib.sha256()
+    for chunk in upload.chunks(UPLOAD_CHUNK_SIZE):
+        hasher.update(chunk)
+    sha256 = hasher.hexdigest()
+    storage = pdf_storage()
+    name = stored_copy(storage, sha256)
+    deduplicated = name is not None
+    if not deduplicated:
+        name = storage.save(content_name(sha256, upload.name), upload)
+    pdf = PdfFileModel.objects.create(
+        title=title, pdf=name, sha256=sha256, size=upload.size
+    )
+    seconds = time.perf_counter() - started
+    record_metrics(
+        uploads=1,
+        bytes=upload.size,
+        microseconds=int(seconds * 1e6),
+        deduplicated=int(deduplicated),
+    )
+    log_throughput(pdf, upload.size, seconds)
+    return pdf, deduplicated
+
+
+def receive_chunk(session: UploadSession, start: int, length: int, stream) -> int:
+    """
+    Write ``length`` bytes of ``stream`` at ``start`` of the session's
+    partial file, ``UPLOAD_CHUNK_SIZE`` bytes at a time.
+
+    The bytes written before a client disconnects are kept, and the next
+    chunk resumes right after them.
+
+    :param session: The upload, at offset ``start``.
+    :param stream: The request, or any file-like object.
+    :return: The new offset of the session.
+    """
+    partial = PartialFile(pdf_storage(), partial_name(session.pk), start)
+    try:
+        remaining = length
+        while remaining:
+            data = stream.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            partial.write(data)
+            remaining -= len(data)
+    finally:
+        seconds = partial.close()
+        offset = start + partial.written
+        # a concurrent request for the same offset only moves it once
+        UploadSession.objects.filter(pk=session.pk, received=start).update(
+            received=offset, modified=timezone.now()
+        )
+        record_metrics(bytes=partial.written, microseconds=int(seconds * 1e6), chunks=1)
+    session.received = offset
+    return offset
+
+
+def complete_session(session: UploadSession) -> Tuple[PdfFileModel, bool]:
+    """
+    Hash the completely received file of a session and store it as a
+    PdfFileModel.
+
+    Chunks can arrive in separate requests and processes, so the hash is
+    taken in one sequential read of the file here.
+    """
+    storage = pdf_storage()
+    name = partial_name(session.pk)
+    hasher = hashlib.sha256()
+    with storage.open(name, "rb") as file:
+        for chunk in iter(lambda: file.read(UPLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    pdf, deduplicated = store_pdf(
+        session.title, name, hasher.hexdigest(), session.size, session.filename
+    )
+    UploadSession.objects.filter(pk=session.pk).update(pdf=pdf)
+    session.pdf = pdf
+    record_metrics(uploads=1, deduplicated=int(deduplicated))
+    return pdf, deduplicated
+
+
+def expire_uploads(max_age: int = UPLOAD_SESSION_MAX_AGE) -> Tuple[int, int]:
+    """
+    Delete upload sessions idle for ``max_age`` seconds and partial files
+    as old, e.g. of abandoned uploads.
+
+    :return: Tuple of (deleted sessions, deleted partial files).
+    """
+    cutoff = timezone.now() - timezone.timedelta(seconds=max_age)
+    sessions, _ = UploadSession.objects.filter(modified__lt=cutoff).delete()
+    storage = pdf_storage()
+    files = 0
+    if storage.exists(UPLOAD_PARTIAL_DIR):
+        for filename in storage.listdir(UPLOAD_PARTIAL_DIR)[1]:
+            name = "%s/%s" % (UPLOAD_PARTIAL_DIR, filename)
+            if storage.get_modified_time(name) < cutoff:
+                storage.delete(name)
+                files += 1
+    return sessions, files
+
+
+def record_metrics(**counts: int) -> None:
+    for name, value in counts.items():
+        key = UPLOAD_METRICS_KEY.format(name=name)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            # evicted between add() and incr()
+            cache.set(key, value, None)
+
+
+def get_upload_metrics() -> Dict[str, float]:
+    """
+    Upload counters since the cache was cleared, with the throughput of the
+    time spent receiving files.
+    """
+    keys = {UPLOAD_METRICS_KEY.format(name=name): name for name in UPLOAD_METRICS}
+    values = cache.get_many(keys)
+    metrics = {name: values.get(key, 0) for key, name in keys.items()}
+    seconds = metrics.pop("microseconds") / 1e6
+    metrics["seconds"] = round(seconds, 3)
+    metrics["bytes_per_second"] = round(metrics["bytes"] / seconds) if seconds else 0
+    return metrics
+
+
+def log_throughput(pdf: PdfFileModel, size: int, seconds: float) -> None:
+    logger.info(
+        "Uploaded pdf %s, %d bytes in %.3fs",
+        pdf.pk,
+        size,
+        seconds,
+        extra={"pdf": pdf.pk, "bytes": size, "seconds": seconds},
+    )
@@ -4,8 +4,6 @@ from django.urls import include, path
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
 from mysite.settings import MEDIA_ROOT, MEDIA_URL
-from debug_toolbar.toolbar import debug_toolbar_urls
-from schema_graph.views import Schema
 from . import views
 from django.views.decorators.cache import cache_page
 
@@ -18,6 +16,9 @@ urlpatterns = [
     path("redirect_view/", views.redirect_view, name="redirect-view"),
     path("file_form/", views.file_form, name="file-form"),
     path("redirect_view/", views.redirect_view, name="redirect-view"),
+    path("uploads", views.upload_sessions, name="upload-sessions"),
+    path("uploads/metrics", views.upload_metrics, name="upload-metrics"),
+    path("uploads/<uuid:pk>", views.upload_session, name="upload-session"),
     path("pizaa_add", views.CreatePizzaView.as_view(), name="pizza-add"),
     path("pizza_list", views.PizzaList.as_view(), name="pizza-list"),
     path("pizaa_details", views.PizzaDetails.as_view(), name="pizza-details"),
@@ -6,7 +6,12 @@ from django.http import (
     HttpResponseNotFound,
     HttpResponseNotModified,
     HttpResponseRedirect,
+    JsonResponse,
 )
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_http_methods, require_POST
 from django.views.generic import (
     RedirectView,
     ListView,
@@ -20,8 +25,29 @@ from django.urls import reverse
 from django.shortcuts import render, redirect, get_object_or_404
 import datetime
 from django.contrib import messages
-from .forms import UploadFileForm, SendEmail
-from .models import Pizza, PdfFileModel
+from .constants import (
+    MAIL_QUEUED_MESSAGE,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_CONTENT_RANGE_ERROR,
+    UPLOAD_DEDUPLICATED_MESSAGE,
+    UPLOAD_OFFSET_ERROR,
+    UPLOAD_STORAGE_ERROR,
+    UPLOAD_SUCCESS_MESSAGE,
+)
+from .forms import UploadFileForm, SendEmail, UploadSessionForm
+from .mail import enqueue_email
+from .models import Pizza, PdfFileModel, UploadSession
+from .uploads import (
+    CONTENT_RANGE,
+    StreamedUploadedFile,
+    StreamingUploadHandler,
+    complete_session,
+    get_upload_metrics,
+    has_local_paths,
+    pdf_storage,
+    receive_chunk,
+    save_upload,
+)
 from django.contrib.messages.views import SuccessMessageMixin
 
 
@@ -64,25 +90,127 @@ def redirect_view(request):
     return HttpResponseNotAllowed(permitted_methods=["POST"])
 
 
-def handle_uploaded_file(f):
+def handle_uploaded_file(f, title):
+    """
+    store an uploaded file as a PdfFileModel, once per distinct content
 
-    with open("new", "wb") as destination:
-        print(destination)
-        for chunk in f.chunks():
-            destination.write(chunk)
+    :param f: the uploaded file
+    :param title: title of the pdf
+    :return: Tuple of (PdfFileModel, whether the content was already stored)
+    """
+    return save_upload(title, f)
 
 
+@csrf_exempt
 def file_form(request):
+    """
+    upload a pdf, streamed into storage while the request is read
+
+    the upload handlers have to be set before the csrf check reads the body
+    """
+    request.upload_handlers.insert(0, StreamingUploadHandler(request))
+    return _file_form(request)
+
+
+@csrf_protect
+def _file_form(request):
     if request.method == "POST":
         form = UploadFileForm(request.POST, request.FILES)
         if form.is_valid():
-            handle_uploaded_file(request.FILES["file"])
-            return HttpResponseRedirect("/learn/file_form/")
+            title = form.cleaned_data["title"]
+            pdf, deduplicated = handle_uploaded_file(request.FILES["file"], title)
+            message = (
+                UPLOAD_DEDUPLICATED_MESSAGE if deduplicated else UPLOAD_SUCCESS_MESSAGE
+            )
+            messages.info(request, message.format(title=title))
+            return HttpResponseRedirect(reverse("pdf-detail", args=[pdf.pk]))
+        for upload in request.FILES.values():
+            if isinstance(upload, StreamedUploadedFile):
+                upload.discard()
     else:
         form = UploadFileForm()
     return render(request, "upload.html", {"form": form})
 
 
+def upload_session_data(session: UploadSession) -> dict:
+    return {
+        "id": str(session.pk),
+        "url": reverse("upload-session", args=[session.pk]),
+        "offset": session.received,
+        "size": session.size,
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+        "pdf": session.pdf_id,
+        "pdf_url": (
+            reverse("pdf-detail", args=[session.pdf_id]) if session.pdf_id else None
+        ),
+    }
+
+
+@login_required
+@require_POST
+def upload_sessions(request) -> JsonResponse:
+    """
+    start a resumable upload of at most UPLOAD_MAX_SIZE bytes, its chunks
+    are then sent to the returned url
+
+    :param request: title, filename and size of the file
+    :return: JsonResponse
+    """
+    form = UploadSessionForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    if not has_local_paths(pdf_storage()):
+        return JsonResponse({"error": UPLOAD_STORAGE_ERROR}, status=501)
+    session = UploadSession.objects.create(**form.cleaned_data)
+    return JsonResponse(upload_session_data(session), status=201)
+
+
+@login_required
+@require_http_methods(["GET", "PUT"])
+def upload_session(request, pk) -> JsonResponse:
+    """
+    GET the offset to resume a resumable upload from, or PUT the next chunk
+    with a ``Content-Range: bytes start-end/size`` header; the chunk
+    completing the file creates its PdfFileModel
+
+    :param request: the chunk as the request body
+    :param pk: UploadSession id
+    :return: JsonResponse
+    """
+    session = get_object_or_404(UploadSession, pk=pk)
+    if request.method == "GET" or session.pdf_id:
+        return JsonResponse(upload_session_data(session))
+    match = CONTENT_RANGE.match(request.headers.get("Content-Range", ""))
+    if match is None:
+        return JsonResponse({"error": UPLOAD_CONTENT_RANGE_ERROR}, status=400)
+    start, end, size = map(int, match.groups())
+    if size != session.size or not start <= end < size:
+        return JsonResponse({"error": UPLOAD_CONTENT_RANGE_ERROR}, status=400)
+    if start != session.received:
+        return JsonResponse(
+            {
+                "error": UPLOAD_OFFSET_ERROR.format(offset=session.received),
+                **upload_session_data(session),
+            },
+            status=409,
+        )
+    receive_chunk(session, start, end - start + 1, request)
+    if session.received < session.size:
+        return JsonResponse(upload_session_data(session))
+    complete_session(session)
+    return JsonResponse(upload_session_data(session), status=201)
+
+
+@staff_member_required
+def upload_metrics(request) -> JsonResponse:
+    """
+    upload counters and throughput
+
+    :return: JsonResponse
+    """
+    return JsonResponse(get_upload_metrics())
+
+
 def redirect_view(request):
     params = Pizza.objects.all()
     return redirect("/learn/file_form", kwargs={params})
@@ -123,7 +251,7 @@ class CreatePizzaView(CreateView, SuccessMessageMixin):
 
 
 class PizzaList(ListView):
-    model = Pizza
+    queryset = Pizza.objects.prefetch_related("toppings")
     template_name = "pizzaList.html"
     context_object_name = "pizzas"
 
@@ -153,32 +281,29 @@ class EmailSendView(FormView):
 
     def form_valid(self, form):
         from django.contrib.messages import info
-        from django.core.mail import send_mass_mail, EmailMultiAlternatives
         from django.template.loader import render_to_string
 
         subject = form.cleaned_data.get("subject")
         sender = form.cleaned_data.get("sender")
-        receiver = form.cleaned_data.get("receiver").split(",")
+        receiver = form.cleaned_data.get("receiver")
         attachment = form.cleaned_data.get("attachment")
         body = "Temp Body"
-        print(receiver)
-        try:
-            mail = EmailMultiAlternatives(
-                subject=subject,
-                body=body,
-                from_email=sender,
-                to=receiver,
-            )
-            html_message = render_to_string(
-                "email.html",
-                context={"user": self.request.user, "from": sender},
-            )
-            mail.attach_alternative(html_message, "text/html")
-            if attachment:
-                mail.attach("image.jpeg", attachment.read())
-            mail.send()
-            info(self.request, "Mail Send Successfully")
-        except Exception as e:
-            form.add_error(None, e)
-            return super().form_invalid(form)
+        html_message = render_to_string(
+            "email.html",
+            context={"user": self.request.user, "from": sender},
+        )
+        # sent by the send_queued_mail worker, outside the request
+        enqueue_email(
+            subject,
+            body,
+            sender,
+            receiver,
+            html_body=html_message,
+            attachment=(
+                (attachment.name, attachment.read(), attachment.content_type)
+                if attachment
+                else None
+            ),
+        )
+        info(self.request, MAIL_QUEUED_MESSAGE.format(count=len(set(receiver))))
         return super().form_valid(form)
@@ -6,6 +6,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+Serve the project through this module (e.g. ``uvicorn mysite.asgi:application``)
+to use the live tally stream at ``/polls/live``: it is an async view holding a
+long-lived server-sent events response, which WSGI workers cannot stream.
 """
 
 import os
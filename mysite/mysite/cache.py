@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from mysite.instrumentation import record_cache_lookup
+
+MISSING = object()
+# Local marker for keys known to be absent from the shared tier.
+NEGATIVE = b""
+
+
+class TieredCache(BaseCache):
+    """
+    Two-tier cache: a bounded in-process LRU in front of a shared backend.
+
+    Writes go through to both tiers. Reads are served from the local tier
+    while its entry is younger than ``LOCAL_TIMEOUT`` seconds, so other
+    processes' writes become visible after at most that long. Misses on the
+    shared tier are remembered locally for ``NEGATIVE_TIMEOUT`` seconds.
+
+    OPTIONS:
+        LOCAL_MAX_ENTRIES: size of the local LRU (default 1000)
+        LOCAL_TIMEOUT: max age of a local entry in seconds (default 5)
+        NEGATIVE_TIMEOUT: how long a shared miss is cached (default 1)
+        SHARED: a CACHES-style dict configuring the shared tier
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        options = params.get("OPTIONS", {})
+        super().__init__(params)
+        shared = dict(options["SHARED"])
+        self.shared = import_string(shared.pop("BACKEND"))(
+            shared.pop("LOCATION", ""), shared
+        )
+        self.local_max_entries = int(options.get("LOCAL_MAX_ENTRIES", 1000))
+        self.local_timeout = float(options.get("LOCAL_TIMEOUT", 5))
+        self.negative_timeout = float(options.get("NEGATIVE_TIMEOUT", 1))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "local": {"hits": 0, "misses": 0},
+            "shared": {"hits": 0, "misses": 0},
+        }
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        pickled = self._local_get(local_key)
+        if pickled is NEGATIVE:
+            record_cache_lookup(False)
+            return default
+        if pickled is not MISSING:
+            record_cache_lookup(True)
+            return pickle.loads(pickled)
+        value = self.shared.get(key, MISSING, version=version)
+        if value is MISSING:
+            self._count("shared", "misses")
+            self._local_set(local_key, NEGATIVE, self.negative_timeout)
+            record_cache_lookup(False)
+            return default
+        self._count("shared", "hits")
+        self._local_set(local_key, pickle.dumps(value, self.pickle_protocol))
+        record_cache_lookup(True)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, self._shared_timeout(timeout), version=version)
+        self._store(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if not self.shared.add(
+            key, value, self._shared_timeout(timeout), version=version
+        ):
+            self._local_delete(local_key)
+            return False
+        self._store(local_key, value, timeout)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, self._shared_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def stats(self):
+        """
+        Per-tier hit/miss counters and the local tier size, for monitoring.
+        """
+        with self._lock:
+            stats = {tier: dict(counters) for tier, counters in self._stats.items()}
+            stats["local"]["entries"] = len(self._local)
+        return stats
+
+    def _shared_timeout(self, timeout):
+        # Resolve DEFAULT_TIMEOUT with this cache's TIMEOUT, not the shared one.
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _store(self, local_key, value, timeout):
+        timeout = self._shared_timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self._local_delete(local_key)
+            return
+        ttl = (
+            self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+        )
+        self._local_set(local_key, pickle.dumps(value, self.pickle_protocol), ttl)
+
+    def _local_get(self, local_key):
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is not None:
+                expires_at, pickled = entry
+                if expires_at > time.monotonic():
+                    self._local.move_to_end(local_key)
+                    self._stats["local"]["hits"] += 1
+                    return pickled
+                del self._local[local_key]
+            self._stats["local"]["misses"] += 1
+            return MISSING
+
+    def _local_set(self, local_key, pickled, ttl=None):
+        ttl = self.local_timeout if ttl is None else ttl
+        with self._lock:
+            self._local[local_key] = (time.monotonic() + ttl, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, local_key):
+        with self._lock:
+            self._local.pop(local_key, None)
+
+    def _count(self, tier, outcome):
+        with self._lock:
+            self._stats[tier][outcome] += 1
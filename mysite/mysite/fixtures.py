@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+import codecs
+import datetime
+import json
+import re
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, List
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers import python
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+FORMAT_JSON = "json"
+FORMAT_JSONL = "jsonl"
+READ_CHUNK_SIZE = 64 * 1024
+JSON_ARRAY_ERROR = "Expected a JSON array"
+# Whitespace and commas between the elements of a JSON array
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+class FixtureEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder keeping microseconds, so reloaded rows compare equal.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def dependency_order(models: Iterable[Any]) -> List[Any]:
+    """
+    Order models so every model comes after the models its foreign keys
+    point to; self references and cycles are left to deferred constraints.
+    """
+    models = list(models)
+    ordered: List[Any] = []
+    visiting = set()
+
+    def visit(model):
+        if model in ordered or model in visiting:
+            return
+        visiting.add(model)
+        for field in model._meta.concrete_fields:
+            target = field.related_model if field.is_relation else None
+            if target is not None and target in models:
+                visit(target)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in models:
+        visit(model)
+    return ordered
+
+
+def get_models(app_labels: Iterable[str]) -> List[Any]:
+    """
+    Concrete, managed models of the given apps in foreign key order.
+    """
+    return dependency_order(
+        model
+        for label in app_labels
+        for model in apps.get_app_config(label).get_models()
+        if model._meta.managed and not model._meta.proxy
+    )
+
+
+def dump(models: Iterable[Any], stream: IO[str], fmt: str, batch_size: int) -> int:
+    """
+    Write every row of ``models`` to ``stream`` in Django's fixture format.
+
+    Rows are read ``batch_size`` at a time with their many-to-many keys
+    prefetched per batch, and written as they are read, so memory does not
+    grow with the table. ``jsonl`` writes one object per line, ``json`` a
+    single array that ``loaddata`` also accepts.
+
+    :return: The number of objects written.
+    """
+    serializer = python.Serializer()
+    written = 0
+    if fmt == FORMAT_JSON:
+        stream.write("[")
+    for model in models:
+        m2m = [
+            field.name
+            for field in model._meta.many_to_many
+            if field.remote_field.through._meta.auto_created
+        ]
+        queryset = (
+            model._default_manager.using(router.db_for_read(model))
+            .prefetch_related(*m2m)
+            .order_by(model._meta.pk.name)
+        )
+        for batch in _batches(queryset.iterator(chunk_size=batch_size), batch_size):
+            for data in serializer.serialize(batch):
+                line = json.dumps(data, cls=FixtureEncoder, ensure_ascii=False)
+                if fmt == FORMAT_JSON:
+                    stream.write(",\n" if written else "\n")
+                    stream.write(line)
+                else:
+                    stream.write(line + "\n")
+                written += 1
+    if fmt == FORMAT_JSON:
+        stream.write("\n]\n")
+    return written
+
+
+def read_objects(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    Incrementally parse fixture objects from a JSON array or JSON Lines.
+    """
+    head = _read_head(stream)
+    if head == b"[":
+        yield from _iter_array(head, stream)
+        return
+    for line in _Prepend(head, stream):
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json_array(stream: IO[bytes]) -> Iterator[Any]:
+    """
+    Incrementally parse the elements of a JSON array.
+
+    :raises ValueError: If the stream does not hold a valid JSON array.
+    """
+    head = _read_head(stream)
+    if head != b"[":
+        raise ValueError(JSON_ARRAY_ERROR)
+    yield from _iter_array(head, stream)
+
+
+def _read_head(stream: IO[bytes]) -> bytes:
+    head = stream.read(1)
+    while head.isspace():
+        head = stream.read(1)
+    return head
+
+
+def _iter_array(head: bytes, stream: IO[bytes]) -> Iterator[Any]:
+    if ijson is None:
+        yield from _iter_json_array(stream)
+        return
+    try:
+        yield from ijson.items(_Prepend(head, stream), "item", use_float=True)
+    except ijson.JSONError as error:
+        raise ValueError(str(error)) from error
+
+
+def _iter_json_array(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    # The opening "[" is already consumed, decode one element at a time.
+    # Elements are decoded from an offset into the buffer, and an element
+    # cut by a read is only parsed again once the pending text has doubled,
+    # so large elements cost a linear number of parse attempts.
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, position, wanted = "", 0, 0
+    eof = False
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        pending = len(buffer) - position
+        if eof or (pending and pending >= wanted):
+            try:
+                obj, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                wanted = 2 * pending
+            else:
+                wanted = 0
+                yield obj
+                continue
+        chunk = stream.read(max(READ_CHUNK_SIZE, wanted - pending))
+        eof = not chunk
+        buffer = buffer[position:] + utf8.decode(chunk, final=eof)
+        position = 0
+
+
+class _Prepend:
+    """
+    File-like wrapper giving back bytes already read from a stream.
+    """
+
+    def __init__(self, head: bytes, stream: IO[bytes]):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        head, self.head = self.head, b""
+        return head + self.stream.read(size if size < 0 else max(size - len(head), 0))
+
+    def __iter__(self):
+        head, self.head = self.head, b""
+        first = next(iter(self.stream), b"")
+        yield head + first
+        yield from self.stream
+
+
+def load(objects: Iterable[Dict[str, Any]], batch_size: int) -> Dict[Any, int]:
+    """
+    Insert deserialized fixture objects with one ``bulk_create`` per batch.
+
+    Consecutive objects of a model are batched; a batch is written when it
+    is full or the model changes, so a fixture in foreign key order (as
+    written by :func:`dump`) inserts parents first. Rows are upserted on
+    their primary key like ``loaddata``, many-to-many rows are inserted in
+    bulk after their batch, and every model goes to the database the router
+    picks for it. Everything is loaded in one transaction per database and
+    sequences are reset at the end. No model signals are sent, and
+    django-extensions ``modified`` fields keep the fixture values.
+
+    :return: Mapping of model to the number of objects loaded.
+    """
+    counts: Dict[Any, int] = {}
+    with ExitStack() as stack:
+        for db in connections:
+            stack.enter_context(transaction.atomic(using=db))
+        batch: List[Any] = []
+        for deserialized in python.Deserializer(objects):
+            model = type(deserialized.object)
+            if not router.allow_migrate_model(router.db_for_write(model), model):
+                continue
+            if batch and (
+                type(batch[0].object) is not model or len(batch) >= batch_size
+            ):
+                _write(batch, counts)
+                batch = []
+            batch.append(deserialized)
+        if batch:
+            _write(batch, counts)
+        _reset_sequences(counts)
+    return counts
+
+
+@contextmanager
+def _loaded_dates(model: Any) -> Iterator[None]:
+    """
+    Keep the fixture values of ``auto_now`` and ``auto_now_add`` fields,
+    which ``bulk_create`` would otherwise set to the current time like
+    ``loaddata``'s raw saves do not.
+    """
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _write(batch: List[Any], counts: Dict[Any, int]) -> None:
+    model = type(batch[0].object)
+    db = router.db_for_write(model)
+    objs = [deserialized.object for deserialized in batch]
+    for obj in objs:
+        # django-extensions ModificationDateTimeField keeps the loaded value.
+        obj.update_modified = False
+    fields = [
+        field.name for field in model._meta.concrete_fields if not field.primary_key
+    ]
+    with _loaded_dates(model):
+        model._base_manager.using(db).bulk_create(
+            objs,
+            update_conflicts=bool(fields),
+            ignore_conflicts=not fields,
+            unique_fields=[model._meta.pk.name] if fields else None,
+            update_fields=fields or None,
+        )
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if not through._meta.auto_created:
+            continue
+        source = field.m2m_field_name() + "_id"
+        target = field.m2m_reverse_field_name() + "_id"
+        rows = [
+            through(**{source: deserialized.object.pk, target: pk})
+            for deserialized in batch
+            for pk in deserialized.m2m_data.get(field.name, ())
+        ]
+        if rows:
+            through_db = router.db_for_write(through, instance=objs[0])
+            through._base_manager.using(through_db).bulk_create(
+                rows, ignore_conflicts=True
+            )
+    counts[model] = counts.get(model, 0) + len(objs)
+
+
+def _reset_sequences(counts: Dict[Any, int]) -> None:
+    by_db: Dict[str, List[Any]] = {}
+    for model in counts:
+        by_db.setdefault(router.db_for_write(model), []).append(model)
+    for db, models in by_db.items():
+        connection = connections[db]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+def _batches(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
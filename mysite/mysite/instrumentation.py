@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.urls import Resolver404, resolve
+
+from mysite.timing import BUCKETS, Histogram
+
+# Upper bounds of the query count buckets
+QUERY_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+UNRESOLVED = "unresolved"
+METRICS = {
+    "latency": ("django_view_latency_milliseconds", "Request latency by url name"),
+    "queries": ("django_view_queries", "SQL queries per request by url name"),
+    "query_time": (
+        "django_view_query_milliseconds",
+        "SQL query time per request by url name",
+    ),
+    "template_time": (
+        "django_view_template_milliseconds",
+        "Template render time per request by url name",
+    ),
+}
+
+current_sample: contextvars.ContextVar[Optional["Sample"]] = contextvars.ContextVar(
+    "current_sample", default=None
+)
+
+
+class Sample:
+    """
+    Measurements of one sampled request.
+    """
+
+    __slots__ = ("queries", "query_time", "template_time", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class Metrics:
+    """
+    Histograms, cache counters and a ring buffer of recent samples of this
+    process, keyed by url name.
+    """
+
+    def __init__(self, ring_size: int = 1000):
+        self.lock = threading.Lock()
+        self.ring_size = ring_size
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms = {
+                "latency": Histogram(BUCKETS),
+                "queries": Histogram(QUERY_BUCKETS),
+                "query_time": Histogram(BUCKETS),
+                "template_time": Histogram(BUCKETS),
+            }
+            self.cache: Dict[str, Dict[str, int]] = {}
+            self.recent = deque(maxlen=self.ring_size)
+
+    def record(
+        self, url_name: str, method: str, status: int, latency: float, sample: Sample
+    ) -> None:
+        values = {
+            "latency": latency * 1000,
+            "queries": sample.queries,
+            "query_time": sample.query_time * 1000,
+            "template_time": sample.template_time * 1000,
+        }
+        for name, value in values.items():
+            self.histograms[name].observe([(url_name, value)])
+        with self.lock:
+            counters = self.cache.setdefault(url_name, {"hits": 0, "misses": 0})
+            counters["hits"] += sample.cache_hits
+            counters["misses"] += sample.cache_misses
+        self.recent.append(
+            {
+                "time": time.time(),
+                "url_name": url_name,
+                "method": method,
+                "status": status,
+                "cache_hits": sample.cache_hits,
+                "cache_misses": sample.cache_misses,
+                **{name: round(value, 3) for name, value in values.items()},
+            }
+        )
+
+    def snapshot(self, recent: int = 50) -> Dict[str, object]:
+        views: Dict[str, dict] = {}
+        for name, histogram in self.histograms.items():
+            for url_name, stats in histogram.snapshot().items():
+                views.setdefault(url_name, {})[name] = stats
+        with self.lock:
+            for url_name, counters in self.cache.items():
+                views.setdefault(url_name, {})["cache"] = dict(counters)
+        return {
+            "sample_rate": sample_rate(),
+            "views": views,
+            "recent": list(self.recent)[-recent:] if recent else [],
+            "caches": cache_tier_stats(),
+        }
+
+    def prometheus(self) -> str:
+        """
+        The histograms and counters in the Prometheus text format.
+        """
+        lines: List[str] = []
+        for name, (metric, description) in METRICS.items():
+            lines += [
+                "# HELP %s %s" % (metric, description),
+                "# TYPE %s histogram" % metric,
+            ]
+            for url_name, stats in self.histograms[name].snapshot().items():
+                label = 'url_name="%s"' % escape(url_name)
+                for bound, count in stats["buckets"].items():
+                    lines.append(
+                        '%s_bucket{%s,le="%s"} %d' % (metric, label, bound, count)
+                    )
+                lines.append("%s_sum{%s} %s" % (metric, label, stats["sum_ms"]))
+                lines.append("%s_count{%s} %d" % (metric, label, stats["count"]))
+        metric = "django_view_cache_lookups_total"
+        lines += [
+            "# HELP %s Cache lookups of sampled requests by url name" % metric,
+            "# TYPE %s counter" % metric,
+        ]
+        with self.lock:
+            counters = {name: dict(values) for name, values in self.cache.items()}
+        for url_name, values in counters.items():
+            for result in ("hits", "misses"):
+                lines.append(
+                    '%s{url_name="%s",result="%s"} %d'
+                    % (metric, escape(url_name), result[:-1], values[result])
+                )
+        metric = "django_cache_lookups_total"
+        lines += [
+            "# HELP %s Cache lookups of every request by alias and tier" % metric,
+            "# TYPE %s counter" % metric,
+        ]
+        for alias, tiers in cache_tier_stats().items():
+            for tier, values in tiers.items():
+                for result in ("hits", "misses"):
+                    if result in values:
+                        lines.append(
+                            '%s{alias="%s",tier="%s",result="%s"} %d'
+                            % (
+                                metric,
+                                escape(alias),
+                                escape(tier),
+                                result[:-1],
+                                values[result],
+                            )
+                        )
+        lines += [
+            "# HELP django_sample_rate Share of requests instrumented",
+            "# TYPE django_sample_rate gauge",
+            "django_sample_rate %s" % sample_rate(),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def sample_rate() -> float:
+    return float(getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 0.1))
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def cache_tier_stats() -> Dict[str, dict]:
+    """
+    The counters of every cache alias that keeps them.
+    """
+    return {
+        alias: caches[alias].stats()
+        for alias in settings.CACHES
+        if hasattr(caches[alias], "stats")
+    }
+
+
+def record_cache_lookup(hit: bool) -> None:
+    """
+    Count a cache lookup for the sampled request being served, if any.
+    """
+    sample = current_sample.get()
+    if sample is not None:
+        if hit:
+            sample.cache_hits += 1
+        else:
+            sample.cache_misses += 1
+
+
+metrics = Metrics(getattr(settings, "INSTRUMENTATION_RING_SIZE", 1000))
+
+
+def url_name(request) -> str:
+    """
+    The url name a request resolved to, also for responses served before
+    resolving, e.g. from the page cache or by a redirecting middleware.
+    """
+    match = request.resolver_match
+    if match is None:
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return UNRESOLVED
+    return match.view_name or UNRESOLVED
+
+
+class InstrumentationMiddleware:
+    """
+    Records the latency, SQL queries and time, cache hits and misses and
+    template render time of a sampled share of the requests
+    (``INSTRUMENTATION_SAMPLE_RATE``) under their url name.
+
+    Requests that are not sampled cost one random number; sampled ones wrap
+    every database connection's cursor in an execute wrapper. Put it first
+    in MIDDLEWARE so the latency covers every layer.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = sample_rate()
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return self.get_response(request)
+        sample = Sample()
+        token = current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample.execute))
+                response = self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        latency = time.perf_counter() - started
+        metrics.record(
+            url_name(request),
+            request.method,
+            response.status_code,
+            latency,
+            sample,
+        )
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        sample = current_sample.get()
+        if sample is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend adding the render time of top level templates
+    to the sampled request. Included templates are part of their parent's
+    time.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+import time
+
+from django.conf import settings
+from django.middleware.cache import FetchFromCacheMiddleware, UpdateCacheMiddleware
+from django.utils.cache import (
+    get_cache_key,
+    get_max_age,
+    has_vary_header,
+    learn_cache_key,
+    patch_response_headers,
+)
+
+# Entries are stored as (fresh_until, regeneration seconds, response), so they
+# live under their own prefix and are never read by plain cache_page views.
+KEY_PREFIX = "swr"
+
+
+def _key_prefix() -> str:
+    return "%s.%s" % (KEY_PREFIX, settings.CACHE_MIDDLEWARE_KEY_PREFIX)
+
+
+def _stale_seconds() -> int:
+    return getattr(settings, "CACHE_MIDDLEWARE_STALE_SECONDS", 30)
+
+
+def should_regenerate(fresh_until: float, delta: float, beta: float) -> bool:
+    """
+    Probabilistic early expiry ("XFetch").
+
+    Each request treats the entry as expired slightly before ``fresh_until``
+    with a probability growing as expiry nears and with the time it took to
+    build (``delta``), so one request usually rebuilds it before it expires.
+
+    :param fresh_until: Epoch time the entry stops being fresh.
+    :param delta: Seconds it took to generate the entry.
+    :param beta: Eagerness, 0 disables early expiry.
+    :return: bool
+    """
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= fresh_until
+
+
+class StampedeUpdateCacheMiddleware(UpdateCacheMiddleware):
+    """
+    Drop-in replacement for ``UpdateCacheMiddleware`` to be used with
+    :class:`StampedeFetchFromCacheMiddleware`.
+
+    Pages are kept ``CACHE_MIDDLEWARE_STALE_SECONDS`` beyond their timeout so
+    that a stale copy can be served while a single request regenerates it.
+    Responses with ``max-age=0``, such as ``cache_page(0)`` views, are never
+    stored.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.key_prefix = _key_prefix()
+        self.stale_seconds = _stale_seconds()
+
+    def process_response(self, request, response):
+        try:
+            return self._update_cache(request, response)
+        finally:
+            lock_key = getattr(request, "_cache_lock_key", None)
+            if lock_key is not None and not getattr(request, "_cache_stored", False):
+                # Nothing cacheable came back, let the next request try.
+                self.cache.delete(lock_key)
+
+    def _update_cache(self, request, response):
+        if not self._should_update_cache(request, response):
+            return response
+        if response.streaming or response.status_code not in (200, 304):
+            return response
+        if (
+            not request.COOKIES
+            and response.cookies
+            and has_vary_header(response, "Cookie")
+        ):
+            return response
+        if "private" in response.get("Cache-Control", ()):
+            return response
+
+        timeout = self.page_timeout
+        if timeout is None:
+            timeout = get_max_age(response)
+            if timeout is None:
+                timeout = self.cache_timeout
+            elif timeout == 0:
+                return response
+        patch_response_headers(response, timeout)
+        if not timeout or response.status_code != 200:
+            return response
+
+        hard_timeout = timeout + self.stale_seconds
+        cache_key = learn_cache_key(
+            request, response, hard_timeout, self.key_prefix, cache=self.cache
+        )
+        started = getattr(request, "_cache_regeneration_started", None)
+        delta = time.monotonic() - started if started is not None else 0.0
+        lock_key = getattr(request, "_cache_lock_key", None)
+
+        def store(response):
+            entry = (time.time() + timeout, delta, response)
+            self.cache.set(cache_key, entry, hard_timeout)
+            if lock_key is not None:
+                self.cache.delete(lock_key)
+
+        request._cache_stored = True
+        if hasattr(response, "render") and callable(response.render):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+
+class StampedeFetchFromCacheMiddleware(FetchFromCacheMiddleware):
+    """
+    Drop-in replacement for ``FetchFromCacheMiddleware`` with single-flight
+    regeneration.
+
+    Once an entry is expired, or picked for early expiry, the first request
+    to take the regeneration lock rebuilds the page while every other request
+    keeps getting the stale copy. Only a cold miss reaches the view from more
+    than one request at a time.
+
+    Settings:
+        CACHE_MIDDLEWARE_STALE_SECONDS: how long past expiry a page may be
+            served while it is regenerated (default 30)
+        CACHE_MIDDLEWARE_EARLY_EXPIRY_BETA: eagerness of the probabilistic
+            early expiry, 0 disables it (default 1.0)
+        CACHE_MIDDLEWARE_LOCK_SECONDS: how long a regenerating request holds
+            the lock before another may take over (default 10)
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.key_prefix = _key_prefix()
+        self.beta = getattr(settings, "CACHE_MIDDLEWARE_EARLY_EXPIRY_BETA", 1.0)
+        self.lock_seconds = getattr(settings, "CACHE_MIDDLEWARE_LOCK_SECONDS", 10)
+
+    def process_request(self, request):
+        if request.method not in ("GET", "HEAD"):
+            request._cache_update_cache = False
+            return None
+
+        cache_key = get_cache_key(request, self.key_prefix, "GET", cache=self.cache)
+        if cache_key is None:
+            return self._regenerate(request)
+        entry = self.cache.get(cache_key)
+        if entry is None and request.method == "HEAD":
+            cache_key = get_cache_key(
+                request, self.key_prefix, "HEAD", cache=self.cache
+            )
+            entry = self.cache.get(cache_key)
+        if entry is None:
+            return self._regenerate(request)
+
+        fresh_until, delta, response = entry
+        if should_regenerate(fresh_until, delta, self.beta):
+            lock_key = "%s.lock" % cache_key
+            if self.cache.add(lock_key, True, self.lock_seconds):
+                request._cache_lock_key = lock_key
+                return self._regenerate(request)
+        request._cache_update_cache = False
+        return response
+
+    def _regenerate(self, request):
+        request._cache_update_cache = True
+        request._cache_regeneration_started = time.monotonic()
+        return None
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Settings profiles, picked with the ``DJANGO_PROFILE`` environment variable
+(or ``.env`` entry):
+
+* ``dev``: DEBUG with the debug toolbar and schema graph.
+* ``prod``: the lean stack, without debugging middleware or apps.
+* ``bench``: ``prod`` with every middleware timed, see :mod:`mysite.timing`.
+"""
+from typing import List
+
+DEV = "dev"
+PROD = "prod"
+BENCH = "bench"
+PROFILES = [DEV, PROD, BENCH]
+
+TIMING_PROBE = "mysite.timing.TimingProbe{index}"
+
+INSTALLED_APPS = [
+    "polls.apps.PollsConfig",
+    "accounts.apps.AccountsConfig",
+    "learning.apps.LearningConfig",
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "django_extensions",
+    "phonenumber_field",
+    "django_htmx",
+]
+DEV_APPS = [
+    "debug_toolbar",
+    "schema_graph",
+]
+
+MIDDLEWARE = [
+    "mysite.instrumentation.InstrumentationMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "learning.middleware.AccessControlMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "django_htmx.middleware.HtmxMiddleware",
+    "mysite.middleware.StampedeUpdateCacheMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "mysite.middleware.StampedeFetchFromCacheMiddleware",
+]
+# middleware only in dev, inserted before the given one
+DEV_MIDDLEWARE = {
+    "debug_toolbar.middleware.DebugToolbarMiddleware": (
+        "mysite.middleware.StampedeUpdateCacheMiddleware"
+    ),
+}
+
+
+def get_profile(name: str) -> str:
+    if name not in PROFILES:
+        raise ValueError(
+            "Unknown settings profile %r, use one of %s" % (name, ", ".join(PROFILES))
+        )
+    return name
+
+
+def installed_apps(profile: str) -> List[str]:
+    if profile == DEV:
+        return INSTALLED_APPS + DEV_APPS
+    return list(INSTALLED_APPS)
+
+
+def middleware(profile: str) -> List[str]:
+    names = list(MIDDLEWARE)
+    if profile == DEV:
+        for name, before in DEV_MIDDLEWARE.items():
+            names.insert(names.index(before), name)
+    if profile == BENCH:
+        return timed(names)
+    return names
+
+
+def timed(names: List[str]) -> List[str]:
+    """
+    Put a timing probe before every middleware and before the view, so each
+    layer's own time is the difference of two neighbouring probes.
+    """
+    probed = []
+    for index, name in enumerate(names):
+        probed += [TIMING_PROBE.format(index=index), name]
+    return probed + [TIMING_PROBE.format(index=len(names))]
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Query budgets for tests: fail when a block of code, usually one request to a
+view, runs more SQL queries than declared or repeats one query shape, the
+mark of an N+1 pattern.
+
+    with query_budget(3, label="pizza-list"):
+        self.client.get(reverse("pizza-list"))
+
+    @query_budget(2)
+    def test_detail(self): ...
+
+:class:`QueryBudgetMixin` declares budgets per url name in a TestCase and
+checks them all at once, failing with a diff of the declared and measured
+query counts.
+"""
+import contextlib
+import difflib
+import functools
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from django.db import connections
+from django.urls import URLPattern, URLResolver
+
+# Times one query shape may run in a budgeted block; test data holding more
+# rows than this turns an N+1 pattern into a failure
+REPEATED_QUERY_LIMIT = 2
+# Statements left out of the repeated shapes, e.g. of nested atomic blocks
+IGNORED_SHAPES = re.compile(r"^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b")
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def query_shape(sql: str) -> str:
+    """
+    The query with its literals replaced by ``?`` and lists of them, e.g. of
+    ``IN`` or ``VALUES``, collapsed whatever their length, so one query run
+    for every row keeps one shape.
+    """
+    shape = STRING_LITERAL.sub("?", sql)
+    shape = NUMBER_LITERAL.sub("?", shape)
+    shape = PLACEHOLDER_LIST.sub("(...)", shape)
+    return WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(contextlib.ContextDecorator):
+    """
+    Record the queries of every database connection in the block and fail if
+    there are more than ``budget`` of them, or if one query shape runs more
+    than ``repeats`` times. Queries are recorded with execute wrappers, so
+    databases the block never uses are not connected to.
+
+    :param budget: Most queries allowed, over all databases.
+    :param repeats: Most runs of one query shape.
+    :param label: Name of the budget in failures, e.g. the url name.
+    :param using: Database aliases to record, all of them by default.
+    :param strict: Check the budget on leaving the block; otherwise the
+        caller reads ``failures()``.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        repeats: int = REPEATED_QUERY_LIMIT,
+        label: str = "",
+        using: Optional[Iterable[str]] = None,
+        strict: bool = True,
+    ):
+        self.budget = budget
+        self.repeats = repeats
+        self.label = label
+        self.using = using
+        self.strict = strict
+
+    def __enter__(self):
+        self.queries: List[Tuple[str, str, object]] = []
+        self.stack = contextlib.ExitStack()
+        for alias in self.using or list(connections):
+            connection = connections[alias]
+            self.stack.enter_context(
+                connection.execute_wrapper(functools.partial(self.record, alias))
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stack.close()
+        if exc_type is None and self.strict:
+            self.check()
+
+    def record(self, alias, execute, sql, params, many, context):
+        self.queries.append((alias, sql, params))
+        return execute(sql, params, many, context)
+
+    def repeated(self) -> Dict[Tuple[str, str], int]:
+        """
+        Query shapes run more than ``repeats`` times, with their count.
+        """
+        shapes = Counter(
+            (alias, query_shape(sql))
+            for alias, sql, params in self.queries
+            if not IGNORED_SHAPES.match(sql)
+        )
+        return {shape: count for shape, count in shapes.items() if count > self.repeats}
+
+    def failures(self) -> List[str]:
+        failures = []
+        count = len(self.queries)
+        if count > self.budget:
+            failures.append(
+                "%d queries over a budget of %d (+%d)"
+                % (count, self.budget, count - self.budget)
+            )
+        for (alias, shape), times in self.repeated().items():
+            failures.append(
+                "%d runs of one query shape, likely N+1 [%s]: %s"
+                % (times, alias, shape)
+            )
+        return failures
+
+    def report(self) -> str:
+        lines = ["%s:" % (self.label or "query budget")]
+        lines += ["  %s" % failure for failure in self.failures()]
+        lines.append("  queries:")
+        lines += [
+            "    %d. [%s] %s %r" % (number, alias, sql, params)
+            for number, (alias, sql, params) in enumerate(self.queries, 1)
+        ]
+        return "\n".join(lines)
+
+    def check(self) -> None:
+        if self.failures():
+            raise QueryBudgetExceeded(self.report())
+
+
+def url_names(patterns) -> List[str]:
+    """
+    Names of the url patterns, with those of included patterns.
+    """
+    names = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names += url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.append(pattern.name)
+    return list(dict.fromkeys(names))
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin checking the query budget of every view of an app.
+
+    ``query_budgets`` maps url names to the most queries a request to them
+    may run, including the session and user lookups of the middleware. Views
+    whose statements differ by backend, e.g. the search index sync, map to
+    a dict of budgets by ``connection.vendor`` of the default database.
+    ``budget_requests()`` returns (url name, callable making the request)
+    pairs, run against data holding more rows than ``REPEATED_QUERY_LIMIT``
+    per listing so N+1 patterns show.
+    """
+
+    query_budgets: Dict[str, Union[int, Dict[str, int]]] = {}
+
+    def budget_requests(self):
+        raise NotImplementedError
+
+    def query_budget_for(self, name: str) -> int:
+        budget = self.query_budgets[name]
+        if isinstance(budget, dict):
+            return budget[connections["default"].vendor]
+        return budget
+
+    def assertQueryBudgetsCover(self, patterns) -> None:
+        """
+        Fail for url names of ``patterns`` without a declared budget.
+        """
+        missing = [
+            name for name in url_names(patterns) if name not in self.query_budgets
+        ]
+        self.assertEqual(missing, [], "url names without a query budget")
+
+    def assertQueryBudgets(self) -> None:
+        declared, measured, reports = [], [], []
+        for name, make_request in self.budget_requests():
+            with query_budget(
+                self.query_budget_for(name), label=name, strict=False
+            ) as budget:
+                make_request()
+            declared.append("%s: %d" % (name, budget.budget))
+            measured.append("%s: %d" % (name, len(budget.queries)))
+            if budget.failures():
+                reports.append(budget.report())
+        if reports:
+            diff = difflib.unified_diff(
+                declared, measured, "declared", "measured", lineterm=""
+            )
+            self.fail("\n".join(list(diff) + reports))
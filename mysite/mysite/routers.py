@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
-from learning.models import TablespaceExample, Pizza, Topping, PdfFileModel
+from learning.models import (
+    TablespaceExample,
+    Pizza,
+    Topping,
+    PdfFileModel,
+    UploadSession,
+)
 
 
 class AppRouter:
     default_db = "default"
     sqlite_db = "sqlite"
-    related_models = [TablespaceExample, Pizza, Topping, PdfFileModel]
+    related_models = [TablespaceExample, Pizza, Topping, PdfFileModel, UploadSession]
 
     def db_for_read(self, model, **hints):
         if model in self.related_models:
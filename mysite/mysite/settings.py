@@ -14,6 +14,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 import os
 from dotenv import dotenv_values
+from mysite import profiles
 
 config = dotenv_values(".env")
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -26,44 +27,24 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = "django-insecure-)vszb2t21!&z-$ep&-y3ln%y9&_t=d(8v+creo3f0wuab^+ai)"
 
+# Settings Profile
+# "dev", "prod" or "bench", see mysite.profiles.
+
+PROFILE = profiles.get_profile(
+    os.environ.get("DJANGO_PROFILE") or config.get("DJANGO_PROFILE") or profiles.DEV
+)
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = PROFILE == profiles.DEV
 
 ALLOWED_HOSTS = ["*"]
 
 AUTH_USER_MODEL = "accounts.user"
 # Application definition
 
-INSTALLED_APPS = [
-    "polls.apps.PollsConfig",
-    "accounts.apps.AccountsConfig",
-    "learning.apps.LearningConfig",
-    "django.contrib.admin",
-    "django.contrib.auth",
-    "django.contrib.contenttypes",
-    "django.contrib.sessions",
-    "django.contrib.messages",
-    "django.contrib.staticfiles",
-    "django_extensions",
-    "phonenumber_field",
-    "django_htmx",
-    "debug_toolbar",
-    "schema_graph",
-]
-MIDDLEWARE = [
-    "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "django_htmx.middleware.HtmxMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
-    "learning.middleware.simple_middleware",
-    "django.middleware.cache.UpdateCacheMiddleware",
-    "django.middleware.common.CommonMiddleware",
-    "django.middleware.cache.FetchFromCacheMiddleware",
-]
+INSTALLED_APPS = profiles.installed_apps(PROFILE)
+# the bench profile times every middleware, see mysite.timing
+MIDDLEWARE = profiles.middleware(PROFILE)
 
 DEBUG_TOOLBAR_PANELS = [
     "debug_toolbar.panels.history.HistoryPanel",
@@ -87,7 +68,8 @@ ROOT_URLCONF = "mysite.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates timing renders for mysite.instrumentation
+        "BACKEND": "mysite.instrumentation.InstrumentedDjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -199,13 +181,42 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 #     }
 # }
 CACHE_MIDDLEWARE_SECONDS = 60
+# Serve a stale page up to 30s past expiry while one request rebuilds it,
+# see mysite.middleware.
+CACHE_MIDDLEWARE_STALE_SECONDS = 30
+CACHE_MIDDLEWARE_EARLY_EXPIRY_BETA = 1.0
+CACHE_MIDDLEWARE_LOCK_SECONDS = 10
 # Database Caching
 
+# CACHES = {
+#     "default": {
+#         "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+#         "LOCATION": "cache_table",
+#         "OPTIONS": {"MAX_ENTRIES": 60},
+#     }
+# }
+
+# Tiered Caching
+# In-process LRU in front of a shared filesystem cache (see mysite.cache),
+# counters are served at /internal/cache/. The shared tier lives under the
+# project unless CACHE_LOCATION is set in .env.
+
+CACHE_LOCATION = config.get("CACHE_LOCATION") or str(BASE_DIR / ".cache")
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
-        "LOCATION": "cache_table",
-        "OPTIONS": {"MAX_ENTRIES": 60},
+        "BACKEND": "mysite.cache.TieredCache",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": 1000,
+            "LOCAL_TIMEOUT": 5,
+            "NEGATIVE_TIMEOUT": 1,
+            "SHARED": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": CACHE_LOCATION,
+                "OPTIONS": {"MAX_ENTRIES": 10000},
+            },
+        },
     }
 }
 
@@ -244,3 +255,59 @@ EMAIL_USE_TLS = False  # use port 587
 EMAIL_PORT = 465  # OR 587
 EMAIL_HOST_USER = config.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config.get("EMAIL_HOST_PASSWORD")
+
+# Polls Vote Ingest
+# "direct" writes every vote immediately, "buffered" collects votes in memory
+# and flushes them in grouped UPDATEs (see polls.vote_buffer), "sharded" spreads
+# votes over POLLS_VOTE_SHARDS rows per choice (see polls.counters).
+
+POLLS_VOTE_MODE = "direct"
+POLLS_VOTE_BUFFER = {
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_PENDING": 500,
+}
+POLLS_VOTE_SHARDS = 8
+
+# Live Tallies
+# Votes are pushed to /polls/live subscribers at most once per interval. Only
+# turn the stream on when the site is served through mysite.asgi: a WSGI
+# worker would be held by every open poll page.
+
+POLLS_LIVE_TALLIES = False
+POLLS_LIVE_TALLY_INTERVAL_MS = 500
+
+# Polls Index Pagination
+# "cursor" pages the infinite scroll with keyset cursors, "offset" uses ?page=N.
+
+POLLS_INDEX_PAGINATION = "cursor"
+
+# Polls Admin Performance
+# Estimated counts, cached date hierarchy buckets and keyset pagination on the
+# Question and Choice changelists (see polls.admin_performance).
+
+POLLS_ADMIN_PERFORMANCE = True
+
+# Choice Order
+# Choices are shuffled with a seed per question and day ("day"), or per
+# question and visitor session ("session"), so cached poll cards stay valid.
+
+POLLS_CHOICE_SHUFFLE = "day"
+
+# Access Control
+# Path prefixes checked before the view runs, the longest matching prefix wins
+# (see learning.middleware.AccessControlMiddleware). Static and media files are
+# always public.
+
+ACCESS_CONTROL_RULES = [
+    ("/polls/", "login"),
+]
+
+# Request Instrumentation
+# Share of requests whose latency, SQL queries, cache lookups and template time
+# are recorded by url name (see mysite.instrumentation), served at
+# /internal/metrics/ as JSON or, with ?format=prometheus, as Prometheus text to
+# staff or to "Authorization: Bearer <INSTRUMENTATION_TOKEN>".
+
+INSTRUMENTATION_SAMPLE_RATE = 0.1
+INSTRUMENTATION_RING_SIZE = 1000
+INSTRUMENTATION_TOKEN = config.get("INSTRUMENTATION_TOKEN", "")
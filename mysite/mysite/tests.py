@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+import datetime
+import io
+import json
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import reverse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.views.decorators.cache import cache_page
+
+from mysite import fixtures, profiles
+from mysite.cache import TieredCache
+from mysite.middleware import (
+    StampedeFetchFromCacheMiddleware,
+    StampedeUpdateCacheMiddleware,
+)
+from mysite.instrumentation import metrics
+from mysite.querybudget import QueryBudgetExceeded, query_budget, query_shape
+from mysite.timing import histogram
+from accounts.models import User
+from polls.models import Choice, Question, Tag
+
+
+def tiered_cache(**options):
+    options.setdefault(
+        "SHARED", {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+    return TieredCache("", {"OPTIONS": options})
+
+
+class TieredCacheTests(SimpleTestCase):
+    def test_reads_are_served_locally_after_write_through(self):
+        """
+        set() writes both tiers and later reads never reach the shared tier.
+        """
+        cache = tiered_cache()
+        cache.set("key", {"value": 1})
+        self.assertEqual(cache.shared.get("key"), {"value": 1})
+        self.assertEqual(cache.get("key"), {"value": 1})
+        self.assertEqual(cache.get("key"), {"value": 1})
+        stats = cache.stats()
+        self.assertEqual(stats["local"]["hits"], 2)
+        self.assertEqual(stats["shared"], {"hits": 0, "misses": 0})
+
+    def test_shared_misses_are_cached_negatively(self):
+        """
+        A miss is remembered locally so repeated lookups skip the shared tier.
+        """
+        cache = tiered_cache()
+        self.assertIsNone(cache.get("absent"))
+        self.assertEqual(cache.get("absent", "default"), "default")
+        self.assertEqual(cache.stats()["shared"]["misses"], 1)
+        cache.set("absent", 2)
+        self.assertEqual(cache.get("absent"), 2)
+
+    def test_local_tier_is_bounded_lru(self):
+        """
+        The least recently used local entry is evicted first.
+        """
+        cache = tiered_cache(LOCAL_MAX_ENTRIES=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.stats()["local"]["entries"], 2)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.stats()["shared"]["hits"], 1)
+
+
+def cached_view(view):
+    return StampedeUpdateCacheMiddleware(StampedeFetchFromCacheMiddleware(view))
+
+
+@override_settings(
+    CACHE_MIDDLEWARE_SECONDS=60,
+    CACHE_MIDDLEWARE_STALE_SECONDS=30,
+    CACHE_MIDDLEWARE_EARLY_EXPIRY_BETA=0,
+)
+class StampedeCacheMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_one_request_regenerates_while_others_get_stale_copy(self):
+        """
+        After expiry the lock holder rebuilds the page and a concurrent
+        request is answered from the stale copy without reaching the view.
+        """
+        calls, concurrent = [], []
+
+        def view(request):
+            calls.append(request)
+            if len(calls) == 2:
+                concurrent.append(handler(self.factory.get("/polls/")))
+            return HttpResponse(str(len(calls)))
+
+        handler = cached_view(view)
+        self.assertEqual(handler(self.factory.get("/polls/")).content, b"1")
+        self.assertEqual(handler(self.factory.get("/polls/")).content, b"1")
+
+        expired = time.time() + 61
+        with mock.patch("mysite.middleware.time.time", return_value=expired):
+            self.assertEqual(handler(self.factory.get("/polls/")).content, b"2")
+            self.assertEqual(handler(self.factory.get("/polls/")).content, b"2")
+        self.assertEqual(concurrent[0].content, b"1")
+        self.assertEqual(len(calls), 2)
+
+    def test_cache_page_zero_is_never_cached(self):
+        """
+        Views wrapped in cache_page(0) reach the view on every request.
+        """
+        calls = []
+
+        @cache_page(0)
+        def view(request):
+            calls.append(request)
+            return HttpResponse("profile")
+
+        handler = cached_view(view)
+        handler(self.factory.get("/accounts/profile"))
+        handler(self.factory.get("/accounts/profile"))
+        self.assertEqual(len(calls), 2)
+
+
+class StreamingFixtureTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        tag = Tag.objects.create(title="fixtures")
+        question = Question.objects.create(title="Dumped?", tag=tag, total_votes=3)
+        Choice.objects.create(question=question, title="Yes", votes=3)
+        Question.objects.update(created=question.created - datetime.timedelta(days=30))
+        question = Question.objects.get(id=question.id)
+        self.created, self.modified = question.created, question.modified
+
+    def round_trip(self, fmt):
+        stream = io.StringIO()
+        models = fixtures.get_models(["polls"])
+        self.assertLess(models.index(Tag), models.index(Question))
+        self.assertEqual(fixtures.dump(models, stream, fmt, batch_size=1), 5)
+        Tag.objects.all().delete()
+        data = io.BytesIO(stream.getvalue().encode())
+        counts = fixtures.load(fixtures.read_objects(data), batch_size=1)
+        self.assertEqual(counts[Choice], 1)
+        question = Question.objects.get(title="Dumped?")
+        self.assertEqual(
+            (question.created, question.modified), (self.created, self.modified)
+        )
+        self.assertEqual(question.choice.get().votes, 3)
+
+    def test_jsonl_round_trip(self):
+        """
+        A JSON Lines dump reloads the rows with their original timestamps.
+        """
+        self.round_trip(fixtures.FORMAT_JSONL)
+
+    @mock.patch.object(fixtures, "ijson", None)
+    @mock.patch.object(fixtures, "READ_CHUNK_SIZE", 7)
+    def test_json_array_is_parsed_incrementally(self):
+        """
+        Without ijson the array is decoded one element at a time.
+        """
+        self.round_trip(fixtures.FORMAT_JSON)
+
+    @mock.patch.object(fixtures, "ijson", None)
+    @mock.patch.object(fixtures, "READ_CHUNK_SIZE", 3)
+    def test_json_array_decodes_characters_cut_by_reads(self):
+        """
+        Multi-byte characters split across reads are decoded once complete.
+        """
+        Question.objects.update(title="¿Qué? 日本語 🗳")
+        Choice.objects.update(title="Sí")
+        stream = io.StringIO()
+        models = fixtures.get_models(["polls"])
+        fixtures.dump(models, stream, fixtures.FORMAT_JSON, batch_size=1)
+        data = stream.getvalue().encode()
+        objects = list(fixtures.read_objects(io.BytesIO(data)))
+        self.assertEqual(objects, json.loads(data))
+        titles = {obj["fields"].get("title") for obj in objects}
+        self.assertTrue({"¿Qué? 日本語 🗳", "Sí"} <= titles)
+
+
+@override_settings(MIDDLEWARE=profiles.middleware(profiles.BENCH))
+class MiddlewareTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        histogram.reset()
+
+    def test_profiles_assemble_middleware_and_apps(self):
+        toolbar = "debug_toolbar.middleware.DebugToolbarMiddleware"
+        self.assertIn(toolbar, profiles.middleware(profiles.DEV))
+        self.assertNotIn(toolbar, profiles.middleware(profiles.PROD))
+        self.assertNotIn("debug_toolbar", profiles.installed_apps(profiles.PROD))
+        bench = profiles.middleware(profiles.BENCH)
+        self.assertEqual(bench[1::2], profiles.middleware(profiles.PROD))
+        self.assertEqual(bench[-1], "mysite.timing.TimingProbe%d" % len(bench[1::2]))
+        with self.assertRaises(ValueError):
+            profiles.get_profile("staging")
+
+    def test_every_layer_is_timed(self):
+        self.client.get("/learn/http/")
+        layers = histogram.snapshot()
+        for name in profiles.MIDDLEWARE + ["view", "total"]:
+            self.assertEqual(layers[name]["count"], 1, name)
+        total = layers["total"]["sum_ms"]
+        own = sum(layers[name]["sum_ms"] for name in layers if name != "total")
+        self.assertAlmostEqual(own, total, delta=0.01)
+        self.assertEqual(layers["view"]["buckets"]["+Inf"], 1)
+
+    def test_short_circuiting_layer_owns_the_time_below(self):
+        self.client.get(reverse("index"))
+        layers = histogram.snapshot()
+        self.assertIn("learning.middleware.AccessControlMiddleware", layers)
+        self.assertNotIn("view", layers)
+
+    def test_endpoint_is_staff_only(self):
+        self.assertEqual(
+            self.client.get(reverse("middleware-timings")).status_code, 302
+        )
+        self.client.force_login(
+            User.objects.create_user(username="staff", is_staff=True)
+        )
+        histogram.reset()
+        self.client.get("/learn/http/")
+        response = self.client.get(reverse("middleware-timings") + "?reset=1")
+        self.assertTrue(response.json()["enabled"])
+        self.assertEqual(response.json()["layers"]["view"]["count"], 1)
+        # only the endpoint's own request is left after the reset
+        self.assertEqual(histogram.snapshot()["view"]["count"], 1)
+
+
+@override_settings(
+    INSTRUMENTATION_SAMPLE_RATE=1.0,
+    INSTRUMENTATION_TOKEN="scrape",
+    CACHES={
+        "default": {
+            "BACKEND": "mysite.cache.TieredCache",
+            "OPTIONS": {
+                "SHARED": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            },
+        }
+    },
+)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client.force_login(User.objects.create_user(username="user"))
+
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.get(reverse("index"))
+        self.client.get(reverse("index"))
+        views = metrics.snapshot()["views"]
+        self.assertEqual(views["index"]["latency"]["count"], 2)
+        self.assertGreater(views["index"]["queries"]["sum_ms"], 0)
+        self.assertGreater(views["index"]["query_time"]["sum_ms"], 0)
+        self.assertGreater(views["index"]["template_time"]["sum_ms"], 0)
+        # the second request finds the "key" the first one set
+        self.assertGreater(views["index"]["cache"]["hits"], 0)
+        self.assertGreater(views["index"]["cache"]["misses"], 0)
+        self.client.get("/no/such/page/")
+        self.assertIn("unresolved", metrics.snapshot()["views"])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        self.client.get(reverse("index"))
+        self.assertEqual(metrics.snapshot()["views"], {})
+
+    def test_endpoint_is_staff_or_token_only(self):
+        url = reverse("request-metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.get(reverse("index"))
+        response = self.client.get(
+            url + "?format=prometheus", HTTP_AUTHORIZATION="Bearer scrape"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'django_view_latency_milliseconds_bucket{url_name="index",le="+Inf"} 1',
+            response.content.decode(),
+        )
+        self.assertIn(
+            'django_cache_lookups_total{alias="default"', response.content.decode()
+        )
+        self.client.force_login(
+            User.objects.create_user(username="staff", is_staff=True)
+        )
+        response = self.client.get(url + "?recent=1")
+        self.assertEqual(len(response.json()["recent"]), 1)
+        self.assertIn("index", response.json()["views"])
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username="user%d" % number) for number in range(3)
+        ]
+
+    def test_query_shape_drops_literals(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE a = 'x''y' AND b IN (1, 2,  3)"),
+            query_shape("SELECT * FROM t WHERE a = 'z' AND b IN (4)"),
+        )
+        self.assertEqual(
+            query_shape('SELECT "t1"."id" FROM "t1" WHERE "id" IN (%s, %s)'),
+            'SELECT "t1"."id" FROM "t1" WHERE "id" IN (...)',
+        )
+
+    def test_over_budget_and_repeated_shapes_fail(self):
+        with query_budget(1):
+            list(User.objects.all())
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with query_budget(2, label="users"):
+                for user in self.users:
+                    User.objects.get(pk=user.pk)
+        report = str(raised.exception)
+        self.assertIn("users:", report)
+        self.assertIn("3 queries over a budget of 2 (+1)", report)
+        self.assertIn("3 runs of one query shape, likely N+1 [default]", report)
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with query_budget(10):
+                for user in self.users:
+                    User.objects.get(pk=user.pk)
+        self.assertNotIn("over a budget", str(raised.exception))
+
+    def test_decorator(self):
+        @query_budget(0)
+        def cached():
+            return len(self.users)
+
+        self.assertEqual(cached(), 3)
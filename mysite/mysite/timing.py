@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import bisect
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from django.conf import settings
+
+from mysite.profiles import TIMING_PROBE
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+PERCENTILES = [50, 95, 99]
+VIEW = "view"
+TOTAL = "total"
+PROBE_PREFIX = TIMING_PROBE.split("{", 1)[0].rsplit(".", 1)[-1]
+PROBE_NAME = re.compile(r"%s(\d+)" % PROBE_PREFIX)
+
+
+class Histogram:
+    """
+    Histograms of this process, one per key such as a middleware layer.
+    """
+
+    def __init__(self, buckets: List[float] = BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.layers: Dict[str, dict] = {}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.layers = {}
+
+    def observe(self, timings: Iterator[Tuple[str, float]]) -> None:
+        """
+        :param timings: (key, value) pairs, e.g. a request's layers and
+            their milliseconds.
+        """
+        with self.lock:
+            for layer, milliseconds in timings:
+                entry = self.layers.get(layer)
+                if entry is None:
+                    entry = self.layers[layer] = {
+                        "count": 0,
+                        "sum": 0.0,
+                        "max": 0.0,
+                        "counts": [0] * (len(self.buckets) + 1),
+                    }
+                entry["count"] += 1
+                entry["sum"] += milliseconds
+                entry["max"] = max(entry["max"], milliseconds)
+                entry["counts"][bisect.bisect_left(self.buckets, milliseconds)] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Per layer count, mean, max and cumulative bucket counts, with
+        percentiles estimated as the upper bound of their bucket.
+        """
+        with self.lock:
+            layers = {
+                layer: dict(entry, counts=list(entry["counts"]))
+                for layer, entry in self.layers.items()
+            }
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        snapshot = {}
+        for layer, entry in layers.items():
+            cumulative = []
+            total = 0
+            for count in entry["counts"]:
+                total += count
+                cumulative.append(total)
+            stats = {
+                "count": entry["count"],
+                "sum_ms": round(entry["sum"], 3),
+                "mean_ms": round(entry["sum"] / entry["count"], 3),
+                "max_ms": round(entry["max"], 3),
+                "buckets": dict(zip(bounds, cumulative)),
+            }
+            for percentile in PERCENTILES:
+                rank = entry["count"] * percentile / 100
+                index = bisect.bisect_left(cumulative, rank)
+                stats["p%d_ms" % percentile] = (
+                    self.buckets[index]
+                    if index < len(self.buckets)
+                    else stats["max_ms"]
+                )
+            snapshot[layer] = stats
+        return snapshot
+
+
+histogram = Histogram()
+
+
+def timing_enabled() -> bool:
+    return any(PROBE_NAME.search(name) for name in settings.MIDDLEWARE)
+
+
+def layer_names() -> List[str]:
+    """
+    The timed middleware in probe order, followed by the view.
+    """
+    return [name for name in settings.MIDDLEWARE if not PROBE_NAME.search(name)] + [
+        VIEW
+    ]
+
+
+def own_times(
+    timings: Dict[int, float], layers: List[str]
+) -> Iterator[Tuple[str, float]]:
+    """
+    Turn the time spent below every probe into each layer's own time.
+
+    A layer answering without calling the next one, e.g. a cache hit or a
+    redirect, leaves the probes below it unset; it then owns all the time
+    below its probe.
+    """
+    yield TOTAL, timings[0] * 1000
+    for index, below in timings.items():
+        yield layers[index], (below - timings.get(index + 1, 0.0)) * 1000
+
+
+class TimingProbe:
+    """
+    Middleware timing the rest of the chain below it.
+
+    :func:`mysite.profiles.timed` puts ``TimingProbe<index>`` before every
+    middleware and the view; each stores the time spent below it on the
+    request, and the outermost one records the layers into
+    :data:`histogram`.
+    """
+
+    index = 0
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.layers = layer_names()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        below = time.perf_counter() - started
+        timings = request.__dict__.setdefault("_middleware_timings", {})
+        timings[self.index] = below
+        if self.index == 0:
+            histogram.observe(own_times(timings, self.layers))
+        return response
+
+
+def __getattr__(name):
+    # TimingProbe0, TimingProbe1, ... for the positions in MIDDLEWARE
+    match = PROBE_NAME.fullmatch(name)
+    if match is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    return type(name, (TimingProbe,), {"index": int(match.group(1))})
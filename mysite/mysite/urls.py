@@ -3,9 +3,9 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from django.conf import settings
 from mysite.settings import MEDIA_ROOT, MEDIA_URL
-from debug_toolbar.toolbar import debug_toolbar_urls
-from schema_graph.views import Schema
+from mysite.views import cache_stats, middleware_timings, request_metrics
 
 # from polls.views import InputForm
 handler404 = "polls.views.handler404"
@@ -17,7 +17,16 @@ urlpatterns = [
     path("polls/", include("polls.urls")),
     path("accounts/", include("accounts.urls")),
     path("admin/", admin.site.urls),
-    path("schema/", Schema.as_view()),
-] + debug_toolbar_urls()
+    path("internal/cache/", cache_stats, name="cache-stats"),
+    path("internal/middleware/", middleware_timings, name="middleware-timings"),
+    path("internal/metrics/", request_metrics, name="request-metrics"),
+]
+
+# the dev settings profile only
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    from debug_toolbar.toolbar import debug_toolbar_urls
+    from schema_graph.views import Schema
+
+    urlpatterns += [path("schema/", Schema.as_view())] + debug_toolbar_urls()
 
 urlpatterns = urlpatterns + static(MEDIA_URL, document_root=MEDIA_ROOT)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from mysite.instrumentation import cache_tier_stats, metrics
+from mysite.timing import histogram, timing_enabled
+
+
+@never_cache
+@staff_member_required
+def cache_stats(request) -> JsonResponse:
+    """
+    expose the hit/miss counters of every cache alias that keeps them
+
+    :param request: HttpRequest
+    :return: JsonResponse
+    """
+    return JsonResponse(cache_tier_stats())
+
+
+@never_cache
+@staff_member_required
+def middleware_timings(request) -> JsonResponse:
+    """
+    expose the per middleware wall time histograms of this process, recorded
+    with the bench settings profile; ?reset=1 clears them after reading
+
+    :param request: HttpRequest
+    :return: JsonResponse
+    """
+    layers = histogram.snapshot()
+    if request.GET.get("reset"):
+        histogram.reset()
+    return JsonResponse({"enabled": timing_enabled(), "layers": layers})
+
+
+@never_cache
+def request_metrics(request) -> HttpResponse:
+    """
+    expose the sampled per url name request metrics of this process as json,
+    or as prometheus text with ?format=prometheus; staff or a bearer
+    INSTRUMENTATION_TOKEN may read them
+
+    :param request: HttpRequest
+    :return: JsonResponse or HttpResponse
+    """
+    token = getattr(settings, "INSTRUMENTATION_TOKEN", "")
+    authorization = request.headers.get("Authorization", "")
+    if token and constant_time_compare(authorization, "Bearer %s" % token):
+        return _request_metrics(request)
+    return staff_member_required(_request_metrics)(request)
+
+
+def _request_metrics(request) -> HttpResponse:
+    if request.GET.get("format") == "prometheus":
+        return HttpResponse(
+            metrics.prometheus(), content_type="text/plain; version=0.0.4"
+        )
+    try:
+        recent = int(request.GET.get("recent", 50))
+    except ValueError:
+        recent = 50
+    return JsonResponse(metrics.snapshot(recent=max(recent, 0)))
@@ -1,13 +1,50 @@
 # -*- coding: utf-8 -*-
 from django.contrib import admin
 from polls.models import Question, Choice, Tag
+from polls.counters import compact_vote_shards
+from polls.reconcile import reconcile
+from polls.summaries import refresh_question_tags
 from polls.constants import (
     VOTE_RESET,
     CHOICE_TOTAL_VOTES_RESET_DESCRIPTION,
     QUESTION_TOTAL_VOTES_RESET_DESCRIPTION,
 )
-from django.contrib import messages
-from django.utils.translation import ngettext
+from django.utils import timezone
+from accounts.admin_actions import BulkUpdateAction
+from polls.admin_performance import PerformanceModelAdminMixin
+
+
+def reset_question_choices(question_ids):
+    compact_vote_shards(question_ids=question_ids)
+    # reset the choices too, so the totals stay their sum
+    Choice.objects.filter(question_id__in=question_ids).update(
+        votes=VOTE_RESET, modified=timezone.now()
+    )
+
+
+def reconcile_questions(question_ids):
+    reconcile(question_ids=question_ids)
+    # the reset bypasses the Question signals, so recompute their tags
+    refresh_question_tags(question_ids)
+
+
+def compact_choice_shards(choice_ids):
+    compact_vote_shards(question_ids=_choice_question_ids(choice_ids))
+
+
+def reconcile_choice_questions(choice_ids):
+    question_ids = _choice_question_ids(choice_ids)
+    # bring the question totals back in line with the reset choices
+    reconcile_questions(question_ids)
+    Question.objects.filter(id__in=question_ids).update(modified=timezone.now())
+
+
+def _choice_question_ids(choice_ids):
+    return list(
+        Choice.objects.filter(id__in=choice_ids)
+        .values_list("question_id", flat=True)
+        .distinct()
+    )
 
 
 @admin.register(Tag)
@@ -36,7 +73,7 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(PerformanceModelAdminMixin, admin.ModelAdmin):
     model = Question
     date_hierarchy = "created"
     search_fields = ["title"]
@@ -79,28 +116,19 @@ class QuestionAdmin(admin.ModelAdmin):
     search_fields = ["title"]
     list_filter = ["created", "modified"]
     ordering = ["-created"]
-    actions = ["mark_reset"]
-
-    @admin.action(description=QUESTION_TOTAL_VOTES_RESET_DESCRIPTION)
-    def mark_reset(self, request, queryset):
-        # for instance in queryset:
-        #     instance.total_votes = VOTE_RESET
-        #     instance.save(update_fields=["total_votes"])
-        updated = queryset.update(total_votes=VOTE_RESET)
-        self.message_user(
-            request,
-            ngettext(
-                "%d votes was successfully been reset.",
-                "%d votes were successfully been reset.",
-                updated,
-            )
-            % updated,
-            messages.SUCCESS,
+    actions = [
+        BulkUpdateAction(
+            "mark_reset",
+            QUESTION_TOTAL_VOTES_RESET_DESCRIPTION,
+            lambda: {"total_votes": VOTE_RESET, "modified": timezone.now()},
+            before_batch=reset_question_choices,
+            after_batch=reconcile_questions,
         )
+    ]
 
 
 @admin.register(Choice)
-class ChoiceAdmin(admin.ModelAdmin):
+class ChoiceAdmin(PerformanceModelAdminMixin, admin.ModelAdmin):
     model = Choice
     list_display = ["title", "votes", "created"]
     ordering = ["title"]
@@ -123,21 +151,12 @@ class ChoiceAdmin(admin.ModelAdmin):
     ]
     search_fields = ["title", "question__title"]
     filter = ["title"]
-    actions = ["mark_reset"]
-
-    @admin.action(description=CHOICE_TOTAL_VOTES_RESET_DESCRIPTION)
-    def mark_reset(self, request, queryset):
-        # for instantce in queryset:
-        #     instantce.votes = VOTE_RESET
-        #     instantce.save(update_fields=["votes"])
-        updated = queryset.update(votes=VOTE_RESET)
-        self.message_user(
-            request,
-            ngettext(
-                "%d vote was successfully been reset.",
-                "%d votes were successfully been reset.",
-                updated,
-            )
-            % updated,
-            messages.SUCCESS,
+    actions = [
+        BulkUpdateAction(
+            "mark_reset",
+            CHOICE_TOTAL_VOTES_RESET_DESCRIPTION,
+            lambda: {"votes": VOTE_RESET, "modified": timezone.now()},
+            before_batch=compact_choice_shards,
+            after_batch=reconcile_choice_questions,
         )
+    ]
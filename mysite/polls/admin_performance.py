@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from polls.constants import (
+    ADMIN_CHANGELIST_TEMPLATE,
+    ADMIN_COUNT_CACHE_KEY,
+    ADMIN_COUNT_CACHE_TIMEOUT,
+    ADMIN_CURSOR_VAR,
+    ADMIN_EXACT_COUNT_THRESHOLD,
+)
+from polls.pagination import paginate_by_cursor, parse_ordering
+
+
+def performance_mode() -> bool:
+    return getattr(settings, "POLLS_ADMIN_PERFORMANCE", True)
+
+
+def estimated_count(queryset) -> int:
+    """
+    Count rows without a full ``COUNT(*)`` on large tables.
+
+    An unfiltered queryset uses the planner statistics in
+    ``pg_class.reltuples`` on PostgreSQL and a cached count elsewhere. A
+    filtered one uses the planner's row estimate on PostgreSQL, and is
+    counted exactly when that estimate is small or on other databases.
+
+    :param queryset: The changelist queryset.
+    :return: The exact or estimated number of rows.
+    """
+    connection = connections[queryset.db]
+    model = queryset.model
+    if not queryset.query.where:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # -1 until the table is first analyzed
+            if row and row[0] >= ADMIN_EXACT_COUNT_THRESHOLD:
+                return row[0]
+            return queryset.count()
+        key = ADMIN_COUNT_CACHE_KEY.format(label=model._meta.label_lower)
+        return cache.get_or_set(key, queryset.count, ADMIN_COUNT_CACHE_TIMEOUT)
+    if connection.vendor == "postgresql":
+        plan = json.loads(queryset.explain(format="json"))
+        rows = int(plan[0]["Plan"]["Plan Rows"])
+        if rows >= ADMIN_EXACT_COUNT_THRESHOLD:
+            return rows
+    return queryset.count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose ``count`` comes from :func:`estimated_count`.
+    """
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList paging with a keyset cursor instead of OFFSET.
+
+    Used while the changelist is ordered by one non-null column plus the
+    primary key; ``next_page_url`` then links to the following page and
+    the page numbers are not shown. Other orderings, "show all", editable
+    lists and explicit ``?p=`` links fall back to the regular paginator.
+    """
+
+    keyset = False
+    next_page_url = None
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(ADMIN_CURSOR_VAR, None)
+        return lookup_params
+
+    def keyset_ordering(self, request):
+        # get_ordering() appends the queryset's own ordering, clear it
+        ordering = self.get_ordering(request, self.queryset.order_by())
+        if not ordering or not isinstance(ordering[0], str):
+            return None
+        keyset = parse_ordering(self.model, ordering[0])
+        pk_name = self.model._meta.pk.name
+        tie_breakers = {"pk", "-pk", pk_name, "-" + pk_name}
+        if keyset is None or not set(ordering[1:]) <= tie_breakers:
+            return None
+        return keyset
+
+    def get_results(self, request):
+        ordering = self.keyset_ordering(request)
+        if (
+            ordering is None
+            or self.show_all
+            or self.list_editable
+            or PAGE_VAR in request.GET
+        ):
+            return super().get_results(request)
+        paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        page = paginate_by_cursor(
+            self.queryset,
+            ordering,
+            request.GET.get(ADMIN_CURSOR_VAR, ""),
+            self.list_per_page,
+        )
+        self.keyset = True
+        if page.has_next():
+            self.next_page_url = self.get_query_string(
+                {ADMIN_CURSOR_VAR: page.next_cursor}, [PAGE_VAR]
+            )
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = page.object_list
+        self.can_show_all = False
+        self.multi_page = page.has_next()
+        self.paginator = paginator
+
+
+class PerformanceModelAdminMixin:
+    """
+    Admin performance mode for large tables, on while the
+    ``POLLS_ADMIN_PERFORMANCE`` setting is true: estimated counts, cached
+    date hierarchy buckets and keyset pagination.
+    """
+
+    def get_paginator(self, request, queryset, per_page, **kwargs):
+        if performance_mode():
+            return EstimatedCountPaginator(queryset, per_page, **kwargs)
+        return super().get_paginator(request, queryset, per_page, **kwargs)
+
+    def get_changelist(self, request, **kwargs):
+        if performance_mode():
+            return KeysetChangeList
+        return super().get_changelist(request, **kwargs)
+
+    @property
+    def show_full_result_count(self):
+        return not performance_mode()
+
+    @property
+    def change_list_template(self):
+        return ADMIN_CHANGELIST_TEMPLATE if performance_mode() else None
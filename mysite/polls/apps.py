@@ -5,3 +5,6 @@ from django.apps import AppConfig
 class PollsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "polls"
+
+    def ready(self):
+        from polls import signals  # noqa: F401
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import datetime
+from typing import Iterable, List, Optional
+
+from django.db.models import Count, DateField, F, Max, Min, Q, Value
+from django.db.models.functions import Greatest, Least, TruncMonth
+from django.utils import timezone
+
+from polls.models import ArchiveBucket, Question
+
+
+def archive_month(value: datetime.datetime) -> datetime.date:
+    """
+    First day of the month of a creation time, in the default time zone
+    the archive views use.
+    """
+    if timezone.is_aware(value):
+        value = timezone.localtime(value, timezone.get_default_timezone())
+    return value.date().replace(day=1)
+
+
+def get_archive_buckets(allow_future: bool = True) -> List[ArchiveBucket]:
+    """
+    Return the non-empty months of the archive in ascending order.
+
+    :param allow_future: Include months after the current one.
+    :return: List of ArchiveBucket.
+    """
+    buckets = ArchiveBucket.objects.filter(question_count__gt=0)
+    if not allow_future:
+        buckets = buckets.filter(month__lte=archive_month(timezone.now()))
+    return list(buckets.order_by("month"))
+
+
+def refresh_archive_buckets(
+    months: Optional[Iterable[datetime.date]] = None,
+) -> int:
+    """
+    Recompute archive buckets with one grouped query over the questions.
+
+    :param months: Only refresh these months; all months when None.
+    :return: The number of buckets written.
+    """
+    questions = Question.objects.all()
+    buckets = ArchiveBucket.objects.all()
+    if months is not None:
+        months = sorted(set(months))
+        in_months = Q()
+        for month in months:
+            in_months |= Q(
+                created__gte=_month_start(month), created__lt=_month_end(month)
+            )
+        questions = questions.filter(in_months)
+        buckets = buckets.filter(month__in=months)
+    rows = (
+        questions.annotate(
+            month=TruncMonth(
+                "created",
+                output_field=DateField(),
+                tzinfo=timezone.get_default_timezone(),
+            )
+        )
+        .order_by()
+        .values("month")
+        .annotate(count=Count("id"), first_id=Min("id"), last_id=Max("id"))
+        .values_list("month", "count", "first_id", "last_id")
+    )
+    refreshed = [
+        ArchiveBucket(
+            month=month, question_count=count, first_id=first_id, last_id=last_id
+        )
+        for month, count, first_id, last_id in rows
+    ]
+    buckets.exclude(month__in=[bucket.month for bucket in refreshed]).delete()
+    ArchiveBucket.objects.bulk_create(
+        refreshed,
+        update_conflicts=True,
+        unique_fields=["month"],
+        update_fields=["question_count", "first_id", "last_id"],
+    )
+    return len(refreshed)
+
+
+def question_archived(question_id: int, created: datetime.datetime) -> None:
+    """
+    Count a question in the month it was created.
+    """
+    month = archive_month(created)
+    updated = ArchiveBucket.objects.filter(month=month).update(
+        question_count=F("question_count") + 1,
+        first_id=Least("first_id", Value(question_id)),
+        last_id=Greatest("last_id", Value(question_id)),
+    )
+    if not updated:
+        refresh_archive_buckets([month])
+
+
+def question_unarchived(created: datetime.datetime) -> None:
+    """
+    Discount a deleted or re-dated question, dropping emptied months.
+    """
+    month = archive_month(created)
+    ArchiveBucket.objects.filter(month=month).update(
+        question_count=F("question_count") - 1
+    )
+    ArchiveBucket.objects.filter(month=month, question_count__lte=0).delete()
+
+
+def _month_start(month: datetime.date) -> datetime.datetime:
+    return timezone.make_aware(
+        datetime.datetime(month.year, month.month, 1),
+        timezone.get_default_timezone(),
+    )
+
+
+def _month_end(month: datetime.date) -> datetime.datetime:
+    if month.month == 12:
+        return _month_start(datetime.date(month.year + 1, 1, 1))
+    return _month_start(datetime.date(month.year, month.month + 1, 1))
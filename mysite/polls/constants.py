@@ -35,7 +35,15 @@ THUMBNAIL_PREVIEW_HTML = """<div class="warning" style="color:#000;width: 320px;
 
 
 # Errors
+POLL_IMPORT_CONTENT_TYPE_ERROR = (
+    "Upload polls as text/csv, application/json or application/x-ndjson"
+)
+POLL_IMPORT_ROW_ERROR = "Invalid poll at row {row}"
+LIVE_TALLY_QUESTIONS_ERROR = "Pass the Question ids to watch as ?questions=1,2,3"
+LIVE_TALLY_DISABLED_ERROR = "Live tallies need POLLS_LIVE_TALLIES and the ASGI server"
 PASSWORD_VALIDATION_ERROR = "Password Format Incorrect"
+VOTE_CHOICE_MISMATCH_ERROR = "Choice does not belong to the voted Question"
+VOTE_REQUEST_ERROR = "Invalid Vote Request"
 
 # Templates
 HOME_TEMPLATE = "polls/home.html"
@@ -47,6 +55,23 @@ HOME_URL = "/polls"
 # Context Object Name
 QUESTION_CONTEXT = "questions"
 
+# Index Orderings
+# orderby parameter -> (field, descending). Every field is paired with id in a
+# composite index (see Question.Meta.indexes) so both the sort and the keyset
+# cursor are index scans; None keeps the unindexed random ordering.
+DEFAULT_QUESTION_ORDERING = "-created"
+QUESTION_ORDERINGS = {
+    "-created": ("created", True),
+    "created": ("created", False),
+    "-total_votes": ("total_votes", True),
+    "total_votes": ("total_votes", False),
+    "?": None,
+}
+
+# Index Pagination Modes
+PAGINATION_CURSOR = "cursor"
+PAGINATION_OFFSET = "offset"
+
 # Form Label Constants
 POLL_TITLE_LABEL = "enter poll question"
 POLL_IMAGE_LABEL = "enter question image"
@@ -63,3 +88,129 @@ POLL_TAG_HELP_TEXT = "If not choose Tag will be choose automatically"
 POLLS_TITLE_PLACEHOLDER = "Please Enter Poll"
 POLLS_IMAGE_PLACEHOLDER = "Choose Image File"
 POLLS_TAG_PLACEHOLDER = "Please Choose Tag"
+
+# Vote Ingest Modes
+
+VOTE_MODE_DIRECT = "direct"
+VOTE_MODE_BUFFERED = "buffered"
+VOTE_MODE_SHARDED = "sharded"
+
+# Vote Buffer Defaults
+
+VOTE_BUFFER_FLUSH_INTERVAL = 1.0
+VOTE_BUFFER_MAX_PENDING = 500
+
+# Vote Shard Defaults
+
+VOTE_SHARDS = 8
+VOTE_SHARD_COMPACT_BATCH_SIZE = 500
+
+# Vote SQL
+# Increment the choice and its question in one statement; returns no row when
+# the choice does not belong to the question.
+
+VOTE_INCREMENT_RETURNING_SQL = """
+WITH voted AS (
+    UPDATE {choice_table} SET votes = votes + 1
+    WHERE id = %s AND question_id = %s
+    RETURNING question_id
+)
+UPDATE {question_table} SET total_votes = total_votes + 1
+WHERE id = (SELECT question_id FROM voted)
+RETURNING total_votes
+"""
+
+# Live Tally Stream
+
+LIVE_TALLY_INTERVAL_MS = 500
+LIVE_TALLY_QUEUE_SIZE = 32
+LIVE_TALLY_MAX_QUESTIONS = 200
+LIVE_TALLY_KEEPALIVE_SECONDS = 15
+LIVE_TALLY_EVENT = "event: tally\ndata: {data}\n\n"
+LIVE_TALLY_KEEPALIVE = ": keep-alive\n\n"
+
+# Tag Summary Cache
+
+TAG_SUMMARY_CACHE_KEY = "polls:tag-summaries"
+TAG_SUMMARY_CACHE_TIMEOUT = 60 * 60
+
+# Poll Import
+
+POLL_IMPORT_CHUNK_SIZE = 500
+POLL_IMPORT_CHOICE_SEPARATOR = "|"
+POLL_IMPORT_CSV_TYPES = ("text/csv",)
+POLL_IMPORT_JSONL_TYPES = ("application/x-ndjson", "application/jsonl")
+POLL_IMPORT_JSON_TYPES = ("application/json",)
+
+# Seed Data
+
+SEED_TAGS = [
+    "anime",
+    "bollywood",
+    "art",
+    "books",
+    "comics",
+    "dating",
+    "relationship",
+    "pride",
+    "indian",
+    "festival",
+    "gaming",
+    "finance",
+    "money",
+    "holiday",
+    "news",
+    "nature",
+    "religion",
+    "sports",
+    "shopping",
+    "travel",
+    "technology",
+    "school",
+    "college",
+    "miscellaneous",
+]
+SEED_QUESTION_TITLE = "Sample Poll Question {index}"
+SEED_CHOICE_TITLE = "Option {index}{letter}"
+SEED_QUESTIONS = 1_000_000
+SEED_CHOICES = 4
+SEED_BATCH_SIZE = 5000
+SEED_CREATED_SPREAD_DAYS = 365
+SEED_MAX_VOTES = 50
+
+# Vote Reconciliation
+
+RECONCILE_BATCH_SIZE = 5000
+RECONCILE_WATERMARK_KEY = "polls:reconcile-watermark"
+# Seconds the watermark is moved back to cover transactions still running.
+RECONCILE_WATERMARK_SKEW = 60
+
+# Admin Performance Mode
+
+ADMIN_CHANGELIST_TEMPLATE = "admin/polls/change_list.html"
+ADMIN_CURSOR_VAR = "cursor"
+ADMIN_COUNT_CACHE_KEY = "polls:admin-count:{label}"
+ADMIN_COUNT_CACHE_TIMEOUT = 60
+# Below this many estimated rows an exact COUNT(*) is cheap enough.
+ADMIN_EXACT_COUNT_THRESHOLD = 10_000
+ADMIN_DATE_HIERARCHY_CACHE_KEY = "polls:admin-dates:{label}:{query}"
+ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT = 5 * 60
+
+# Poll Search
+# Full-text index of question titles, descriptions and choice titles, a GIN
+# indexed tsvector table on PostgreSQL and an FTS5 table on SQLite.
+SEARCH_PARAM = "q"
+SEARCH_TABLE = "polls_question_search"
+SEARCH_TEXT_CONFIG = "english"
+SEARCH_MAX_TERMS = 8
+SEARCH_RANK_CANDIDATES = 10_000
+SEARCH_BACKFILL_BATCH_SIZE = 1000
+
+# Choice Shuffle Seeds
+CHOICE_SHUFFLE_DAY = "day"
+CHOICE_SHUFFLE_SESSION = "session"
+
+# Archive Buckets
+# The archive views narrow a month to the id range of its bucket only while
+# the range holds at most this many ids per question of the month.
+ARCHIVE_ID_RANGE_SPREAD = 2
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import random
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from polls.constants import VOTE_SHARDS, VOTE_SHARD_COMPACT_BATCH_SIZE
+from polls.models import Choice, Question, VoteShard
+from polls.summaries import votes_added
+
+
+def grouped_increment(model, field: str, deltas: Dict[int, int]) -> int:
+    """
+    Add a per-row delta to ``field`` for many rows with a single UPDATE.
+
+    :param model: Model class to update.
+    :param field: Name of the integer counter field.
+    :param deltas: Mapping of primary key to the amount to add.
+    :return: Number of updated rows.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    increment = Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return model.objects.filter(pk__in=sorted(deltas)).update(
+        **{field: F(field) + increment}
+    )
+
+
+def shard_count() -> int:
+    return getattr(settings, "POLLS_VOTE_SHARDS", VOTE_SHARDS)
+
+
+def increment_sharded(question_id: int, choice_id: int) -> bool:
+    """
+    Count one vote on a randomly picked shard of the choice.
+
+    The shard row carries the question id, so a choice voted under the wrong
+    question matches no row and is never created.
+
+    :param question_id: The ID of the voted Question.
+    :param choice_id: The ID of the voted Choice.
+    :return: False if the choice does not belong to the question.
+    """
+    shard = random.randrange(shard_count())
+    shards = VoteShard.objects.filter(
+        choice_id=choice_id, question_id=question_id, shard=shard
+    )
+    if shards.update(votes=F("votes") + 1):
+        return True
+    if not Choice.objects.filter(id=choice_id, question_id=question_id).exists():
+        return False
+    try:
+        with transaction.atomic():
+            VoteShard.objects.create(
+                question_id=question_id, choice_id=choice_id, shard=shard, votes=1
+            )
+    except IntegrityError:
+        # Another request created the shard first.
+        shards.update(votes=F("votes") + 1)
+    return True
+
+
+def compact_vote_shards(
+    question_ids: Optional[Iterable[int]] = None,
+    batch_size: int = VOTE_SHARD_COMPACT_BATCH_SIZE,
+) -> int:
+    """
+    Fold shard counts back into ``Choice.votes`` and ``Question.total_votes``,
+    and the question deltas into the tag summaries.
+
+    Each batch moves the counts it read from the shards to the canonical
+    columns in one transaction. Shards are decremented by the folded amount
+    rather than deleted, so votes landing on a shard meanwhile are kept.
+
+    :param question_ids: Only compact these questions; all when None.
+    :param batch_size: Number of questions folded per transaction.
+    :return: The number of votes folded.
+    """
+    pending = VoteShard.objects.exclude(votes=0)
+    if question_ids is not None:
+        pending = pending.filter(question_id__in=list(question_ids))
+    ids = sorted(set(pending.values_list("question_id", flat=True)))
+    folded = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start : start + batch_size]
+        with transaction.atomic():
+            rows = list(
+                VoteShard.objects.filter(question_id__in=batch)
+                .exclude(votes=0)
+                .values_list("id", "question_id", "choice_id", "votes")
+            )
+            choice_deltas, question_deltas = Counter(), Counter()
+            for _, question_id, choice_id, votes in rows:
+                choice_deltas[choice_id] += votes
+                question_deltas[question_id] += votes
+            grouped_increment(Choice, "votes", choice_deltas)
+            grouped_increment(Question, "total_votes", question_deltas)
+            votes_added(question_deltas)
+            grouped_increment(
+                VoteShard, "votes", {pk: -votes for pk, _, _, votes in rows}
+            )
+            folded += sum(choice_deltas.values())
+    return folded
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from polls.constants import LIVE_TALLY_INTERVAL_MS, LIVE_TALLY_QUEUE_SIZE
+from polls.utils import serialize_data_set_for_ajax_update
+
+logger = logging.getLogger(__name__)
+
+Update = Tuple[int, Dict[str, Any]]
+
+
+def live_tallies_enabled() -> bool:
+    """
+    Whether the tally stream is served, see ``POLLS_LIVE_TALLIES``.
+    """
+    return bool(getattr(settings, "POLLS_LIVE_TALLIES", False))
+
+
+class TallyHub:
+    """
+    In-process fan-out of live vote tallies to server-sent event streams.
+
+    Votes only mark their question as dirty. Every ``interval`` seconds the
+    hub reads each dirty question that somebody is watching once and pushes
+    that tally to all of its subscribers, so a burst of votes costs one
+    database read per question and tick regardless of the subscriber count.
+    The hub is local to the worker process and stands in for a shared broker.
+    """
+
+    def __init__(
+        self,
+        interval: float = LIVE_TALLY_INTERVAL_MS / 1000,
+        read: Callable[[int], Dict[str, Any]] = serialize_data_set_for_ajax_update,
+        queue_size: int = LIVE_TALLY_QUEUE_SIZE,
+    ):
+        self.interval = interval
+        self.queue_size = queue_size
+        self._read = read
+        self._lock = threading.Lock()
+        self._dirty: Set[int] = set()
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._task = None
+
+    @classmethod
+    def from_settings(cls) -> "TallyHub":
+        interval = getattr(settings, "POLLS_LIVE_TALLY_INTERVAL_MS", None)
+        return cls(interval=(interval or LIVE_TALLY_INTERVAL_MS) / 1000)
+
+    def publish(self, question_id: int) -> None:
+        """
+        Mark a question's tally as changed. Safe to call from sync views.
+
+        :param question_id: The ID of the voted Question.
+        """
+        with self._lock:
+            self._dirty.add(int(question_id))
+
+    def subscribe(self, question_ids: Iterable[int]) -> asyncio.Queue:
+        """
+        Register a subscriber for the given questions.
+
+        Must be called from the event loop serving the stream; the broadcast
+        task is started on that loop when it is not running yet.
+
+        :param question_ids: IDs of the questions to watch.
+        :return: Queue receiving (question id, tally) updates.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            for question_id in question_ids:
+                self._subscribers[question_id].add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, question_ids: Iterable[int]) -> None:
+        with self._lock:
+            for question_id in question_ids:
+                subscribers = self._subscribers.get(question_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[question_id]
+
+    async def broadcast(self) -> int:
+        """
+        Push the current tally of every dirty, watched question.
+
+        :return: The number of questions read.
+        """
+        with self._lock:
+            dirty = [
+                question_id
+                for question_id in self._dirty
+                if question_id in self._subscribers
+            ]
+            self._dirty.clear()
+        for question_id in dirty:
+            tally = await sync_to_async(self._read)(question_id)
+            with self._lock:
+                subscribers = list(self._subscribers.get(question_id, ()))
+            for queue in subscribers:
+                _offer(queue, (question_id, tally))
+        return len(dirty)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            with self._lock:
+                if not self._subscribers:
+                    self._task = None
+                    return
+            try:
+                await self.broadcast()
+            except Exception:
+                logger.exception("Live tally broadcast failed")
+
+
+def _offer(queue: asyncio.Queue, update: Update) -> None:
+    """
+    Queue an update, dropping the oldest one for slow subscribers.
+    """
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(update)
+
+
+tally_hub = TallyHub.from_settings()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR, SEARCH_VAR
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from accounts.models import User
+from polls.constants import ADMIN_CURSOR_VAR
+from polls.models import Choice, Question
+from polls.pagination import encode_cursor
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the Question and Choice admin changelists with and without "
+        "POLLS_ADMIN_PERFORMANCE. The tables are topped up with seed_polls "
+        "first, and those rows are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1_000_000,
+            help="Seed sample questions up to this many",
+        )
+        parser.add_argument(
+            "--depth",
+            type=int,
+            default=1000,
+            help="Page number of the deep page timing",
+        )
+        parser.add_argument(
+            "--search", default="Question 4242", help="Search term to time"
+        )
+
+    def handle(self, *args, **options):
+        if options["rows"]:
+            call_command("seed_polls", questions=options["rows"], stdout=self.stdout)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for model in (Question, Choice):
+                    cursor.execute("ANALYZE %s" % model._meta.db_table)
+        self.factory = RequestFactory()
+        self.user = User(is_active=True, is_staff=True, is_superuser=True)
+        for model in (Question, Choice):
+            model_admin = admin.site._registry[model]
+            self.stdout.write(self.style.MIGRATE_HEADING(model._meta.label))
+            for enabled in (False, True):
+                with override_settings(POLLS_ADMIN_PERFORMANCE=enabled):
+                    cache.clear()
+                    self.bench(model_admin, options, enabled)
+
+    def bench(self, model_admin, options, enabled):
+        mode = "performance" if enabled else "default"
+        depth = options["depth"]
+        self.report(mode, "first page", model_admin, {})
+        self.report(mode, "page %d" % depth, model_admin, {PAGE_VAR: depth - 1})
+        if enabled:
+            cursor = self.cursor_at(model_admin, depth * model_admin.list_per_page)
+            if cursor:
+                self.report(
+                    mode,
+                    "page %d by cursor" % depth,
+                    model_admin,
+                    {ADMIN_CURSOR_VAR: cursor},
+                )
+        self.report(mode, "search", model_admin, {SEARCH_VAR: options["search"]})
+        if model_admin.date_hierarchy:
+            field = model_admin.date_hierarchy
+            latest = model_admin.model.objects.order_by("-%s" % field).first()
+            if latest is not None:
+                value = getattr(latest, field)
+                params = {"%s__year" % field: value.year}
+                self.report(mode, "year drill-down", model_admin, params)
+                params["%s__month" % field] = value.month
+                self.report(mode, "month drill-down", model_admin, params)
+                self.report(mode, "month drill-down (warm)", model_admin, params)
+
+    def cursor_at(self, model_admin, offset):
+        field = model_admin.get_ordering(None)[0].lstrip("-")
+        row = (
+            model_admin.get_queryset(None)
+            .order_by(*model_admin.get_ordering(None), "-pk")
+            .values_list(field, "pk")[offset : offset + 1]
+            .first()
+        )
+        return encode_cursor(*row) if row else None
+
+    def report(self, mode, label, model_admin, params):
+        request = self.factory.get("/", params)
+        request.user = self.user
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            model_admin.changelist_view(request).render()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "%-12s %-26s %10.1f ms %4d queries"
+            % (mode, label, elapsed * 1000, len(queries))
+        )
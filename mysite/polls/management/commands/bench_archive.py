@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory
+from django.views.generic import ArchiveIndexView, MonthArchiveView, YearArchiveView
+
+from polls.models import ArchiveBucket, Question
+from polls.views import (
+    QuestionArchiveIndexView,
+    QuestionMonthArchiveView,
+    QuestionYearArchiveView,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time archive navigation with the generic date views against the "
+        "ArchiveBucket backed ones. The questions table is topped up with "
+        "seed_polls first, and those rows are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1_000_000,
+            help="Seed sample questions up to this many",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per page, the best is kept"
+        )
+
+    def handle(self, *args, **options):
+        if options["rows"]:
+            call_command("seed_polls", questions=options["rows"], stdout=self.stdout)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        bucket = ArchiveBucket.objects.order_by("-question_count").first()
+        if bucket is None:
+            self.stdout.write("No questions to archive")
+            return
+        self.stdout.write(
+            "%d questions, %d months"
+            % (Question.objects.count(), ArchiveBucket.objects.count())
+        )
+        self.factory = RequestFactory()
+        self.user = AnonymousUser()
+        generic = {"date_field": "created", "queryset": Question.objects.all()}
+        year = {"year": bucket.month.year}
+        month = {"year": bucket.month.year, "month": bucket.month.strftime("%b")}
+        pages = [
+            (
+                "index",
+                ArchiveIndexView.as_view(
+                    paginate_by=100, context_object_name="latest", **generic
+                ),
+                QuestionArchiveIndexView.as_view(),
+                {},
+            ),
+            (
+                "year",
+                YearArchiveView.as_view(
+                    make_object_list=True, paginate_by=10, **generic
+                ),
+                QuestionYearArchiveView.as_view(),
+                year,
+            ),
+            (
+                "month",
+                MonthArchiveView.as_view(paginate_by=10, **generic),
+                QuestionMonthArchiveView.as_view(),
+                month,
+            ),
+        ]
+        for label, generic_view, bucketed, kwargs in pages:
+            self.report("generic", label, generic_view, kwargs, options["repeat"])
+            self.report("buckets", label, bucketed, kwargs, options["repeat"])
+
+    def report(self, mode, label, view, kwargs, repeat):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        timings = []
+        for _ in range(repeat):
+            request = self.factory.get("/")
+            request.user = self.user
+            queries.clear()
+            with connection.execute_wrapper(count):
+                started = time.perf_counter()
+                try:
+                    view(request, **kwargs).render()
+                except Http404:
+                    pass
+                timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            "%-8s %-6s %10.1f ms %4d queries"
+            % (mode, label, min(timings) * 1000, len(queries))
+        )
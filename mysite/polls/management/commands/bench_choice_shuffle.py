@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import random
+import timeit
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from polls.models import Choice, Question
+from polls.templatetags.shuffle import shuffle
+
+
+def legacy_shuffle(arg):
+    # the filter before seeded shuffling
+    tmp = list(arg)
+    random.shuffle(tmp)
+    return tmp
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark the unseeded list shuffle against the seeded one, "
+        "alone and in a template for loop. No database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10, 100],
+            help="Choices per question",
+        )
+        parser.add_argument(
+            "--number", type=int, default=10_000, help="Shuffles per timing"
+        )
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        loop = Template(
+            "{% load shuffle %}{% for choice in choices %}{{ choice.title }}{% endfor %}"
+        )
+        for size in options["sizes"]:
+            question = Question(id=1, title="Bench Question")
+            choices = [
+                Choice(id=index, question=question, title="Choice %d" % index)
+                for index in range(size)
+            ]
+            self.stdout.write(self.style.MIGRATE_HEADING("%d choices" % size))
+            shuffles = {
+                "random list copy": lambda: legacy_shuffle(choices),
+                "seeded list copy": lambda: shuffle(choices, "2026-10-18:1"),
+            }
+            for label, run in shuffles.items():
+                iterate = timeit.timeit(lambda: sum(1 for _ in run()), number=number)
+                render = timeit.timeit(
+                    lambda: loop.render(Context({"choices": run()})),
+                    number=number // 10,
+                )
+                tracemalloc.start()
+                for _ in run():
+                    pass
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(
+                    "%-18s %8.2f us/iterate %8.2f us/render %8d B peak"
+                    % (
+                        label,
+                        iterate / number * 1e6,
+                        render / (number // 10) * 1e6,
+                        peak,
+                    )
+                )
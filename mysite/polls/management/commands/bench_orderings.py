@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from polls.constants import QUESTION_ORDERINGS
+from polls.models import Question, Tag
+from polls.pagination import ordering_fields, paginate_by_cursor
+
+BENCH_TAG = "bench-ordering"
+SEED_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Print query plans and timings of every registered IndexView ordering. "
+        "Synthetic rows are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=100_000,
+            help="Top the questions table up to this many rows for the run",
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=100,
+            help="Scroll depth, in pages of 10, for the deep page timing",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tag = self.seed(options["rows"])
+            for key, ordering in QUESTION_ORDERINGS.items():
+                for tag_title in (None, tag.title):
+                    self.report(key, ordering, tag_title, options["pages"])
+            transaction.set_rollback(True)
+
+    def seed(self, rows: int) -> Tag:
+        tag = Tag.objects.create(title=BENCH_TAG)
+        missing = rows - Question.objects.count()
+        for offset in range(0, max(missing, 0), SEED_BATCH_SIZE):
+            Question.objects.bulk_create(
+                Question(
+                    title="Bench Question %d" % index,
+                    total_votes=random.randrange(10_000),
+                    tag=tag if index % 10 == 0 else None,
+                )
+                for index in range(offset, min(offset + SEED_BATCH_SIZE, missing))
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE %s" % Question._meta.db_table)
+        self.stdout.write("Questions: %d" % Question.objects.count())
+        return tag
+
+    def report(self, key, ordering, tag_title, pages):
+        queryset = Question.objects.filter(created__lte=timezone.now())
+        if tag_title:
+            tag_ids = Tag.objects.filter(title=tag_title).values_list("id", flat=True)
+            queryset = queryset.filter(tag_id__in=list(tag_ids))
+        label = "orderby=%s tag=%s" % (key, tag_title or "-")
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+
+        if ordering is None:
+            page = queryset.order_by(*ordering_fields(ordering))[:10]
+            started = time.perf_counter()
+            list(page)
+            self.stdout.write("first page: %.2f ms" % _ms(started))
+            self.stdout.write(page.explain())
+            return
+
+        cursor = ""
+        for number in range(1, pages + 1):
+            started = time.perf_counter()
+            result = paginate_by_cursor(queryset, ordering, cursor, 10)
+            elapsed = _ms(started)
+            if number == 1:
+                self.stdout.write("first page: %.2f ms" % elapsed)
+            if not result.has_next():
+                break
+            cursor = result.next_cursor
+        self.stdout.write("page %d: %.2f ms" % (number, elapsed))
+
+        field, descending = ordering
+        deep = queryset.order_by(*ordering_fields(ordering))
+        if result.object_list:
+            last = result.object_list[-1]
+            lookup = "lt" if descending else "gt"
+            deep = deep.filter(**{"%s__%s" % (field, lookup): getattr(last, field)})
+        self.stdout.write(deep[:11].explain())
+
+
+def _ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from polls.models import Choice, Question, Tag
+from polls.services import create_poll, import_polls
+
+BENCH_TAG = "bench-poll-creation"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare creating polls one INSERT per choice against the bulk "
+        "create_poll and import_polls paths. Rows are committed like in "
+        "production and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10, 100, 10_000],
+            help="Numbers of polls to create per run",
+        )
+        parser.add_argument("--choices", type=int, default=4, help="Choices per poll")
+
+    def handle(self, *args, **options):
+        tag = Tag.objects.create(title=BENCH_TAG)
+        try:
+            for size in options["sizes"]:
+                polls = [
+                    {
+                        "title": "Bench Poll %d" % index,
+                        "tag": BENCH_TAG,
+                        "choices": [
+                            "Choice %d" % number for number in range(options["choices"])
+                        ],
+                    }
+                    for index in range(size)
+                ]
+                self.stdout.write(self.style.MIGRATE_HEADING("%d polls" % size))
+                self.report("per choice create", lambda: self.legacy(tag, polls))
+                self.report("create_poll", lambda: self.service(tag, polls))
+                self.report("import_polls", lambda: import_polls(polls))
+        finally:
+            tag.delete()
+
+    def legacy(self, tag, polls):
+        for poll in polls:
+            question = Question.objects.create(title=poll["title"], tag=tag)
+            for title in poll["choices"]:
+                Choice.objects.create(question=question, title=title)
+
+    def service(self, tag, polls):
+        for poll in polls:
+            create_poll(Question(title=poll["title"], tag=tag), poll["choices"])
+
+    def report(self, label, run):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "%-18s %10.1f ms %8d queries" % (label, elapsed * 1000, len(queries))
+        )
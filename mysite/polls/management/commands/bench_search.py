@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from polls.models import Question
+from polls.search import get_search_backend, search_questions
+
+
+class Command(BaseCommand):
+    help = (
+        "Time poll search queries through the full-text index. The "
+        "questions table is topped up with seed_polls first, and those rows "
+        "are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1_000_000,
+            help="Seed sample questions up to this many",
+        )
+        parser.add_argument(
+            "--queries",
+            nargs="+",
+            default=["question 4242", "option 4242b", "4242", "poll"],
+            help="Search texts to time",
+        )
+        parser.add_argument(
+            "--pages", type=int, default=3, help="Pages of 10 read per query"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per page, the best is kept"
+        )
+
+    def handle(self, *args, **options):
+        if options["rows"]:
+            call_command("seed_polls", questions=options["rows"], stdout=self.stdout)
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError("The search index is not migrated on this database")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        self.stdout.write(
+            "%s, %d questions" % (type(backend).__name__, Question.objects.count())
+        )
+        queryset = Question.objects.all()
+        for query in options["queries"]:
+            for page in range(options["pages"]):
+                timings = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    results = search_questions(queryset, query, 10, page * 10)
+                    timings.append(time.perf_counter() - started)
+                self.stdout.write(
+                    "%-20s page %d %8.1f ms %3d results"
+                    % (query, page + 1, min(timings) * 1000, len(results))
+                )
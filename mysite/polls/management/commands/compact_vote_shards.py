@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from polls.constants import VOTE_SHARD_COMPACT_BATCH_SIZE
+from polls.counters import compact_vote_shards
+
+
+class Command(BaseCommand):
+    help = "Fold sharded vote counts back into Choice.votes and Question.total_votes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=VOTE_SHARD_COMPACT_BATCH_SIZE,
+            help="Number of questions compacted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        folded = compact_vote_shards(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Folded %d votes" % folded))
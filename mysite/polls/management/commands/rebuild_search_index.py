@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from polls.search import create_search_index, drop_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the poll search index from scratch, e.g. after loading "
+        "fixtures or bulk inserts that bypassed index_questions."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drop_search_index(connection)
+            create_search_index(connection)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the poll search index"))
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from polls.constants import RECONCILE_BATCH_SIZE
+from polls.reconcile import reconcile, reconcile_recent
+
+
+class Command(BaseCommand):
+    help = (
+        "Repair Question.total_votes rows that drifted from the sum of their "
+        "choices' votes. Checks questions modified since the previous run "
+        "unless --full is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Check every question")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=RECONCILE_BATCH_SIZE,
+            help="Questions checked per aggregate query",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report drift without repairing"
+        )
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            report = reconcile(
+                batch_size=options["batch_size"], dry_run=options["dry_run"]
+            )
+        else:
+            report = reconcile_recent(
+                batch_size=options["batch_size"], dry_run=options["dry_run"]
+            )
+        self.stdout.write(
+            "Checked %(checked)d questions since %(since)s: %(drifted)d drifted "
+            "by %(drift)d votes, %(repaired)d repaired in %(duration).2fs"
+            % report.as_dict()
+        )
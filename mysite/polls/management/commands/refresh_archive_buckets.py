@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from polls.archive import refresh_archive_buckets
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-month question archive buckets, e.g. after loading "
+        "fixtures or bulk inserts that send no signals."
+    )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_archive_buckets()
+        self.stdout.write(
+            self.style.SUCCESS("Refreshed %d archive buckets" % refreshed)
+        )
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from polls.summaries import refresh_tag_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the precomputed per-tag question counts and vote totals. "
+        "Votes are counted with queryset updates, so run this periodically."
+    )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_tag_summaries()
+        self.stdout.write(self.style.SUCCESS("Refreshed %d tag summaries" % refreshed))
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import csv
+import datetime
+import io
+import random
+import string
+import time
+from itertools import islice
+from typing import Iterator, List, Sequence, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from polls.constants import (
+    SEED_BATCH_SIZE,
+    SEED_CHOICE_TITLE,
+    SEED_CHOICES,
+    SEED_CREATED_SPREAD_DAYS,
+    SEED_MAX_VOTES,
+    SEED_QUESTION_TITLE,
+    SEED_QUESTIONS,
+    SEED_TAGS,
+)
+from polls.archive import refresh_archive_buckets
+from polls.models import Choice, Question, Tag
+from polls.search import index_questions
+from polls.summaries import refresh_tag_summaries
+
+# (index, tag id, created, votes of each choice)
+SeedRow = Tuple[int, int, datetime.datetime, List[int]]
+
+METHOD_BULK = "bulk"
+METHOD_COPY = "copy"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed sample polls with their choices. Every batch is committed on "
+        "its own, so an interrupted run resumes where it stopped when run "
+        "again with the same --questions target."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--questions",
+            type=int,
+            default=SEED_QUESTIONS,
+            help="Total number of sample questions to end up with",
+        )
+        parser.add_argument(
+            "--choices", type=int, default=SEED_CHOICES, help="Choices per question"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help="Questions inserted per transaction",
+        )
+        parser.add_argument(
+            "--method",
+            choices=[METHOD_BULK, METHOD_COPY],
+            default=METHOD_BULK,
+            help="Insert with bulk_create, or COPY on PostgreSQL",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=None, help="Random seed for the data"
+        )
+
+    def handle(self, *args, **options):
+        if options["method"] == METHOD_COPY and connection.vendor != "postgresql":
+            raise CommandError("--method copy requires PostgreSQL")
+        self.choices = options["choices"]
+        self.random = random.Random(options["seed"])
+        self.now = timezone.now()
+        tag_ids = self.load_tags()
+
+        prefix = SEED_QUESTION_TITLE.format(index="")
+        start = Question.objects.filter(title__startswith=prefix).count()
+        target = options["questions"]
+        if start >= target:
+            self.stdout.write("%d sample questions already seeded" % start)
+            return
+        self.stdout.write("Seeding questions %d to %d" % (start + 1, target))
+
+        write = self.copy_batch if options["method"] == METHOD_COPY else self.bulk_batch
+        rows = self.generate(start, target, tag_ids)
+        seeded = inserted = 0
+        started = time.perf_counter()
+        while True:
+            batch = list(islice(rows, options["batch_size"]))
+            if not batch:
+                break
+            with transaction.atomic():
+                write(batch)
+            seeded += len(batch)
+            inserted += len(batch) * (1 + self.choices)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                "%d/%d questions, %d rows/sec"
+                % (start + seeded, target, inserted / elapsed)
+            )
+
+        refresh_tag_summaries(tag_ids)
+        refresh_archive_buckets()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Inserted %d rows in %.1fs (%d rows/sec)"
+                % (inserted, elapsed, inserted / elapsed)
+            )
+        )
+
+    def load_tags(self) -> List[int]:
+        tags = dict(Tag.objects.filter(title__in=SEED_TAGS).values_list("title", "id"))
+        missing = [title for title in SEED_TAGS if title not in tags]
+        if missing:
+            Tag.objects.bulk_create(Tag(title=title) for title in missing)
+            tags = dict(
+                Tag.objects.filter(title__in=SEED_TAGS).values_list("title", "id")
+            )
+        return list(tags.values())
+
+    def generate(
+        self, start: int, stop: int, tag_ids: Sequence[int]
+    ) -> Iterator[SeedRow]:
+        spread = SEED_CREATED_SPREAD_DAYS * 24 * 60 * 60
+        for index in range(start + 1, stop + 1):
+            created = self.now - datetime.timedelta(
+                seconds=self.random.randrange(spread)
+            )
+            votes = [self.random.randrange(SEED_MAX_VOTES) for _ in range(self.choices)]
+            yield index, self.random.choice(tag_ids), created, votes
+
+    def choice_titles(self, index: int) -> Iterator[str]:
+        for letter in string.ascii_uppercase[: self.choices]:
+            yield SEED_CHOICE_TITLE.format(index=index, letter=letter)
+
+    def bulk_batch(self, batch: List[SeedRow]) -> None:
+        questions = Question.objects.bulk_create(
+            Question(
+                title=SEED_QUESTION_TITLE.format(index=index),
+                tag_id=tag_id,
+                total_votes=sum(votes),
+            )
+            for index, tag_id, created, votes in batch
+        )
+        choices = Choice.objects.bulk_create(
+            Choice(question=question, title=title, votes=count)
+            for question, (index, _, created, votes) in zip(questions, batch)
+            for title, count in zip(self.choice_titles(index), votes)
+        )
+        # auto_now_add sets created to the insert time, so the spread dates
+        # are written afterwards, one UPDATE per table and parameter batch
+        for question, (_, _, created, _) in zip(questions, batch):
+            question.created = created
+        for choice in choices:
+            choice.created = choice.question.created
+        Question.objects.bulk_update(questions, ["created"])
+        Choice.objects.bulk_update(choices, ["created"])
+        index_questions(question.id for question in questions)
+
+    def copy_batch(self, batch: List[SeedRow]) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [Question._meta.db_table, len(batch)],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            copy_rows(
+                cursor,
+                Question,
+                ["id", "title", "tag_id", "created", "modified", "total_votes"],
+                (
+                    (
+                        question_id,
+                        SEED_QUESTION_TITLE.format(index=index),
+                        tag_id,
+                        created,
+                        self.now,
+                        sum(votes),
+                    )
+                    for question_id, (index, tag_id, created, votes) in zip(ids, batch)
+                ),
+            )
+            copy_rows(
+                cursor,
+                Choice,
+                ["question_id", "title", "created", "modified", "votes"],
+                (
+                    (question_id, title, created, self.now, count)
+                    for question_id, (index, _, created, votes) in zip(ids, batch)
+                    for title, count in zip(self.choice_titles(index), votes)
+                ),
+            )
+        index_questions(ids)
+
+
+def copy_rows(cursor, model, columns: List[str], rows) -> None:
+    """
+    Stream rows into a table with COPY, using psycopg 3 or psycopg2.
+
+    :param cursor: Django cursor on a PostgreSQL connection.
+    :param model: Model whose table receives the rows.
+    :param columns: Field attnames, in the order of the row values.
+    :param rows: Iterable of value tuples.
+    """
+    quote = connection.ops.quote_name
+    sql = "COPY %s (%s) FROM STDIN" % (
+        quote(model._meta.db_table),
+        ", ".join(quote(model._meta.get_field(name).column) for name in columns),
+    )
+    raw = cursor.cursor
+    if hasattr(raw, "copy"):
+        with raw.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    raw.copy_expert(sql + " WITH (FORMAT csv)", buffer)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from mysite.fixtures import FORMAT_JSON, FORMAT_JSONL, dump, get_models
+
+DEFAULT_APPS = ["polls", "accounts", "learning"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the rows of the given apps to a fixture without loading "
+        "tables into memory. Models are written in foreign key order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "app_labels", nargs="*", default=DEFAULT_APPS, help="Apps to dump"
+        )
+        parser.add_argument(
+            "--format",
+            choices=[FORMAT_JSONL, FORMAT_JSON],
+            default=FORMAT_JSONL,
+            help="One object per line, or a JSON array loaddata also reads",
+        )
+        parser.add_argument(
+            "-o", "--output", default=None, help="File to write, stdout by default"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=2000, help="Rows fetched per query"
+        )
+
+    def handle(self, *args, **options):
+        models = get_models(options["app_labels"])
+        started = time.perf_counter()
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                written = dump(models, stream, options["format"], options["batch_size"])
+        else:
+            written = dump(
+                models, self.stdout, options["format"], options["batch_size"]
+            )
+        elapsed = time.perf_counter() - started
+        sys.stderr.write(
+            "Dumped %d objects in %.1fs (%d objects/sec)\n"
+            % (written, elapsed, written / elapsed if elapsed else written)
+        )
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from mysite.fixtures import load, read_objects
+from polls.archive import refresh_archive_buckets
+from polls.models import Question
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a JSON or JSON Lines fixture with incremental parsing and "
+        "bulk inserts, keeping memory flat regardless of the fixture size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixture", help="Fixture path, or - for stdin")
+        parser.add_argument(
+            "--batch-size", type=int, default=2000, help="Objects per bulk insert"
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["fixture"] == "-":
+            counts = load(read_objects(sys.stdin.buffer), options["batch_size"])
+            size = 0
+        else:
+            with open(options["fixture"], "rb") as stream:
+                counts = load(read_objects(stream), options["batch_size"])
+            size = os.path.getsize(options["fixture"])
+        # bulk inserts send no signals, so the archive months are recounted
+        if counts.get(Question):
+            refresh_archive_buckets()
+        elapsed = time.perf_counter() - started or 1e-9
+        for model, count in counts.items():
+            self.stdout.write("%s: %d" % (model._meta.label, count))
+        loaded = sum(counts.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Loaded %d objects in %.1fs (%d objects/sec, %.1f MB/sec)"
+                % (loaded, elapsed, loaded / elapsed, size / elapsed / 2**20)
+            )
+        )
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "main"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VoteShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("votes", models.IntegerField(default=0)),
+                (
+                    "choice",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vote_shards",
+                        to="polls.choice",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vote_shards",
+                        to="polls.question",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="voteshard",
+            constraint=models.UniqueConstraint(
+                fields=("choice", "shard"), name="polls_voteshard_choice_shard"
+            ),
+        ),
+    ]
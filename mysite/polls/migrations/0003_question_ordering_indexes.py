@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "0002_voteshard"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["created", "id"], name="polls_question_created_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["tag", "created", "id"], name="polls_question_tag_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["total_votes", "id"], name="polls_question_votes_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["tag", "total_votes", "id"], name="polls_question_tag_votes"
+            ),
+        ),
+    ]
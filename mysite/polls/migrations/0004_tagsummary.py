@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_tag_summaries(apps, schema_editor):
+    Tag = apps.get_model("polls", "Tag")
+    TagSummary = apps.get_model("polls", "TagSummary")
+    rows = Tag.objects.annotate(
+        question_count=Count("tag"),
+        total_votes=Coalesce(Sum("tag__total_votes"), 0),
+        latest_created=Max("tag__created"),
+    ).values_list("id", "question_count", "total_votes", "latest_created")
+    TagSummary.objects.bulk_create(
+        TagSummary(
+            tag_id=tag_id,
+            question_count=count,
+            total_votes=votes,
+            latest_created=latest,
+        )
+        for tag_id, count, votes, latest in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "0003_question_ordering_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TagSummary",
+            fields=[
+                (
+                    "tag",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="polls.tag",
+                    ),
+                ),
+                ("question_count", models.IntegerField(default=0)),
+                ("total_votes", models.IntegerField(default=0)),
+                ("latest_created", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(populate_tag_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 15:40
+
+from django.db import migrations
+
+# The admin searches with icontains, which PostgreSQL runs as
+# UPPER(column::text) LIKE UPPER(%s); these trigram indexes serve it.
+TRIGRAM_INDEXES = [
+    ("polls_question_title_trgm", "polls_question"),
+    ("polls_choice_title_trgm", "polls_choice"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS %s ON %s "
+            "USING gin (UPPER((title)::text) gin_trgm_ops)" % (name, table)
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute("DROP INDEX IF EXISTS %s" % name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "0005_question_modified_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
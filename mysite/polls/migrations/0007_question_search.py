@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 16:05
+
+from django.db import migrations
+
+# A frozen copy of the polls.search tables as of this migration, so later
+# changes to the search backends do not rewrite history.
+SEARCH_TEXT_CONFIG = "english"
+BACKFILL_BATCH_SIZE = 1000
+
+CREATE_SQL = {
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS polls_question_search ("
+        " question_id bigint PRIMARY KEY REFERENCES polls_question (id)"
+        " ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,"
+        " document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS polls_question_search_document"
+        " ON polls_question_search USING gin (document)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS polls_question_search USING fts5("
+        "title, description, choices, tokenize = 'porter unicode61')",
+        "INSERT INTO polls_question_search (polls_question_search, rank)"
+        " VALUES ('rank', 'bm25(10.0, 4.0, 1.0)')",
+    ],
+}
+INDEX_SQL = {
+    "postgresql": (
+        "INSERT INTO polls_question_search (question_id, document) "
+        "SELECT q.id,"
+        " setweight(to_tsvector(%(config)s, q.title), 'A')"
+        " || setweight(to_tsvector(%(config)s, COALESCE(q.description, '')), 'B')"
+        " || setweight(to_tsvector(%(config)s,"
+        " COALESCE(string_agg(c.title, ' '), '')), 'C') "
+        "FROM polls_question q LEFT JOIN polls_choice c ON c.question_id = q.id "
+        "WHERE q.id = ANY(%(ids)s) GROUP BY q.id"
+    ),
+    "sqlite": (
+        "INSERT INTO polls_question_search (rowid, title, description, choices) "
+        "SELECT q.id, q.title, COALESCE(q.description, ''),"
+        " COALESCE(group_concat(c.title, ' '), '') "
+        "FROM polls_question q LEFT JOIN polls_choice c ON c.question_id = q.id "
+        "WHERE q.id IN ({ids}) GROUP BY q.id"
+    ),
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_SQL:
+        return
+    for sql in CREATE_SQL[vendor]:
+        schema_editor.execute(sql)
+    last = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                "SELECT id FROM polls_question WHERE id > %s ORDER BY id LIMIT %s",
+                [last, BACKFILL_BATCH_SIZE],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            if vendor == "postgresql":
+                cursor.execute(
+                    INDEX_SQL[vendor], {"config": SEARCH_TEXT_CONFIG, "ids": ids}
+                )
+            else:
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(INDEX_SQL[vendor].format(ids=placeholders), ids)
+            last = ids[-1]
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor not in CREATE_SQL:
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS polls_question_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "0006_title_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 16:40
+
+from django.db import migrations, models
+from django.db.models import Count, DateField, Max, Min
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def populate_archive_buckets(apps, schema_editor):
+    Question = apps.get_model("polls", "Question")
+    ArchiveBucket = apps.get_model("polls", "ArchiveBucket")
+    rows = (
+        Question.objects.annotate(
+            month=TruncMonth(
+                "created",
+                output_field=DateField(),
+                tzinfo=timezone.get_default_timezone(),
+            )
+        )
+        .order_by()
+        .values("month")
+        .annotate(count=Count("id"), first_id=Min("id"), last_id=Max("id"))
+        .values_list("month", "count", "first_id", "last_id")
+    )
+    ArchiveBucket.objects.bulk_create(
+        ArchiveBucket(
+            month=month, question_count=count, first_id=first_id, last_id=last_id
+        )
+        for month, count, first_id, last_id in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "0007_question_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchiveBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(unique=True)),
+                ("question_count", models.IntegerField(default=0)),
+                ("first_id", models.BigIntegerField()),
+                ("last_id", models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(populate_archive_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.0.6 on 2026-10-18 17:20
+
+from django.db import migrations
+
+# Django does not know about the raw search table, so flush and
+# TransactionTestCase truncate polls_question without it; a foreign key
+# from the table makes that fail on PostgreSQL. Documents of deleted
+# questions are removed by the search index sync instead.
+FOREIGN_KEY = "polls_question_search_question_id_fkey"
+
+
+def drop_search_foreign_key(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE polls_question_search DROP CONSTRAINT IF EXISTS %s" % FOREIGN_KEY
+    )
+
+
+def add_search_foreign_key(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "DELETE FROM polls_question_search s WHERE NOT EXISTS"
+        " (SELECT 1 FROM polls_question q WHERE q.id = s.question_id)"
+    )
+    schema_editor.execute(
+        "ALTER TABLE polls_question_search ADD CONSTRAINT %s"
+        " FOREIGN KEY (question_id) REFERENCES polls_question (id)"
+        " ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED" % FOREIGN_KEY
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("polls", "0008_archivebucket"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_foreign_key, add_search_foreign_key),
+    ]
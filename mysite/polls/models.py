@@ -37,10 +37,34 @@ class Question(TitleDescriptionModel, TimeStampedModel):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so a re-tag can be moved between tag summaries on save
+        instance._loaded_tag_id = instance.__dict__.get("tag_id")
+        # and a re-dated question between archive buckets
+        instance._loaded_created = instance.__dict__.get("created")
+        # and votes changed by a save added to its tag summary
+        instance._loaded_total_votes = instance.__dict__.get("total_votes")
+        return instance
+
     def was_published_recently(self):
         now = timezone.now()
         return now - datetime.timedelta(days=1) <= self.created <= now
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created", "id"], name="polls_question_created_id"),
+            models.Index(
+                fields=["tag", "created", "id"], name="polls_question_tag_created"
+            ),
+            models.Index(fields=["total_votes", "id"], name="polls_question_votes_id"),
+            models.Index(
+                fields=["tag", "total_votes", "id"], name="polls_question_tag_votes"
+            ),
+            models.Index(fields=["modified"], name="polls_question_modified"),
+        ]
+
     @property
     def thumbnail_preview(self):
         if self.image:
@@ -59,3 +83,71 @@ class Choice(TitleDescriptionModel, TimeStampedModel):
 
     class meta:
         ordering = ["title"]
+
+
+class TagSummary(models.Model):
+    """
+    Precomputed statistics of the questions in a tag.
+
+    Kept up to date incrementally by the Question signals in polls.signals
+    and by the vote counters, which add their deltas to ``total_votes``;
+    ``refresh_tag_summaries`` recomputes them from the questions.
+    """
+
+    tag = models.OneToOneField(
+        Tag, on_delete=models.CASCADE, primary_key=True, related_name="summary"
+    )
+    question_count = models.IntegerField(default=0)
+    total_votes = models.IntegerField(default=0)
+    latest_created = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "{tag} Summary".format(tag=self.tag_id)
+
+
+class ArchiveBucket(models.Model):
+    """
+    Number of questions created in a month, with the range of their ids.
+
+    Kept up to date incrementally by the Question signals in polls.signals
+    and read by the archive views instead of DISTINCT date queries.
+    ``first_id`` and ``last_id`` bound the ids of the month's questions;
+    deletes leave them as they are, so they may be wider than needed.
+    """
+
+    month = models.DateField(unique=True)
+    question_count = models.IntegerField(default=0)
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+
+    def __str__(self):
+        return "{month:%Y-%m} Archive".format(month=self.month)
+
+
+class VoteShard(models.Model):
+    """
+    One slice of a choice's vote counter.
+
+    Sharded voting increments a random shard row instead of the hot
+    ``polls_choice``/``polls_question`` rows; the canonical counters plus the
+    shard sums give the live tally until compaction folds the shards back.
+    """
+
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name="vote_shards"
+    )
+    choice = models.ForeignKey(
+        Choice, on_delete=models.CASCADE, related_name="vote_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    votes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return "{choice} #{shard}".format(choice=self.choice_id, shard=self.shard)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["choice", "shard"], name="polls_voteshard_choice_shard"
+            )
+        ]
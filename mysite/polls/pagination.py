@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import base64
+import datetime
+import json
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+
+from polls.constants import DEFAULT_QUESTION_ORDERING, QUESTION_ORDERINGS
+
+
+class CursorPage:
+    """
+    One page of keyset-paginated results.
+
+    Unlike ``django.core.paginator.Page`` it knows nothing about the total
+    number of rows, only whether another page follows and where it starts.
+    """
+
+    def __init__(self, object_list: List[Any], next_cursor: Optional[str]):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def get_question_ordering(key: Optional[str]) -> Optional[Tuple[str, bool]]:
+    """
+    Look up an index ordering in the registry, falling back to the default
+    for unknown keys so clients cannot sort on arbitrary columns.
+
+    :param key: The orderby parameter.
+    :return: Tuple of (field name, descending), or None for random order.
+    """
+    if key not in QUESTION_ORDERINGS:
+        key = DEFAULT_QUESTION_ORDERING
+    return QUESTION_ORDERINGS[key]
+
+
+def ordering_fields(ordering: Optional[Tuple[str, bool]]) -> List[str]:
+    """
+    Expand a registry ordering into ``order_by`` arguments with the primary
+    key as tie breaker.
+    """
+    if ordering is None:
+        return ["?"]
+    field, descending = ordering
+    sign = "-" if descending else ""
+    return [sign + field, sign + "pk"]
+
+
+def parse_ordering(model, ordering: str) -> Optional[Tuple[str, bool]]:
+    """
+    Split an ``order_by`` string into a keyset field and its direction.
+
+    :param model: Model class the ordering applies to.
+    :param ordering: Ordering such as "-created".
+    :return: Tuple of (field name, descending), or None if the ordering is
+        not a plain, non-null concrete column usable as a cursor.
+    """
+    descending = ordering.startswith("-")
+    name = ordering.lstrip("-")
+    if not name or "__" in name:
+        return None
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.is_relation or field.null:
+        return None
+    return field.name, descending
+
+
+def encode_cursor(value: Any, pk: int) -> str:
+    """
+    Encode the last row's ordering value and primary key as an opaque token.
+    """
+    raw = json.dumps([value, pk], default=_cursor_value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _cursor_value(value: Any) -> Any:
+    # Full precision isoformat: a truncated timestamp would skip or repeat rows.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError("Cannot encode %r in a cursor" % type(value))
+
+
+def decode_cursor(model, field_name: str, cursor: str) -> Optional[Tuple[Any, int]]:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    :return: Tuple of (ordering value, primary key), or None if the cursor
+        is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        value = model._meta.get_field(field_name).to_python(value)
+        return value, int(pk)
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def paginate_by_cursor(
+    queryset: QuerySet, ordering: Tuple[str, bool], cursor: str, per_page: int
+) -> CursorPage:
+    """
+    Return the page following ``cursor`` using a keyset (seek) query.
+
+    Rows are ordered by the ordering field with the primary key as tie
+    breaker, and the page is found with a range condition instead of OFFSET,
+    so its cost does not grow with scroll depth and no COUNT(*) is issued.
+
+    :param queryset: Unordered queryset to paginate.
+    :param ordering: Tuple of (field name, descending) from parse_ordering.
+    :param cursor: Cursor of the previous page, empty for the first page.
+    :param per_page: Number of rows per page.
+    :return: CursorPage
+    """
+    field, descending = ordering
+    model = queryset.model
+    position = decode_cursor(model, field, cursor) if cursor else None
+    if position is not None:
+        value, pk = position
+        lookup = "lt" if descending else "gt"
+        queryset = queryset.filter(
+            Q(**{"%s__%s" % (field, lookup): value})
+            | Q(**{field: value, "pk__%s" % lookup: pk})
+        )
+    rows = list(queryset.order_by(*ordering_fields(ordering))[: per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return CursorPage(rows, next_cursor)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import datetime
+import logging
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from polls.constants import (
+    RECONCILE_BATCH_SIZE,
+    RECONCILE_WATERMARK_KEY,
+    RECONCILE_WATERMARK_SKEW,
+)
+from polls.models import Choice, Question
+from polls.summaries import refresh_question_tags
+
+logger = logging.getLogger(__name__)
+
+# (question id, stored total_votes, sum of its choices' votes)
+Drift = Tuple[int, int, int]
+
+
+class ReconciliationReport:
+    """
+    Counters of one reconciliation run.
+    """
+
+    def __init__(self, since: Optional[datetime.datetime] = None):
+        self.since = since
+        self.checked = 0
+        self.drifted = 0
+        self.repaired = 0
+        self.drift = 0
+        self.duration = 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "since": self.since.isoformat() if self.since else None,
+            "checked": self.checked,
+            "drifted": self.drifted,
+            "repaired": self.repaired,
+            "drift": self.drift,
+            "duration": round(self.duration, 3),
+        }
+
+
+def choice_votes_sum():
+    """
+    Subquery summing the votes of the outer question's choices.
+    """
+    return Coalesce(
+        Subquery(
+            Choice.objects.filter(question_id=OuterRef("id"))
+            .order_by()
+            .values("question_id")
+            .annotate(total=Sum("votes"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def find_drift(question_ids: List[int]) -> List[Drift]:
+    """
+    Compare stored totals with their choices in one grouped aggregate.
+
+    :param question_ids: The window of questions to check.
+    :return: The drifted questions.
+    """
+    return list(
+        Question.objects.filter(id__in=question_ids)
+        .annotate(actual=Coalesce(Sum("choice__votes"), 0))
+        .exclude(total_votes=F("actual"))
+        .values_list("id", "total_votes", "actual")
+    )
+
+
+def repair(question_ids: Iterable[int]) -> int:
+    """
+    Recompute total_votes of the given questions in a short transaction.
+
+    The sum is taken inside the UPDATE, so votes committed since the drift
+    was detected are counted as well; the summaries of their tags are
+    recomputed after it.
+
+    :return: The number of repaired questions.
+    """
+    question_ids = list(question_ids)
+    with transaction.atomic():
+        repaired = Question.objects.filter(id__in=question_ids).update(
+            total_votes=choice_votes_sum()
+        )
+        refresh_question_tags(question_ids)
+    return repaired
+
+
+def reconcile(
+    question_ids: Optional[Iterable[int]] = None,
+    since: Optional[datetime.datetime] = None,
+    batch_size: int = RECONCILE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> ReconciliationReport:
+    """
+    Detect and repair drift between ``Question.total_votes`` and the votes
+    of its choices.
+
+    Questions are walked in primary key windows of ``batch_size``; each
+    window costs one grouped aggregate, and only drifted rows are updated,
+    in their own transaction, so no table is locked for the whole run.
+
+    :param question_ids: Only reconcile these questions.
+    :param since: Only reconcile questions modified since then.
+    :param batch_size: Questions checked per window.
+    :param dry_run: Detect drift without repairing it.
+    :return: ReconciliationReport
+    """
+    report = ReconciliationReport(since)
+    started = time.perf_counter()
+    questions = Question.objects.all()
+    if question_ids is not None:
+        questions = questions.filter(id__in=list(question_ids))
+    if since is not None:
+        questions = questions.filter(modified__gte=since)
+    for window in _id_windows(questions, batch_size):
+        report.checked += len(window)
+        drifted = find_drift(window)
+        if not drifted:
+            continue
+        report.drifted += len(drifted)
+        report.drift += sum(abs(stored - actual) for _, stored, actual in drifted)
+        if not dry_run:
+            report.repaired += repair(question_id for question_id, _, _ in drifted)
+    report.duration = time.perf_counter() - started
+    logger.info("Vote reconciliation %s", report.as_dict(), extra=report.as_dict())
+    return report
+
+
+def reconcile_recent(
+    batch_size: int = RECONCILE_BATCH_SIZE, dry_run: bool = False
+) -> ReconciliationReport:
+    """
+    Reconcile questions modified since the last incremental run, or all
+    questions when there was none.
+
+    Every path changing votes outside the vote view bumps the question's
+    ``modified``, so this catches the drift those paths can introduce.
+    """
+    now = timezone.now()
+    since = cache.get(RECONCILE_WATERMARK_KEY)
+    report = reconcile(since=since, batch_size=batch_size, dry_run=dry_run)
+    if not dry_run:
+        cache.set(
+            RECONCILE_WATERMARK_KEY,
+            now - datetime.timedelta(seconds=RECONCILE_WATERMARK_SKEW),
+            None,
+        )
+    return report
+
+
+def _id_windows(questions: QuerySet, size: int) -> Iterator[List[int]]:
+    last = 0
+    while True:
+        window = list(
+            questions.filter(id__gt=last)
+            .order_by("id")
+            .values_list("id", flat=True)[:size]
+        )
+        if not window:
+            return
+        yield window
+        last = window[-1]
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+import re
+import weakref
+from typing import Iterable, List, Optional
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+
+from polls.constants import (
+    SEARCH_BACKFILL_BATCH_SIZE,
+    SEARCH_MAX_TERMS,
+    SEARCH_RANK_CANDIDATES,
+    SEARCH_TABLE,
+    SEARCH_TEXT_CONFIG,
+)
+from polls.models import Question
+
+SEARCH_TERM = re.compile(r"\w+")
+# Whether a database connection has the search table; connections are per
+# thread, so every thread looks the table up once
+_search_tables: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class PostgresSearch:
+    """
+    ``tsvector`` documents in a GIN indexed side table.
+
+    Question titles weigh A, descriptions B and choice titles C, and
+    results are ranked with ``ts_rank_cd``.
+    """
+
+    create_sql = [
+        "CREATE TABLE IF NOT EXISTS {table} ("
+        " question_id bigint PRIMARY KEY,"
+        " document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS {table}_document ON {table} USING gin (document)",
+    ]
+    drop_sql = ["DROP TABLE IF EXISTS {table}"]
+    index_sql = (
+        "WITH removed AS (DELETE FROM {table} s"
+        " WHERE s.question_id = ANY(%(ids)s) AND NOT EXISTS"
+        " (SELECT 1 FROM polls_question q WHERE q.id = s.question_id)) "
+        "INSERT INTO {table} (question_id, document) "
+        "SELECT q.id,"
+        " setweight(to_tsvector(%(config)s, q.title), 'A')"
+        " || setweight(to_tsvector(%(config)s, COALESCE(q.description, '')), 'B')"
+        " || setweight(to_tsvector(%(config)s,"
+        " COALESCE(string_agg(c.title, ' '), '')), 'C') "
+        "FROM polls_question q LEFT JOIN polls_choice c ON c.question_id = q.id "
+        "WHERE q.id = ANY(%(ids)s) GROUP BY q.id "
+        "ON CONFLICT (question_id) DO UPDATE SET document = EXCLUDED.document"
+    )
+    search_sql = (
+        "SELECT c.question_id FROM ("
+        "SELECT s.question_id, s.document, query FROM {table} s,"
+        " websearch_to_tsquery(%s, %s) query WHERE s.document @@ query"
+        " ORDER BY s.question_id DESC LIMIT %s) c "
+        "JOIN ({questions}) q ON q.id = c.question_id "
+        "ORDER BY ts_rank_cd(c.document, c.query) DESC, c.question_id DESC "
+        "LIMIT %s OFFSET %s"
+    )
+
+    def index(self, cursor, ids: List[int]) -> None:
+        # no foreign key cascades the deletes, Django would not know about it
+        # when flushing; documents of deleted questions are removed here
+        cursor.execute(
+            self.index_sql.format(table=SEARCH_TABLE),
+            {"config": SEARCH_TEXT_CONFIG, "ids": ids},
+        )
+
+    def search_params(self, terms: List[str]) -> List[str]:
+        return [SEARCH_TEXT_CONFIG, " ".join(terms)]
+
+
+class SQLiteSearch:
+    """
+    FTS5 virtual table keyed by the question id, ranked with ``bm25``
+    using the same column weights as :class:`PostgresSearch`.
+    """
+
+    create_sql = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        "title, description, choices, tokenize = 'porter unicode61')",
+        "INSERT INTO {table} ({table}, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0)')",
+    ]
+    drop_sql = ["DROP TABLE IF EXISTS {table}"]
+    delete_sql = "DELETE FROM {table} WHERE rowid IN ({ids})"
+    index_sql = (
+        "INSERT INTO {table} (rowid, title, description, choices) "
+        "SELECT q.id, q.title, COALESCE(q.description, ''),"
+        " COALESCE(group_concat(c.title, ' '), '') "
+        "FROM polls_question q LEFT JOIN polls_choice c ON c.question_id = q.id "
+        "WHERE q.id IN ({ids}) GROUP BY q.id"
+    )
+    search_sql = (
+        "SELECT c.rowid FROM ("
+        "SELECT rowid, rank FROM {table} WHERE {table} MATCH %s"
+        " ORDER BY rowid DESC LIMIT %s) c "
+        "JOIN ({questions}) q ON q.id = c.rowid "
+        "ORDER BY c.rank, c.rowid DESC LIMIT %s OFFSET %s"
+    )
+
+    def index(self, cursor, ids: List[int]) -> None:
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(
+            self.delete_sql.format(table=SEARCH_TABLE, ids=placeholders), ids
+        )
+        cursor.execute(self.index_sql.format(table=SEARCH_TABLE, ids=placeholders), ids)
+
+    def search_params(self, terms: List[str]) -> List[str]:
+        # quoted terms are matched literally, whatever FTS5 syntax they hold
+        return [" ".join('"%s"' % term for term in terms)]
+
+
+BACKENDS = {"postgresql": PostgresSearch(), "sqlite": SQLiteSearch()}
+
+
+def create_search_index(connection) -> None:
+    """
+    Create the search table of a database and index every question.
+    Databases without a search backend are skipped.
+    """
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        return
+    last = 0
+    with connection.cursor() as cursor:
+        for sql in backend.create_sql:
+            cursor.execute(sql.format(table=SEARCH_TABLE))
+        while True:
+            cursor.execute(
+                "SELECT id FROM polls_question WHERE id > %s ORDER BY id LIMIT %s",
+                [last, SEARCH_BACKFILL_BATCH_SIZE],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            backend.index(cursor, ids)
+            last = ids[-1]
+    reset_search_backend(connection.alias)
+
+
+def drop_search_index(connection) -> None:
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        for sql in backend.drop_sql:
+            cursor.execute(sql.format(table=SEARCH_TABLE))
+    reset_search_backend(connection.alias)
+
+
+def get_search_backend(using: str = "default"):
+    """
+    Return the search backend of a database, or None when its vendor has
+    none or the search table was not migrated.
+
+    Whether the table exists is looked up once per connection, and looked
+    up again after :func:`reset_search_backend`.
+    """
+    connection = connections[using]
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        return None
+    if connection not in _search_tables:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        _search_tables[connection] = SEARCH_TABLE in tables
+    return backend if _search_tables[connection] else None
+
+
+def reset_search_backend(using: Optional[str] = None) -> None:
+    """
+    Forget whether the search table of a database, or of every database,
+    exists, e.g. after it was migrated.
+    """
+    for connection in list(_search_tables):
+        if using is None or connection.alias == using:
+            del _search_tables[connection]
+
+
+def index_questions(ids: Iterable[int], using: str = "default") -> None:
+    """
+    Rebuild the search documents of the given questions from their title,
+    description and choice titles; documents of deleted questions are
+    removed.
+
+    :param ids: Question ids, added, changed or deleted.
+    :param using: Database alias.
+    """
+    backend = get_search_backend(using)
+    ids = list(ids)
+    if backend is None or not ids:
+        return
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(ids), SEARCH_BACKFILL_BATCH_SIZE):
+            backend.index(cursor, ids[start : start + SEARCH_BACKFILL_BATCH_SIZE])
+
+
+def search_terms(query: str) -> List[str]:
+    return SEARCH_TERM.findall(query)[:SEARCH_MAX_TERMS]
+
+
+def search_questions(
+    queryset: QuerySet, query: str, limit: int, offset: int = 0
+) -> List[Question]:
+    """
+    Return one page of the questions of ``queryset`` matching ``query``,
+    best match first.
+
+    The full-text index finds the newest ``SEARCH_RANK_CANDIDATES``
+    matches, which are joined with the (filtered) queryset and ranked, and
+    only the page is loaded. Capping the candidates bounds the cost of
+    ranking very common words; older matches of those are not returned.
+    Without a search backend the title and description are scanned
+    instead, newest first.
+
+    :param queryset: Questions to search, e.g. the filtered index queryset.
+    :param query: The user's search text.
+    :param limit: Number of questions to return.
+    :param offset: Number of matches to skip.
+    :return: List of Question, in rank order.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    backend = get_search_backend(queryset.db)
+    if backend is None:
+        match = Q()
+        for term in terms:
+            match &= Q(title__icontains=term) | Q(description__icontains=term)
+        return list(
+            queryset.filter(match).order_by("-created", "-id")[offset : offset + limit]
+        )
+    questions, params = queryset.order_by().values("id").query.sql_with_params()
+    sql = backend.search_sql.format(table=SEARCH_TABLE, questions=questions)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            sql,
+            [
+                *backend.search_params(terms),
+                SEARCH_RANK_CANDIDATES,
+                *params,
+                limit,
+                offset,
+            ],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    found = queryset.in_bulk(ids)
+    return [found[question_id] for question_id in ids if question_id in found]
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, Optional
+
+from django.db import transaction
+
+from mysite.fixtures import read_json_array
+from polls.constants import (
+    POLL_IMPORT_CHOICE_SEPARATOR,
+    POLL_IMPORT_CHUNK_SIZE,
+    POLL_IMPORT_ROW_ERROR,
+)
+from polls.archive import archive_month, refresh_archive_buckets
+from polls.models import Choice, Question, Tag
+from polls.search import index_questions
+from polls.summaries import refresh_tag_summaries
+
+Poll = Dict[str, Any]
+
+
+class PollImportError(ValueError):
+    """
+    An invalid poll stopped an import; ``imported`` polls were committed.
+    """
+
+    def __init__(self, message: str, imported: int):
+        super().__init__(message)
+        self.imported = imported
+
+
+def create_poll(question: Question, choice_titles: Iterable[str]) -> Question:
+    """
+    Save a question and its choices in one transaction, inserting every
+    choice with a single ``bulk_create``.
+
+    :param question: Unsaved Question, e.g. from ``form.save(commit=False)``.
+    :param choice_titles: Titles of the choices, blank titles are skipped.
+    :return: The saved Question.
+    """
+    with transaction.atomic():
+        question.save()
+        Choice.objects.bulk_create(
+            Choice(question=question, title=title) for title in choice_titles if title
+        )
+        index_questions([question.id])
+    return question
+
+
+def import_polls(
+    polls: Iterable[Poll], chunk_size: int = POLL_IMPORT_CHUNK_SIZE
+) -> int:
+    """
+    Insert polls from an iterable, ``chunk_size`` polls per transaction.
+
+    Each chunk costs one INSERT for its questions and one for their choices,
+    and the iterable is consumed lazily so a streamed upload is never held in
+    memory. Tags are looked up by title and created when missing. Bulk
+    inserts send no signals, so every chunk is added to the search index
+    with its transaction, and the touched tag summaries and archive months
+    are refreshed once at the end, also when a later chunk fails.
+
+    :param polls: Dicts with title, and optionally description, tag and
+        a list of choices.
+    :param chunk_size: Number of polls inserted per transaction.
+    :return: The number of polls imported.
+    :raises PollImportError: if a poll is invalid, earlier chunks stay saved.
+    """
+    tags: Dict[str, int] = dict(Tag.objects.values_list("title", "id"))
+    touched = set()
+    months = set()
+    imported = 0
+    polls = iter(polls)
+    try:
+        while True:
+            try:
+                chunk = list(islice(polls, chunk_size))
+            except ValueError as error:
+                raise PollImportError(str(error), imported)
+            if not chunk:
+                break
+            with transaction.atomic():
+                questions = []
+                for poll in chunk:
+                    tag_id = _tag_id(tags, poll.get("tag"))
+                    touched.add(tag_id)
+                    questions.append(
+                        Question(
+                            title=poll["title"],
+                            description=poll.get("description"),
+                            tag_id=tag_id,
+                        )
+                    )
+                Question.objects.bulk_create(questions)
+                months.update(archive_month(question.created) for question in questions)
+                Choice.objects.bulk_create(
+                    Choice(question=question, title=title)
+                    for question, poll in zip(questions, chunk)
+                    for title in poll.get("choices", ())
+                    if title
+                )
+                index_questions(question.id for question in questions)
+            imported += len(chunk)
+    finally:
+        touched.discard(None)
+        if touched:
+            refresh_tag_summaries(touched)
+        if months:
+            refresh_archive_buckets(months)
+    return imported
+
+
+def _tag_id(tags: Dict[str, int], title: Optional[str]) -> Optional[int]:
+    if not title:
+        return None
+    if title not in tags:
+        tags[title] = Tag.objects.get_or_create(title=title)[0].id
+    return tags[title]
+
+
+def clean_poll(poll: Any, row: int) -> Poll:
+    """
+    Validate one imported poll.
+
+    Bulk inserts skip model validation, so the tag must be a string and the
+    titles must fit their columns.
+
+    :param poll: Decoded JSON object or CSV row.
+    :param row: 1-based position of the poll, for the error message.
+    :return: The poll with a stripped title and a list of choices.
+    """
+    if not isinstance(poll, dict) or not str(poll.get("title") or "").strip():
+        raise ValueError(POLL_IMPORT_ROW_ERROR.format(row=row))
+    choices = poll.get("choices") or []
+    if isinstance(choices, str):
+        choices = choices.split(POLL_IMPORT_CHOICE_SEPARATOR)
+    tag = poll.get("tag") or None
+    if not isinstance(choices, list) or not isinstance(tag, (str, type(None))):
+        raise ValueError(POLL_IMPORT_ROW_ERROR.format(row=row))
+    poll = {
+        "title": str(poll["title"]).strip(),
+        "description": poll.get("description") or None,
+        "tag": tag,
+        "choices": [str(choice).strip() for choice in choices],
+    }
+    if (
+        len(poll["title"]) > _max_length(Question)
+        or len(tag or "") > _max_length(Tag)
+        or any(len(title) > _max_length(Choice) for title in poll["choices"])
+    ):
+        raise ValueError(POLL_IMPORT_ROW_ERROR.format(row=row))
+    return poll
+
+
+def _max_length(model) -> int:
+    return model._meta.get_field("title").max_length
+
+
+def read_csv_polls(lines: Iterable[str]) -> Iterator[Poll]:
+    """
+    Parse polls from CSV lines with a header of title, description, tag and
+    choices, the choices separated by ``|``.
+    """
+    reader = csv.DictReader(lines)
+    row = 1
+    while True:
+        try:
+            poll = next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            raise ValueError(POLL_IMPORT_ROW_ERROR.format(row=row))
+        yield clean_poll(poll, row)
+        row += 1
+
+
+def read_jsonl_polls(lines: Iterable[str]) -> Iterator[Poll]:
+    """
+    Parse polls from JSON Lines, one poll object per line.
+    """
+    row = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            poll = json.loads(line)
+        except ValueError:
+            raise ValueError(POLL_IMPORT_ROW_ERROR.format(row=row))
+        yield clean_poll(poll, row)
+
+
+def read_json_polls(stream: IO[bytes]) -> Iterator[Poll]:
+    """
+    Parse polls from a JSON array, one element at a time.
+    """
+    polls = read_json_array(stream)
+    row = 1
+    while True:
+        try:
+            poll = next(polls)
+        except StopIteration:
+            return
+        except ValueError:
+            raise ValueError(POLL_IMPORT_ROW_ERROR.format(row=row))
+        yield clean_poll(poll, row)
+        row += 1
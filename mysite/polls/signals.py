@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from polls.archive import (
+    archive_month,
+    question_archived,
+    question_unarchived,
+    refresh_archive_buckets,
+)
+from polls.constants import TAG_SUMMARY_CACHE_KEY
+from polls.models import Choice, Question, Tag
+from polls.search import index_questions, reset_search_backend
+from polls.summaries import question_added, question_removed, votes_added
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def touch_question_on_choice_change(sender, instance, **kwargs):
+    """
+    Bump the question's modified time when one of its choices changes.
+
+    Rendered poll cards are cached per ``(question.id, question.modified)``,
+    so this retires the cached card of the question.
+    """
+    Question.objects.filter(id=instance.question_id).update(modified=timezone.now())
+
+
+@receiver(post_save, sender=Question)
+def update_tag_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Count new questions, move re-tagged ones between tag summaries and add
+    the votes a save changed.
+    """
+    if raw:
+        return
+    previous_tag_id = getattr(instance, "_loaded_tag_id", instance.tag_id)
+    previous_votes = getattr(instance, "_loaded_total_votes", None)
+    if previous_votes is None:
+        previous_votes = instance.total_votes
+    if created:
+        question_added(instance.tag_id, instance.total_votes, instance.created)
+    elif previous_tag_id != instance.tag_id:
+        question_removed(previous_tag_id, previous_votes)
+        question_added(instance.tag_id, instance.total_votes, instance.created)
+    elif previous_votes != instance.total_votes and instance.tag_id is not None:
+        votes_added({instance.id: instance.total_votes - previous_votes})
+    instance._loaded_tag_id = instance.tag_id
+    instance._loaded_total_votes = instance.total_votes
+
+
+@receiver(post_delete, sender=Question)
+def update_tag_summary_on_delete(sender, instance, **kwargs):
+    question_removed(instance.tag_id, instance.total_votes)
+
+
+@receiver(post_save, sender=Question)
+def update_archive_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Count new questions and move re-dated ones between archive months.
+
+    Fixture loads save raw: inserted questions are counted the same way, a
+    replaced one refreshes its new month, as its previous date is unknown.
+    """
+    if raw:
+        if created:
+            question_archived(instance.id, instance.created)
+        else:
+            refresh_archive_buckets([archive_month(instance.created)])
+        return
+    previous_created = getattr(instance, "_loaded_created", instance.created)
+    if created:
+        question_archived(instance.id, instance.created)
+    elif archive_month(previous_created) != archive_month(instance.created):
+        question_unarchived(previous_created)
+        question_archived(instance.id, instance.created)
+    instance._loaded_created = instance.created
+
+
+@receiver(post_delete, sender=Question)
+def update_archive_on_delete(sender, instance, **kwargs):
+    question_unarchived(instance.created)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def update_search_index_on_question_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_questions([instance.id])
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def update_search_index_on_choice_change(sender, instance, raw=False, **kwargs):
+    """
+    Choice titles are part of their question's search document.
+    """
+    if not raw:
+        index_questions([instance.question_id])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_summaries(sender, instance, **kwargs):
+    cache.delete(TAG_SUMMARY_CACHE_KEY)
+
+
+@receiver(post_migrate)
+def reset_search_backend_after_migrate(sender, using, **kwargs):
+    """
+    The search table may have been created or dropped by the migration.
+    """
+    reset_search_backend(using)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from polls.constants import TAG_SUMMARY_CACHE_KEY, TAG_SUMMARY_CACHE_TIMEOUT
+from polls.models import Question, Tag, TagSummary
+
+
+def get_tag_summaries() -> List[Dict[str, Any]]:
+    """
+    Return every tag with its question statistics, most popular first.
+
+    The list is cached and invalidated whenever a summary changes.
+
+    :return: List of dicts with id, title, question_count, total_votes and
+        latest_created.
+    """
+    summaries = cache.get(TAG_SUMMARY_CACHE_KEY)
+    if summaries is None:
+        summaries = list(
+            Tag.objects.annotate(
+                question_count=Coalesce(F("summary__question_count"), 0),
+                total_votes=Coalesce(F("summary__total_votes"), 0),
+                latest_created=F("summary__latest_created"),
+            )
+            .order_by("-question_count", "title")
+            .values("id", "title", "question_count", "total_votes", "latest_created")
+        )
+        cache.set(TAG_SUMMARY_CACHE_KEY, summaries, TAG_SUMMARY_CACHE_TIMEOUT)
+    return summaries
+
+
+def refresh_tag_summaries(tag_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute tag summaries with one grouped query over the questions table.
+
+    :param tag_ids: Only refresh these tags; all tags when None.
+    :return: The number of summaries written.
+    """
+    tags = Tag.objects.all()
+    if tag_ids is not None:
+        tags = tags.filter(id__in=list(tag_ids))
+    rows = tags.annotate(
+        question_count=Count("tag"),
+        total_votes=Coalesce(Sum("tag__total_votes"), 0),
+        latest_created=Max("tag__created"),
+    ).values_list("id", "question_count", "total_votes", "latest_created")
+    summaries = [
+        TagSummary(
+            tag_id=tag_id,
+            question_count=count,
+            total_votes=votes,
+            latest_created=latest,
+        )
+        for tag_id, count, votes, latest in rows
+    ]
+    TagSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=["tag"],
+        update_fields=["question_count", "total_votes", "latest_created"],
+    )
+    cache.delete(TAG_SUMMARY_CACHE_KEY)
+    return len(summaries)
+
+
+def question_added(tag_id: Optional[int], total_votes: int, created) -> None:
+    """
+    Count a question that joined a tag.
+    """
+    if tag_id is None:
+        return
+    updated = TagSummary.objects.filter(tag_id=tag_id).update(
+        question_count=F("question_count") + 1,
+        total_votes=F("total_votes") + total_votes,
+        latest_created=Greatest(
+            Coalesce("latest_created", Value(created)), Value(created)
+        ),
+    )
+    if not updated:
+        refresh_tag_summaries([tag_id])
+        return
+    cache.delete(TAG_SUMMARY_CACHE_KEY)
+
+
+def question_removed(tag_id: Optional[int], total_votes: int) -> None:
+    """
+    Discount a question that left a tag or was deleted.
+    """
+    if tag_id is None:
+        return
+    latest = Question.objects.filter(tag_id=tag_id).aggregate(latest=Max("created"))
+    updated = TagSummary.objects.filter(tag_id=tag_id).update(
+        question_count=F("question_count") - 1,
+        total_votes=F("total_votes") - total_votes,
+        latest_created=latest["latest"],
+    )
+    # without questions left there is nothing to summarise, and the tag may
+    # be the one being deleted with its questions and summary
+    if not updated and latest["latest"] is not None:
+        refresh_tag_summaries([tag_id])
+        return
+    cache.delete(TAG_SUMMARY_CACHE_KEY)
+
+
+def votes_added(deltas: Dict[int, int]) -> int:
+    """
+    Add votes counted with ``update()`` calls, which send no signal, to the
+    summaries of the voted questions' tags. A single question costs one
+    UPDATE, a batch a lookup of the tags and one grouped UPDATE. The cached
+    tag list picks the votes up when it expires or a question changes.
+
+    :param deltas: Mapping of Question id to the votes added.
+    :return: Number of updated summaries.
+    """
+    deltas = {question_id: votes for question_id, votes in deltas.items() if votes}
+    if len(deltas) == 1:
+        ((question_id, votes),) = deltas.items()
+        return TagSummary.objects.filter(tag__tag=question_id).update(
+            total_votes=F("total_votes") + votes
+        )
+    tag_deltas: Counter = Counter()
+    questions = Question.objects.filter(id__in=sorted(deltas), tag__isnull=False)
+    for question_id, tag_id in questions.values_list("id", "tag_id"):
+        tag_deltas[tag_id] += deltas[question_id]
+    if not tag_deltas:
+        return 0
+    increment = Case(
+        *[
+            When(tag_id=tag_id, then=Value(votes))
+            for tag_id, votes in tag_deltas.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return TagSummary.objects.filter(tag_id__in=sorted(tag_deltas)).update(
+        total_votes=F("total_votes") + increment
+    )
+
+
+def refresh_question_tags(question_ids: Iterable[int]) -> int:
+    """
+    Recompute the summaries of the tags of the given questions, after their
+    ``total_votes`` were set rather than incremented.
+
+    :return: The number of summaries written.
+    """
+    tag_ids = (
+        Question.objects.filter(id__in=list(question_ids), tag__isnull=False)
+        .values_list("tag_id", flat=True)
+        .distinct()
+    )
+    tag_ids = list(tag_ids)
+    return refresh_tag_summaries(tag_ids) if tag_ids else 0
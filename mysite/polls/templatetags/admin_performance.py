@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import hashlib
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.cache import cache
+
+from polls.constants import (
+    ADMIN_CURSOR_VAR,
+    ADMIN_DATE_HIERARCHY_CACHE_KEY,
+    ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT,
+)
+
+register = template.Library()
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def cached_date_hierarchy(cl):
+    """
+    Render the admin date hierarchy with its buckets cached.
+
+    The buckets come from MIN/MAX and date truncation queries over the
+    whole changelist, so they are cached per model and filter, search and
+    drill-down parameters, ignoring the page.
+
+    :param cl: The ChangeList.
+    :return: The date_hierarchy.html context.
+    """
+    query = cl.get_query_string(remove=[PAGE_VAR, ADMIN_CURSOR_VAR])
+    key = ADMIN_DATE_HIERARCHY_CACHE_KEY.format(
+        label=cl.model._meta.label_lower,
+        query=hashlib.md5(query.encode()).hexdigest(),
+    )
+    context = cache.get(key)
+    if context is None:
+        context = date_hierarchy(cl) or {}
+        cache.set(key, context, ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT)
+    return context
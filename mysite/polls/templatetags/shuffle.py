@@ -1,26 +1,63 @@
 # -*- coding: utf-8 -*-
 import random
+
 from django import template
+from django.conf import settings
+from django.utils import timezone
+
+from polls.constants import CHOICE_SHUFFLE_DAY, CHOICE_SHUFFLE_SESSION
 
 register = template.Library()
 
 
 @register.filter
-def shuffle(arg):
+def shuffle(arg, seed=None):
     """
     Shuffle the elements of a list or iterable.
 
     :param arg: The list or iterable to shuffle.
-    :return: A new list with elements shuffled.
+    :param seed: Seed of the order; the same seed gives the same order.
+        Without it the order is random on every render.
+    :return: Shuffled list of the elements.
     """
     try:
-        # Convert to list to ensure it can be shuffled
-        tmp = list(arg)
-        random.shuffle(tmp)
-        return tmp
+        items = list(arg)
     except TypeError:
         # Handle case where arg is not iterable
         return arg
+    random.Random(seed).shuffle(items)
+    return items
+
+
+@register.simple_tag(takes_context=True)
+def choice_shuffle_seed(context):
+    """
+    Seed of the choice order: the current day, or the visitor's session
+    with ``POLLS_CHOICE_SHUFFLE = "session"``.
+
+    Add it to the key of cached fragments holding shuffled choices.
+    """
+    mode = getattr(settings, "POLLS_CHOICE_SHUFFLE", CHOICE_SHUFFLE_DAY)
+    request = context.get("request")
+    if mode == CHOICE_SHUFFLE_SESSION and request is not None:
+        session_key = getattr(request, "session", None) and request.session.session_key
+        if session_key:
+            return session_key
+    return timezone.localdate().isoformat()
+
+
+@register.simple_tag
+def shuffled_choices(question, seed):
+    """
+    The choices of a question in a stable order for ``seed``, read from the
+    prefetched choices when there are any.
+
+    Usage::
+
+        {% shuffled_choices question shuffle_seed as choices %}
+        {% for choice in choices %}...{% endfor %}
+    """
+    return shuffle(question.choice.all(), "%s:%s" % (seed, question.id))
 
 
 # @register.filter
@@ -1,10 +1,44 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import datetime
+import json
+import os
+import tempfile
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from io import StringIO
 from django.urls import reverse
-from .models import Question
+from django.core.cache import cache
+from .models import ArchiveBucket, Question, Choice, Tag, TagSummary, VoteShard
+from .archive import refresh_archive_buckets
+from accounts.models import User
+from .vote_buffer import VoteBuffer
+from .utils import record_vote, update_vote_data_choice_id
+from .counters import compact_vote_shards
+from .live import TallyHub
+from .pagination import get_question_ordering
+from .summaries import get_tag_summaries, refresh_tag_summaries
+from .services import create_poll
+from .reconcile import reconcile
+from .search import (
+    create_search_index,
+    get_search_backend,
+    reset_search_backend,
+    search_questions,
+)
+from .templatetags.shuffle import shuffle, shuffled_choices
+from .admin_performance import KeysetChangeList, estimated_count
+from .constants import ADMIN_CURSOR_VAR, SEARCH_TABLE, SEED_CREATED_SPREAD_DAYS
+from . import urls
+from mysite import fixtures
+from mysite.querybudget import QueryBudgetMixin
 
 
 class QuestionModelTests(TestCase):
@@ -47,6 +81,11 @@ def create_question(title, days):
 
 
 class QuestionIndexViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # anonymous visitors are redirected before the view runs
+        self.client.force_login(User.objects.create_user(username="reader"))
+
     def test_no_questions(self):
         """
         If no questions exist, an appropriate message is displayed.
@@ -102,6 +141,9 @@ class QuestionIndexViewTests(TestCase):
 
 
 class QuestionDetailViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_future_question(self):
         """
         The detail view of a question with a pub_date in the future
@@ -121,3 +163,850 @@ class QuestionDetailViewTests(TestCase):
         url = reverse("details", args=(past_question.id,))
         response = self.client.get(url)
         self.assertContains(response, past_question.title)
+
+
+class VoteBufferTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(title="Buffered question.")
+        self.first = Choice.objects.create(question=self.question, title="First")
+        self.second = Choice.objects.create(question=self.question, title="Second")
+        self.buffer = VoteBuffer(flush_interval=60, max_pending=10)
+        self.addCleanup(self.buffer.flush)
+
+    def test_pending_votes_are_merged_into_reads(self):
+        """
+        Votes waiting in the buffer are not written yet but are reported
+        alongside the database state by merge_pending().
+        """
+        self.buffer.add(self.question.id, self.first.id)
+        self.buffer.add(self.question.id, self.first.id)
+        self.buffer.add(self.question.id, self.second.id)
+        choice, pending = self.buffer.merge_pending(
+            self.question.id, lambda: Choice.objects.get(id=self.first.id)
+        )
+        self.assertEqual(choice.votes, 0)
+        self.assertEqual(pending, {self.first.id: 2, self.second.id: 1})
+
+    def test_flush_writes_grouped_deltas(self):
+        """
+        flush() adds every pending delta to the choice and question counters.
+        """
+        self.buffer.add(self.question.id, self.first.id)
+        self.buffer.add(self.question.id, self.first.id)
+        self.buffer.add(self.question.id, self.second.id)
+        self.assertEqual(self.buffer.flush(), 3)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.question.refresh_from_db()
+        self.assertEqual((self.first.votes, self.second.votes), (2, 1))
+        self.assertEqual(self.question.total_votes, 3)
+        self.assertEqual(self.buffer.pending_for_question(self.question.id), {})
+
+    def test_size_threshold_flushes_immediately(self):
+        """
+        Reaching max_pending writes the buffer without waiting for the timer.
+        """
+        for _ in range(10):
+            self.buffer.add(self.question.id, self.second.id)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.votes, 10)
+
+
+class RecordVoteTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(title="Voted question.")
+        self.choice = Choice.objects.create(question=self.question, title="Yes")
+        self.other = Question.objects.create(title="Other question.")
+
+    def test_vote_returns_fresh_tally(self):
+        """
+        record_vote() increments both counters and returns the new tally.
+        """
+        record_vote(self.question.id, self.choice.id)
+        tally = record_vote(self.question.id, self.choice.id)
+        self.assertEqual(tally["question_total_votes"], 2)
+        self.assertEqual(
+            tally["choices_data"], {self.choice.id: {"title": "Yes", "votes": 2}}
+        )
+
+    def test_mismatched_choice_is_rejected(self):
+        """
+        A choice voted under another question raises and leaves totals alone.
+        """
+        with self.assertRaises(Choice.DoesNotExist):
+            record_vote(self.other.id, self.choice.id)
+        self.other.refresh_from_db()
+        self.choice.refresh_from_db()
+        self.assertEqual((self.other.total_votes, self.choice.votes), (0, 0))
+
+
+@override_settings(POLLS_VOTE_MODE="sharded", POLLS_VOTE_SHARDS=4)
+class ShardedVoteTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(title="Sharded question.")
+        self.choice = Choice.objects.create(question=self.question, title="Yes")
+
+    def vote(self, question_id=None):
+        return update_vote_data_choice_id(
+            {
+                "questionId": question_id or self.question.id,
+                "choiceId": self.choice.id,
+            }
+        )
+
+    def test_votes_land_on_shards_and_are_summed_on_read(self):
+        """
+        Sharded votes leave the canonical counters untouched but are included
+        in the returned tally.
+        """
+        for _ in range(5):
+            tally = self.vote()
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.votes, 0)
+        self.assertEqual(tally["question_total_votes"], 5)
+        self.assertEqual(tally["choices_data"][self.choice.id]["votes"], 5)
+        self.assertLessEqual(VoteShard.objects.count(), 4)
+
+    def test_compaction_folds_shards_into_counters(self):
+        """
+        compact_vote_shards() moves shard counts to the canonical columns.
+        """
+        for _ in range(5):
+            self.vote()
+        self.assertEqual(compact_vote_shards(), 5)
+        self.choice.refresh_from_db()
+        self.question.refresh_from_db()
+        self.assertEqual((self.choice.votes, self.question.total_votes), (5, 5))
+        self.assertEqual(self.vote()["question_total_votes"], 6)
+
+    def test_mismatched_choice_creates_no_shard(self):
+        """
+        A choice voted under another question is rejected.
+        """
+        other = Question.objects.create(title="Other question.")
+        with self.assertRaises(Choice.DoesNotExist):
+            self.vote(question_id=other.id)
+        self.assertFalse(VoteShard.objects.exists())
+
+
+class TallyHubTests(SimpleTestCase):
+    def test_votes_are_coalesced_into_one_read_per_question(self):
+        """
+        Many votes on a watched question cause one read, fanned out to every
+        subscriber; unwatched questions are never read.
+        """
+        reads = []
+
+        def read(question_id):
+            reads.append(question_id)
+            return {"question_total_votes": 3, "choices_data": {}}
+
+        async def scenario():
+            hub = TallyHub(interval=60, read=read)
+            first = hub.subscribe([1])
+            second = hub.subscribe([1, 2])
+            for question_id in (1, 1, 1, 3):
+                hub.publish(question_id)
+            self.assertEqual(await hub.broadcast(), 1)
+            updates = first.get_nowait(), second.get_nowait()
+            hub.unsubscribe(first, [1])
+            hub.unsubscribe(second, [1, 2])
+            return updates
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(reads, [1])
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], 1)
+
+
+class LiveTallyStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username="reader"))
+        self.question = Question.objects.create(title="Live?")
+
+    def test_stream_is_refused_without_the_setting_or_asgi(self):
+        """
+        The stream would hold a WSGI worker, it is only served over ASGI
+        with POLLS_LIVE_TALLIES on.
+        """
+        params = {"questions": self.question.id}
+        response = self.client.get(reverse("tally-stream"), params)
+        self.assertEqual(response.status_code, 404)
+        with self.settings(POLLS_LIVE_TALLIES=True):
+            response = self.client.get(reverse("tally-stream"), params)
+        self.assertEqual(response.status_code, 404)
+
+    def test_cards_subscribe_only_with_the_setting(self):
+        self.assertNotContains(self.client.get(reverse("index")), "data-live-tally")
+        cache.clear()
+        with self.settings(POLLS_LIVE_TALLIES=True):
+            response = self.client.get(reverse("index"))
+        self.assertContains(response, "data-live-tally", count=1)
+        self.assertContains(response, "js/live_tallies.js")
+
+
+class IndexCursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username="reader"))
+        now = timezone.now()
+        for index in range(12):
+            Question.objects.create(title="Question %d" % index)
+        Question.objects.update(created=now - datetime.timedelta(days=1))
+
+    def test_pages_follow_cursor_without_counting(self):
+        """
+        The index pages with a keyset cursor, keeps the filters in the next
+        page url and never issues a COUNT query.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("index"), {"orderby": "created"})
+        self.assertEqual(len(response.context["questions"]), 10)
+        next_page_url = response.context["next_page_url"]
+        self.assertIn("cursor=", next_page_url)
+        self.assertIn("orderby=created", next_page_url)
+        self.assertFalse(
+            any("COUNT(" in query["sql"].upper() for query in queries.captured_queries)
+        )
+
+        response = self.client.get(next_page_url)
+        seen = [question.title for question in response.context["questions"]]
+        self.assertEqual(len(seen), 2)
+        self.assertIsNone(response.context["next_page_url"])
+
+    def test_unknown_ordering_falls_back_to_default(self):
+        """
+        Orderings outside the registry, including joined columns, are ignored.
+        """
+        self.assertEqual(get_question_ordering("tag__title"), ("created", True))
+        response = self.client.get(reverse("index"), {"orderby": "description"})
+        titles = [question.title for question in response.context["questions"]]
+        self.assertEqual(titles[0], "Question 11")
+
+
+class PollCardCacheTests(TestCase):
+    def test_saving_a_choice_retires_the_cached_card(self):
+        """
+        Adding a choice bumps question.modified, which keys the card fragment.
+        """
+        question = Question.objects.create(title="Cached question.")
+        before = question.modified
+        Choice.objects.create(question=question, title="New choice")
+        question.refresh_from_db()
+        self.assertGreater(question.modified, before)
+
+
+class ChoiceShuffleTests(TestCase):
+    def test_order_is_a_stable_permutation(self):
+        """
+        The same seed gives the same order of every item, other seeds vary it.
+        """
+        for size in (0, 1, 2, 7, 10, 100):
+            items = list(range(size))
+            order = shuffle(items, "2026-10-18:1")
+            self.assertEqual(sorted(order), items)
+            self.assertEqual(shuffle(items, "2026-10-18:1"), order)
+        orders = {tuple(shuffle(range(10), seed)) for seed in range(20)}
+        self.assertGreater(len(orders), 1)
+
+    def test_prefetched_choices_are_shuffled_without_queries(self):
+        """
+        The tag shuffles the prefetched choices.
+        """
+        question = Question.objects.create(title="Shuffled?")
+        Choice.objects.bulk_create(
+            Choice(question=question, title=str(index)) for index in range(5)
+        )
+        question = Question.objects.prefetch_related("choice").get(id=question.id)
+        with self.assertNumQueries(0):
+            choices = shuffled_choices(question, "2026-10-18")
+            self.assertEqual(len(list(choices)), 5)
+            self.assertEqual(
+                list(choices), list(shuffled_choices(question, "2026-10-18"))
+            )
+
+
+class TagSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.python = Tag.objects.create(title="python")
+        self.django = Tag.objects.create(title="django")
+
+    def test_summaries_follow_question_changes(self):
+        """
+        Creating, re-tagging and deleting questions keeps the counts current.
+        """
+        first = Question.objects.create(title="First.", tag=self.python)
+        Question.objects.create(title="Second.", tag=self.python, total_votes=3)
+        counts = {s["title"]: s["question_count"] for s in get_tag_summaries()}
+        self.assertEqual(counts, {"python": 2, "django": 0})
+
+        first = Question.objects.get(id=first.id)
+        first.tag = self.django
+        first.save()
+        Question.objects.filter(tag=self.python).delete()
+        counts = {s["title"]: s["question_count"] for s in get_tag_summaries()}
+        self.assertEqual(counts, {"python": 0, "django": 1})
+        self.assertEqual(TagSummary.objects.get(tag=self.python).total_votes, 0)
+
+    def test_summaries_take_votes_from_questions(self):
+        """
+        Votes counted without a save still leave the summary at the tag's
+        real total when a question is re-tagged or deleted.
+        """
+        voted = Question.objects.create(title="Voted.", tag=self.python)
+        choice = Choice.objects.create(question=voted, title="Yes.")
+        Question.objects.create(title="Other.", tag=self.python, total_votes=2)
+        for _ in range(3):
+            record_vote(voted.id, choice.id)
+
+        voted = Question.objects.get(id=voted.id)
+        voted.tag = self.django
+        voted.save()
+        self.assertEqual(TagSummary.objects.get(tag=self.python).total_votes, 2)
+        self.assertEqual(TagSummary.objects.get(tag=self.django).total_votes, 3)
+
+        voted.delete()
+        self.assertEqual(TagSummary.objects.get(tag=self.django).total_votes, 0)
+
+    def test_summaries_add_vote_deltas(self):
+        """
+        Saves add the change of total_votes, and buffered votes their
+        flushed deltas, without summing the tag's questions.
+        """
+        first = Question.objects.create(title="First.", tag=self.python)
+        second = Question.objects.create(title="Second.", tag=self.python)
+        choice = Choice.objects.create(question=second, title="Yes.")
+        first = Question.objects.get(id=first.id)
+        first.total_votes = 4
+        first.save()
+        self.assertEqual(TagSummary.objects.get(tag=self.python).total_votes, 4)
+
+        buffer = VoteBuffer(flush_interval=60, max_pending=10)
+        buffer.add(second.id, choice.id)
+        buffer.add(second.id, choice.id)
+        buffer.flush()
+        self.assertEqual(TagSummary.objects.get(tag=self.python).total_votes, 6)
+
+    def test_deleting_a_tag_drops_its_summary(self):
+        """
+        The cascade delete of a tag's questions does not recreate the summary
+        of the tag being deleted.
+        """
+        Question.objects.create(title="First.", tag=self.python, total_votes=1)
+        Question.objects.create(title="Second.", tag=self.python)
+        TagSummary.objects.filter(tag=self.python).delete()
+        self.python.delete()
+        self.assertFalse(TagSummary.objects.filter(tag_id=self.python.id).exists())
+        self.assertEqual([s["title"] for s in get_tag_summaries()], ["django"])
+
+    def test_summaries_are_cached(self):
+        """
+        The tag list is served from the cache until a summary changes.
+        """
+        get_tag_summaries()
+        with self.assertNumQueries(0):
+            get_tag_summaries()
+        Question.objects.create(title="Fresh.", tag=self.django)
+        Question.objects.filter(tag=self.django).update(total_votes=7)
+        self.assertEqual(refresh_tag_summaries(), 2)
+        summary = get_tag_summaries()[0]
+        self.assertEqual((summary["title"], summary["total_votes"]), ("django", 7))
+
+
+class SeedPollsTests(TestCase):
+    def seed(self, questions):
+        out = StringIO()
+        call_command(
+            "seed_polls",
+            questions=questions,
+            choices=3,
+            batch_size=4,
+            seed=7,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_seeds_spread_dates_and_resumes(self):
+        """
+        seed_polls inserts the target rows with created spread over the last
+        year, and a second run only adds the missing questions.
+        """
+        self.seed(6)
+        self.assertEqual(Question.objects.count(), 6)
+        self.assertEqual(Choice.objects.count(), 18)
+        created = list(Question.objects.values_list("created", flat=True))
+        self.assertEqual(len(set(created)), 6)
+        self.assertLess(
+            max(created) - min(created),
+            datetime.timedelta(days=SEED_CREATED_SPREAD_DAYS),
+        )
+        self.assertGreater(max(created) - min(created), datetime.timedelta(days=1))
+        question = Question.objects.order_by("id").first()
+        self.assertEqual(
+            set(question.choice.values_list("created", flat=True)), {question.created}
+        )
+        self.assertEqual(
+            question.total_votes, sum(question.choice.values_list("votes", flat=True))
+        )
+
+        self.assertIn("Seeding questions 7 to 10", self.seed(10))
+        self.assertEqual(Question.objects.count(), 10)
+        self.assertEqual(Choice.objects.count(), 30)
+        self.assertIn("10 sample questions already seeded", self.seed(10))
+        self.assertEqual(Question.objects.count(), 10)
+
+
+class PollCreationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="importer", password="x")
+        self.client.force_login(self.user)
+
+    def test_create_poll_inserts_choices_in_one_query(self):
+        """
+        All choices of a poll are inserted by a single bulk INSERT.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            question = create_poll(Question(title="Bulk?"), ["Yes", "", "No"])
+        inserts = [
+            q for q in queries if q["sql"].startswith('INSERT INTO "polls_choice"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            sorted(question.choice.values_list("title", flat=True)), ["No", "Yes"]
+        )
+
+    def test_import_csv_in_chunks(self):
+        """
+        CSV uploads create the polls, their choices and missing tags.
+        """
+        body = "title,description,tag,choices\n" + "".join(
+            "Poll %d,,imported,A|B\n" % index for index in range(3)
+        )
+        response = self.client.post(
+            reverse("polls-import"), body, content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"imported": 3})
+        self.assertEqual(
+            Choice.objects.filter(question__tag__title="imported").count(), 6
+        )
+        self.assertEqual(
+            TagSummary.objects.get(tag__title="imported").question_count, 3
+        )
+
+    def test_import_reports_invalid_rows(self):
+        """
+        An invalid JSON Lines row is rejected with its position.
+        """
+        body = '{"title": "Fine", "choices": ["A"]}\n{"choices": ["B"]}\n'
+        response = self.client.post(
+            reverse("polls-import"), body, content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"error": "Invalid poll at row 2", "imported": 0}
+        )
+        self.assertFalse(Question.objects.exists())
+
+    def test_import_rejects_rows_the_columns_cannot_hold(self):
+        """
+        A tag that is not a string and titles longer than their columns are
+        row errors, not database errors.
+        """
+        long_title = "x" * (Question._meta.get_field("title").max_length + 1)
+        for row in (
+            {"title": "Tagged", "tag": 5},
+            {"title": "Tagged", "tag": ["a", "b"]},
+            {"title": long_title},
+            {"title": "Long choice", "choices": ["A", long_title]},
+            {"title": "Long tag", "tag": long_title},
+        ):
+            response = self.client.post(
+                reverse("polls-import"),
+                json.dumps(row) + "\n",
+                content_type="application/x-ndjson",
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.json(), {"error": "Invalid poll at row 1", "imported": 0}
+            )
+        self.assertFalse(Question.objects.exists())
+
+    @mock.patch.object(fixtures, "ijson", None)
+    @mock.patch.object(fixtures, "READ_CHUNK_SIZE", 16)
+    def test_import_json_array_is_streamed(self):
+        """
+        A JSON array body is read in chunks and an invalid element is
+        rejected with its position.
+        """
+        polls = [
+            {"title": "Poll %d" % index, "choices": ["A", "B"]} for index in range(3)
+        ]
+        response = self.client.post(
+            reverse("polls-import"), polls, content_type="application/json"
+        )
+        self.assertEqual(response.json(), {"imported": 3})
+        body = json.dumps(polls)[:-1] + ', {"title": '
+        response = self.client.post(
+            reverse("polls-import"), body, content_type="application/json"
+        )
+        self.assertEqual(
+            response.json(), {"error": "Invalid poll at row 4", "imported": 0}
+        )
+        self.assertEqual(Question.objects.count(), 3)
+
+
+class ReconcileVotesTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(title="Drifted?")
+        Choice.objects.create(question=self.question, title="A", votes=2)
+        Choice.objects.create(question=self.question, title="B", votes=3)
+        self.in_sync = Question.objects.create(title="In sync?")
+
+    def test_drift_is_detected_and_repaired(self):
+        """
+        Only the drifted question is repaired, window by window.
+        """
+        report = reconcile(batch_size=1)
+        self.assertEqual((report.checked, report.drifted), (2, 1))
+        self.assertEqual((report.drift, report.repaired), (5, 1))
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.total_votes, 5)
+        self.assertEqual(reconcile().drifted, 0)
+
+    def test_incremental_run_checks_recently_modified_questions(self):
+        """
+        Questions modified before ``since`` are left alone.
+        """
+        report = reconcile(since=timezone.now())
+        self.assertEqual((report.checked, report.drifted), (0, 0))
+
+    def test_choice_reset_keeps_question_total_in_sync(self):
+        """
+        Resetting choices in the admin reconciles their question totals.
+        """
+        reconcile()
+        admin = User.objects.create_superuser(username="admin", password="x")
+        self.client.force_login(admin)
+        choice = self.question.choice.get(title="A")
+        self.client.post(
+            reverse("admin:polls_choice_changelist"),
+            {"action": "mark_reset", "_selected_action": [choice.id]},
+        )
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.total_votes, 3)
+
+
+class AdminPerformanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser(username="admin", password="x")
+        self.client.force_login(admin)
+        Question.objects.bulk_create(
+            Question(title="Question %d" % index) for index in range(150)
+        )
+
+    def test_changelist_pages_by_cursor(self):
+        """
+        The changelist links to the next page with a cursor, not a page number,
+        and the cursor pages cover every row once.
+        """
+        url = reverse("admin:polls_question_changelist")
+        response = self.client.get(url)
+        next_page_url = response.context["cl"].next_page_url
+        self.assertIn(ADMIN_CURSOR_VAR + "=", next_page_url)
+        self.assertContains(response, "about 150 results")
+        second = self.client.get(url + next_page_url).context["cl"]
+        self.assertIsNone(second.next_page_url)
+        first_ids = {question.id for question in response.context["cl"].result_list}
+        second_ids = {question.id for question in second.result_list}
+        self.assertEqual(len(first_ids | second_ids), 150)
+
+    @override_settings(POLLS_ADMIN_PERFORMANCE=False)
+    def test_performance_mode_can_be_disabled(self):
+        """
+        Without performance mode the stock numbered paginator is used.
+        """
+        response = self.client.get(reverse("admin:polls_question_changelist"))
+        self.assertNotIsInstance(response.context["cl"], KeysetChangeList)
+        self.assertContains(response, "?p=2")
+
+    def test_unfiltered_count_is_cached(self):
+        """
+        The unfiltered count is served from the cache on other databases.
+        """
+        self.assertEqual(estimated_count(Question.objects.all()), 150)
+        Question.objects.create(title="Uncounted")
+        with self.assertNumQueries(0):
+            self.assertEqual(estimated_count(Question.objects.all()), 150)
+        self.assertEqual(estimated_count(Question.objects.filter(title="Uncounted")), 1)
+
+
+class PollSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_search_index(connection)
+        self.addCleanup(reset_search_backend)
+        self.client.force_login(User.objects.create_user(username="reader"))
+        self.title = create_poll(
+            Question(title="Favourite programming language?"), ["Go"]
+        )
+        self.choice = create_poll(Question(title="Best editor?"), ["Vim", "Emacs"])
+        self.other = create_poll(Question(title="Coffee or tea?"), ["Coffee", "Tea"])
+
+    def test_matches_are_ranked(self):
+        """
+        A title match ranks above a choice match.
+        """
+        Choice.objects.create(question=self.choice, title="Programming fonts")
+        results = search_questions(Question.objects.all(), "programming", 10)
+        self.assertEqual(results, [self.title, self.choice])
+
+    def test_index_follows_edits(self):
+        """
+        Saved and deleted questions and choices update the index.
+        """
+        self.other.title = "Morning drink?"
+        self.other.save()
+        self.other.choice.get(title="Tea").delete()
+        self.assertEqual(
+            search_questions(Question.objects.all(), "coffee", 10), [self.other]
+        )
+        self.assertEqual(search_questions(Question.objects.all(), "tea", 10), [])
+        self.choice.delete()
+        self.assertEqual(search_questions(Question.objects.all(), "vim", 10), [])
+
+    def test_search_syntax_is_escaped(self):
+        """
+        Operators and quotes in the query are searched as plain words.
+        """
+        results = search_questions(Question.objects.all(), 'tea" OR NOT*', 10)
+        self.assertEqual(results, [])
+        results = search_questions(Question.objects.all(), "  tea?! ", 10)
+        self.assertEqual(results, [self.other])
+
+    def test_index_view_pages_search_results(self):
+        """
+        The ``q`` parameter pages ranked results with the infinite scroll.
+        """
+        for index in range(12):
+            create_poll(Question(title="Tea poll %d" % index), ["Yes"])
+        response = self.client.get(reverse("index"), {"q": "tea"})
+        self.assertEqual(len(response.context["questions"]), 10)
+        self.assertIn("page=2", response.context["next_page_url"])
+        response = self.client.get(response.context["next_page_url"])
+        self.assertEqual(len(response.context["questions"]), 3)
+        self.assertIsNone(response.context["next_page_url"])
+
+    def test_backend_is_looked_up_again_after_migrate(self):
+        """
+        The search table is checked once per connection until a migrate.
+        """
+        self.assertIsNotNone(get_search_backend())
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE %s" % SEARCH_TABLE)
+        self.assertIsNotNone(get_search_backend())
+        emit_post_migrate_signal(0, False, "default")
+        self.assertIsNone(get_search_backend())
+
+
+class ArchiveBucketTests(TestCase):
+    # stream_loaddata opens a transaction on every database
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username="reader"))
+        self.january = self.question("January?", 2025, 1, 10)
+        self.late_january = self.question("Late January?", 2025, 1, 31, 23)
+        self.march = self.question("March?", 2025, 3, 5)
+        self.last_year = self.question("Last year?", 2024, 11, 2)
+
+    def question(self, title, *created):
+        # created is set on insert, so re-date the question like an edit
+        question = Question.objects.create(title=title)
+        question.created = timezone.make_aware(datetime.datetime(*created))
+        question.save()
+        return question
+
+    def buckets(self):
+        return list(
+            ArchiveBucket.objects.order_by("month").values_list(
+                "month", "question_count"
+            )
+        )
+
+    def test_buckets_follow_inserts_deletes_and_redates(self):
+        """
+        Incremental updates match a full recomputation.
+        """
+        self.assertEqual(
+            self.buckets(),
+            [
+                (datetime.date(2024, 11, 1), 1),
+                (datetime.date(2025, 1, 1), 2),
+                (datetime.date(2025, 3, 1), 1),
+            ],
+        )
+        self.march.created = timezone.make_aware(datetime.datetime(2025, 1, 20))
+        self.march.save()
+        self.last_year.delete()
+        self.assertEqual(self.buckets(), [(datetime.date(2025, 1, 1), 3)])
+        incremental = self.buckets()
+        refresh_archive_buckets()
+        self.assertEqual(self.buckets(), incremental)
+
+    def test_archive_views_navigate_with_buckets(self):
+        """
+        Years, months and their neighbours come from the buckets.
+        """
+        response = self.client.get(reverse("archive-index"))
+        self.assertEqual(
+            response.context["date_list"],
+            [datetime.date(2025, 1, 1), datetime.date(2024, 1, 1)],
+        )
+        response = self.client.get(reverse("archive-index-year", args=[2025]))
+        self.assertEqual(
+            response.context["date_list"],
+            [datetime.date(2025, 1, 1), datetime.date(2025, 3, 1)],
+        )
+        self.assertEqual(response.context["previous_year"], datetime.date(2024, 1, 1))
+        self.assertIsNone(response.context["next_year"])
+        response = self.client.get(reverse("archive-index-month", args=[2025, "jan"]))
+        self.assertEqual(
+            set(response.context["object_list"]), {self.january, self.late_january}
+        )
+        self.assertEqual(response.context["next_month"], datetime.date(2025, 3, 1))
+        self.assertEqual(response.context["previous_month"], datetime.date(2024, 11, 1))
+        response = self.client.get(reverse("archive-index-month", args=[2025, "feb"]))
+        # handler404 renders the error page
+        self.assertTemplateUsed(response, "stock/error.html")
+
+    def test_fixture_loads_fill_the_buckets(self):
+        """
+        Questions loaded by loaddata and stream_loaddata, which send no
+        regular save signals, are counted in their months.
+        """
+        ArchiveBucket.objects.all().delete()
+
+        def fixture(*ids):
+            return [
+                {
+                    "model": "polls.question",
+                    "pk": pk,
+                    "fields": {
+                        "title": "Loaded %d?" % pk,
+                        "created": "2025-05-%02dT12:00:00Z" % (pk % 28 + 1),
+                        "modified": "2025-05-%02dT12:00:00Z" % (pk % 28 + 1),
+                    },
+                }
+                for pk in ids
+            ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "questions.json")
+            with open(path, "w") as stream:
+                json.dump(fixture(1000, 1001), stream)
+            call_command("loaddata", path, verbosity=0)
+            self.assertEqual(self.buckets(), [(datetime.date(2025, 5, 1), 2)])
+
+            with open(path, "w") as stream:
+                json.dump(fixture(1002, 1003), stream)
+            call_command("stream_loaddata", path, stdout=StringIO())
+        self.assertIn((datetime.date(2025, 5, 1), 4), self.buckets())
+        response = self.client.get(reverse("archive-index-month", args=[2025, "may"]))
+        self.assertEqual(len(response.context["object_list"]), 4)
+        response = self.client.get(reverse("archive-index"))
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "index": 5,
+        # the vote is added to its tag summary with one more UPDATE
+        "vote": 8,
+        "tally-stream": 2,
+        "polls-create": 3,
+        # the search index sync is a DELETE and an INSERT on SQLite's FTS5
+        # table, one upsert on PostgreSQL
+        "polls-import": {"sqlite": 18, "postgresql": 17},
+        "polls-users": 5,
+        "archive-index": 5,
+        "archive-index-year": 4,
+        "archive-index-month": 5,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(username="admin")
+        editors = Group.objects.create(name="editors")
+        readers = Group.objects.create(name="readers")
+        for number in range(3):
+            user = User.objects.create_user(username="user%d" % number)
+            user.groups.add(editors, readers)
+        tags = [Tag.objects.create(title="Tag %d" % number) for number in range(3)]
+        for number in range(12):
+            question = Question.objects.create(
+                title="Q%d?" % number, tag=tags[number % 3]
+            )
+            question.created = timezone.make_aware(
+                datetime.datetime(2025, 1 + number % 3, 10)
+            )
+            question.save()
+            for title in ("Yes", "No", "Maybe"):
+                Choice.objects.create(question=question, title=title)
+        refresh_tag_summaries()
+        self.question = question
+        self.client.force_login(self.user)
+
+    def import_polls(self):
+        # created into an archived month, so the bucket refresh does not
+        # depend on the current date
+        imported = timezone.make_aware(datetime.datetime(2025, 1, 20))
+        with mock.patch("django.utils.timezone.now", return_value=imported):
+            return self.client.post(
+                reverse("polls-import"),
+                "title,description,tag,choices\n"
+                + "".join("Poll %d,,Tag %d,A|B\n" % (n, n) for n in range(4)),
+                content_type="text/csv",
+            )
+
+    def budget_requests(self):
+        choice = self.question.choice.first()
+        data = json.dumps({"questionId": self.question.id, "choiceId": choice.id})
+        return [
+            ("index", lambda: self.client.get(reverse("index"))),
+            ("vote", lambda: self.client.post(reverse("vote"), {"data": data})),
+            (
+                "tally-stream",
+                lambda: self.client.get(
+                    reverse("tally-stream"), {"questions": self.question.id}
+                ),
+            ),
+            ("polls-create", lambda: self.client.get(reverse("polls-create"))),
+            ("polls-import", self.import_polls),
+            ("polls-users", lambda: self.client.get(reverse("polls-users"))),
+            ("archive-index", lambda: self.client.get(reverse("archive-index"))),
+            (
+                "archive-index-year",
+                lambda: self.client.get(reverse("archive-index-year", args=[2025])),
+            ),
+            (
+                "archive-index-month",
+                lambda: self.client.get(
+                    reverse("archive-index-month", args=[2025, "jan"])
+                ),
+            ),
+        ]
+
+    def test_every_url_has_a_budget(self):
+        self.assertQueryBudgetsCover(urls.urlpatterns)
+
+    def test_views_stay_within_their_query_budget(self):
+        """
+        Listings hold more rows than REPEATED_QUERY_LIMIT, so a query run per
+        row fails as N+1 whatever the budget.
+        """
+        self.assertQueryBudgets()
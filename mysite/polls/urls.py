@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 from django.urls import path
-from django.views.generic.dates import ArchiveIndexView, YearArchiveView
 from . import views
-from polls.models import Question
 
 # urlpatterns = [
 #     path("", views.index, name="index"),
@@ -14,16 +12,13 @@ from polls.models import Question
 urlpatterns = [
     path("", views.IndexView.as_view(), name="index"),
     path("vote", views.vote, name="vote"),
+    path("live", views.tally_stream, name="tally-stream"),
     path("add", views.PollsCreate.as_view(), name="polls-create"),
+    path("import", views.polls_import, name="polls-import"),
     path("users", views.PollsUsers.as_view(), name="polls-users"),
     path(
         "archive_index/",
-        ArchiveIndexView.as_view(
-            model=Question,
-            date_field="created",
-            paginate_by=100,
-            context_object_name="latest",
-        ),
+        views.QuestionArchiveIndexView.as_view(),
         name="archive-index",
     ),
     path(
@@ -1,24 +1,155 @@
 # -*- coding: utf-8 -*-
 from polls.models import Choice, Question
-from typing import Dict, Any, Pattern
-from django.db.models import F
+from polls.constants import (
+    VOTE_MODE_BUFFERED,
+    VOTE_MODE_DIRECT,
+    VOTE_MODE_SHARDED,
+    VOTE_CHOICE_MISMATCH_ERROR,
+    VOTE_INCREMENT_RETURNING_SQL,
+)
+from polls.counters import increment_sharded
+from polls.summaries import votes_added
+from polls.vote_buffer import vote_buffer
+from typing import Dict, Any, List, Optional, Pattern, Tuple
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
 import re
 
 
+def vote_mode() -> str:
+    """
+    Return the configured vote ingest mode.
+
+    :return: One of "direct", "buffered" or "sharded".
+    """
+    return getattr(settings, "POLLS_VOTE_MODE", VOTE_MODE_DIRECT)
+
+
+def vote_buffering_enabled() -> bool:
+    """
+    Check whether votes are collected in the write-behind buffer.
+
+    :return: True when POLLS_VOTE_MODE is "buffered".
+    """
+    return vote_mode() == VOTE_MODE_BUFFERED
+
+
 def update_vote_data_choice_id(data: dict):
     """
     Update Model Votes with Choice.id & Question.id
 
     :param data: dict
+    :raises Choice.DoesNotExist: If the choice does not belong to the question.
+    """
+    question_id, choice_id = int(data["questionId"]), int(data["choiceId"])
+    if vote_buffering_enabled():
+        if not Choice.objects.filter(id=choice_id, question_id=question_id).exists():
+            raise Choice.DoesNotExist(VOTE_CHOICE_MISMATCH_ERROR)
+        vote_buffer.add(question_id, choice_id)
+        return serialize_data_set_for_ajax_update(question_id)
+    if vote_mode() == VOTE_MODE_SHARDED:
+        if not increment_sharded(question_id, choice_id):
+            raise Choice.DoesNotExist(VOTE_CHOICE_MISMATCH_ERROR)
+        return serialize_data_set_for_ajax_update(question_id)
+    return record_vote(question_id, choice_id)
+
+
+def record_vote(question_id: int, choice_id: int) -> Dict[str, Any]:
+    """
+    Count one vote and return the fresh tally inside a single transaction.
+
+    On PostgreSQL both counters are incremented by one ``UPDATE ... RETURNING``
+    statement, so a vote costs two round trips including the tally read.
+    Other backends run the two ``UPDATE`` statements separately. The vote is
+    added to the summary of the question's tag in the same transaction.
+
+    :param question_id: The ID of the voted Question.
+    :param choice_id: The ID of the voted Choice.
+    :raises Choice.DoesNotExist: If the choice does not belong to the question.
+    :return: A dictionary containing the updated data.
+    """
+    using = router.db_for_write(Choice)
+    with transaction.atomic(using=using):
+        if connections[using].vendor == "postgresql":
+            voted = _increment_vote_returning(using, question_id, choice_id)
+        else:
+            voted = _increment_vote(question_id, choice_id)
+        if not voted:
+            raise Choice.DoesNotExist(VOTE_CHOICE_MISMATCH_ERROR)
+        votes_added({question_id: 1})
+        return _serialize_tally(_read_tally(question_id))
+
 
+def _increment_vote_returning(using: str, question_id: int, choice_id: int) -> bool:
+    choice_table = Choice._meta.db_table
+    question_table = Question._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            VOTE_INCREMENT_RETURNING_SQL.format(
+                choice_table=cursor.db.ops.quote_name(choice_table),
+                question_table=cursor.db.ops.quote_name(question_table),
+            ),
+            [choice_id, question_id],
+        )
+        return cursor.fetchone() is not None
+
+
+def _increment_vote(question_id: int, choice_id: int) -> bool:
+    updated = Choice.objects.filter(id=choice_id, question_id=question_id).update(
+        votes=F("votes") + 1
+    )
+    if updated:
+        Question.objects.filter(id=question_id).update(total_votes=F("total_votes") + 1)
+    return bool(updated)
+
+
+def _read_tally(question_id: int) -> Tuple[int, List[Tuple[int, str, int]]]:
     """
-    choice = Choice.objects.get(id=data["choiceId"])
-    question = Question.objects.get(id=data["questionId"])
-    choice.votes = F("votes") + 1
-    question.total_votes = F("total_votes") + 1
-    choice.save(update_fields=["votes"])
-    question.save(update_fields=["total_votes"])
-    return serialize_data_set_for_ajax_update(data["questionId"])
+    Read the question total and its choices, joined in one query.
+
+    In sharded mode the not yet compacted shard counts are summed into each
+    choice and into the question total.
+
+    :param question_id: The ID of the Question.
+    :return: Tuple of the question total and (id, title, votes) rows.
+    """
+    choices = Choice.objects.filter(question_id=question_id)
+    if vote_mode() == VOTE_MODE_SHARDED:
+        choices = choices.annotate(
+            shard_votes=Coalesce(Sum("vote_shards__votes"), 0)
+        ).values_list("id", "title", "votes", "question__total_votes", "shard_votes")
+    else:
+        choices = choices.values_list(
+            "id", "title", "votes", "question__total_votes", Value(0)
+        )
+    rows = list(choices)
+    if not rows:
+        total = Question.objects.values_list("total_votes", flat=True).get(
+            id=question_id
+        )
+        return total, []
+    total = rows[0][3] + sum(row[4] for row in rows)
+    return total, [(id, title, votes + shard) for id, title, votes, _, shard in rows]
+
+
+def _serialize_tally(
+    tally: Tuple[int, List[Tuple[int, str, int]]],
+    pending: Optional[Dict[int, int]] = None,
+) -> Dict[str, Any]:
+    pending = pending or {}
+    total, choices = tally
+    choice_data = {}
+    for choice_id, title, votes in choices:
+        choice_data[choice_id] = {
+            "title": title,
+            "votes": votes + pending.get(choice_id, 0),
+        }
+    return {
+        "question_total_votes": total + sum(pending.values()),
+        "choices_data": choice_data,
+    }
 
 
 def serialize_data_set_for_ajax_update(id: int) -> Dict[str, Any]:
@@ -28,16 +159,11 @@ def serialize_data_set_for_ajax_update(id: int) -> Dict[str, Any]:
     :param id: The ID of the Question to serialize.
     :return: A dictionary containing the updated data.
     """
-    choice_data = {}
-    question = Question.objects.get(id=id)
-    for choice in question.choice.all():
-        choice_data[choice.id] = {"title": choice.title, "votes": choice.votes}
-
-    updated_data = {
-        "question_total_votes": question.total_votes,
-        "choices_data": choice_data,
-    }
-    return updated_data
+    id = int(id)
+    if vote_buffering_enabled():
+        tally, pending = vote_buffer.merge_pending(id, lambda: _read_tally(id))
+        return _serialize_tally(tally, pending)
+    return _serialize_tally(_read_tally(id))
 
 
 def find_pattern(patt: Pattern, text: str) -> bool:
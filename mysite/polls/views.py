@@ -4,13 +4,25 @@ from django.shortcuts import render
 from django.views.generic import *
 from django.contrib.messages.views import SuccessMessageMixin
 from polls.models import Question, Choice, Tag
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotFound,
+    Http404,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from accounts.models import User
 from polls.utils import (
     update_vote_data_choice_id,
 )
 from django.contrib.auth.forms import UserCreationForm
+from django.core.handlers.asgi import ASGIRequest
 from typing import Any
+import asyncio
+import datetime
+import codecs
 import json
 from polls.forms import CreatePoll, UserGroupEdit
 from polls.constants import (
@@ -19,7 +31,43 @@ from polls.constants import (
     CREATE_POLLS_TEMPLATE,
     HOME_URL,
     POLLS_LIST_TEMPLATE,
+    VOTE_REQUEST_ERROR,
+    LIVE_TALLY_DISABLED_ERROR,
+    LIVE_TALLY_EVENT,
+    LIVE_TALLY_KEEPALIVE,
+    LIVE_TALLY_KEEPALIVE_SECONDS,
+    LIVE_TALLY_MAX_QUESTIONS,
+    LIVE_TALLY_QUESTIONS_ERROR,
+    PAGINATION_CURSOR,
+    ARCHIVE_ID_RANGE_SPREAD,
+    SEARCH_PARAM,
+    POLL_IMPORT_CONTENT_TYPE_ERROR,
+    POLL_IMPORT_CSV_TYPES,
+    POLL_IMPORT_JSON_TYPES,
+    POLL_IMPORT_JSONL_TYPES,
+)
+from django.conf import settings
+from django.urls import reverse
+from polls.live import live_tallies_enabled, tally_hub
+from polls.services import (
+    PollImportError,
+    create_poll,
+    import_polls,
+    read_csv_polls,
+    read_json_polls,
+    read_jsonl_polls,
+)
+from polls.archive import archive_month, get_archive_buckets
+from polls.search import search_questions
+from polls.summaries import get_tag_summaries
+from polls.pagination import (
+    get_question_ordering,
+    ordering_fields,
+    paginate_by_cursor,
 )
+from django.contrib.auth.decorators import permission_required
+from django.core.exceptions import ObjectDoesNotExist
+from django.views.decorators.http import require_POST
 from django.core.mail import (
     send_mail,
     send_mass_mail,
@@ -49,6 +97,9 @@ class IndexView(ListView):
     context_object_name = QUESTION_CONTEXT
     template_name = HOME_TEMPLATE
     paginate_by = 10
+    next_page_url = None
+    ordering = None
+    search_query = ""
 
     def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         return super().get(request, *args, **kwargs)
@@ -62,15 +113,79 @@ class IndexView(ListView):
         from django.db.models import Q
 
         query = Q()
-        order_by = self.request.GET.get("orderby", "-created")
+        self.ordering = get_question_ordering(self.request.GET.get("orderby"))
+        self.search_query = self.request.GET.get(SEARCH_PARAM, "").strip()
         tag = self.request.GET.get("tag", "")
         if tag:
-            query = Q(tag__title=tag)
+            # filter on tag_id so the (tag_id, created) index serves the sort
+            query = Q(
+                tag_id__in=[
+                    summary["id"]
+                    for summary in get_tag_summaries()
+                    if summary["title"] == tag
+                ]
+            )
         return (
             Question.objects.prefetch_related("choice")
             .filter(query & Q(created__lte=timezone.now()))
-            .order_by(order_by)
+            .order_by(*ordering_fields(self.ordering))
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        paginate with a keyset cursor when the ordering allows it, so deep
+        scrolling never issues OFFSET scans or COUNT(*) queries
+
+        :return: (paginator, page, object_list, is_paginated)
+        """
+        if self.search_query:
+            return self.paginate_search(queryset, page_size)
+        mode = getattr(settings, "POLLS_INDEX_PAGINATION", PAGINATION_CURSOR)
+        if mode != PAGINATION_CURSOR or self.ordering is None:
+            paginator, page, object_list, is_paginated = super().paginate_queryset(
+                queryset, page_size
+            )
+            if page.has_next():
+                self.next_page_url = self.get_page_url(page=page.next_page_number())
+            return paginator, page, object_list, is_paginated
+        page = paginate_by_cursor(
+            queryset, self.ordering, self.request.GET.get("cursor", ""), page_size
+        )
+        if page.has_next():
+            self.next_page_url = self.get_page_url(cursor=page.next_cursor)
+        return None, page, page.object_list, page.has_next()
+
+    def paginate_search(self, queryset, page_size):
+        """
+        page through ranked search results, reading one extra match to know
+        whether there is a next page instead of counting every match
+
+        :return: (paginator, page, object_list, is_paginated)
+        """
+        try:
+            number = max(int(self.request.GET.get("page", 1)), 1)
+        except ValueError:
+            number = 1
+        questions = search_questions(
+            queryset, self.search_query, page_size + 1, (number - 1) * page_size
         )
+        has_next = len(questions) > page_size
+        if has_next:
+            self.next_page_url = self.get_page_url(page=number + 1)
+        return None, None, questions[:page_size], has_next
+
+    def get_page_url(self, **params) -> str:
+        """
+        build the url of another page keeping the current filter parameters
+
+        :return: str
+        """
+        query = self.request.GET.copy()
+        for param in ("page", "cursor"):
+            query.pop(param, None)
+        for param, value in params.items():
+            query[param] = value
+        return "%s?%s" % (reverse("index"), query.urlencode())
 
     def get_template_names(self):
         if self.request.htmx:  # type: ignore
@@ -80,7 +195,10 @@ class IndexView(ListView):
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        context["tags"] = Tag.objects.all()
+        context["next_page_url"] = self.next_page_url
+        context["search_query"] = self.search_query
+        context["tags"] = get_tag_summaries()
+        context["live_tallies"] = live_tallies_enabled()
         if cache.get("key"):
             value = cache.get("key")
             print("True")
@@ -99,11 +217,91 @@ def vote(request) -> JsonResponse:
     :param request: question_id
     :return: JsonResponse
     """
-    data = json.loads(request.POST["data"])
-    updated_data = update_vote_data_choice_id(data)
+    try:
+        data = json.loads(request.POST["data"])
+        updated_data = update_vote_data_choice_id(data)
+    except (KeyError, ValueError, TypeError, ObjectDoesNotExist):
+        return JsonResponse({"error": VOTE_REQUEST_ERROR}, status=400)
+    tally_hub.publish(data["questionId"])
     return JsonResponse(updated_data)
 
 
+@require_POST
+@permission_required("polls.add_question", raise_exception=True)
+def polls_import(request) -> JsonResponse:
+    """
+    bulk import polls with their choices, streaming CSV, JSON Lines and JSON
+    array bodies into the database in chunks
+
+    :param request: CSV, JSON Lines or JSON array body
+    :return: JsonResponse
+    """
+    content_type = request.content_type
+    lines = codecs.iterdecode(request, "utf-8")
+    try:
+        if content_type in POLL_IMPORT_CSV_TYPES:
+            polls = read_csv_polls(lines)
+        elif content_type in POLL_IMPORT_JSONL_TYPES:
+            polls = read_jsonl_polls(lines)
+        elif content_type in POLL_IMPORT_JSON_TYPES:
+            polls = read_json_polls(request)
+        else:
+            return JsonResponse({"error": POLL_IMPORT_CONTENT_TYPE_ERROR}, status=415)
+        imported = import_polls(polls)
+    except PollImportError as error:
+        return JsonResponse(
+            {"error": str(error), "imported": error.imported}, status=400
+        )
+    except ValueError as error:
+        return JsonResponse({"error": str(error), "imported": 0}, status=400)
+    return JsonResponse({"imported": imported}, status=201)
+
+
+async def tally_stream(request) -> HttpResponse:
+    """
+    stream coalesced tally updates for the requested questions as server-sent events,
+    refused unless POLLS_LIVE_TALLIES is on and the request came through ASGI,
+    as a WSGI worker would be held for as long as the page is open
+
+    :param request: questions, comma separated Question ids
+    :return: StreamingHttpResponse
+    """
+    if not live_tallies_enabled() or not isinstance(request, ASGIRequest):
+        return HttpResponseNotFound(LIVE_TALLY_DISABLED_ERROR)
+    try:
+        question_ids = {
+            int(question_id)
+            for question_id in request.GET.get("questions", "").split(",")
+            if question_id
+        }
+    except ValueError:
+        question_ids = set()
+    if not question_ids or len(question_ids) > LIVE_TALLY_MAX_QUESTIONS:
+        return HttpResponseBadRequest(LIVE_TALLY_QUESTIONS_ERROR)
+
+    queue = tally_hub.subscribe(question_ids)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    question_id, tally = await asyncio.wait_for(
+                        queue.get(), LIVE_TALLY_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield LIVE_TALLY_KEEPALIVE
+                    continue
+                data = json.dumps({"question_id": question_id, **tally})
+                yield LIVE_TALLY_EVENT.format(data=data)
+        finally:
+            tally_hub.unsubscribe(queue, question_ids)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 class PollsCreate(FormView, SuccessMessageMixin):
     template_name = CREATE_POLLS_TEMPLATE
     form_class = CreatePoll
@@ -117,14 +315,8 @@ class PollsCreate(FormView, SuccessMessageMixin):
         :param form: unknown
         :return: HttpResponse
         """
-        # Save the question
-        question = form.save()
-
-        # Process choices
-        choices = self.request.POST.getlist("choices")
-        for choice_text in choices:
-            if choice_text:
-                Choice.objects.create(question=question, title=choice_text)
+        # Save the question and its choices in one transaction
+        create_poll(form.save(commit=False), self.request.POST.getlist("choices"))
         return super().form_valid(form)
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
@@ -140,14 +332,162 @@ def handler404(request, exception=None):
     return render(request, "stock/error.html", response_error)
 
 
-class QuestionYearArchiveView(YearArchiveView):
+class ArchiveBucketMixin:
+    """
+    date based archive views navigating with the precomputed ArchiveBucket
+    months instead of DISTINCT date queries over the whole table, counting
+    pages from them, and narrowing the selected months to the id range of
+    their buckets when it is dense
+    """
+
+    archive_range = (None, None)
+
+    def get_all_archive_buckets(self):
+        buckets = getattr(self, "_all_archive_buckets", None)
+        if buckets is None:
+            buckets = self._all_archive_buckets = get_archive_buckets(
+                allow_future=self.get_allow_future()
+            )
+        return buckets
+
+    def get_archive_buckets(self):
+        """
+        buckets of the months selected by the view, all of them on the index
+
+        :return: list of ArchiveBucket
+        """
+        since, until = self.archive_range
+        return [
+            bucket
+            for bucket in self.get_all_archive_buckets()
+            if (since is None or bucket.month >= archive_month(since))
+            and (until is None or bucket.month < archive_month(until))
+        ]
+
+    def get_dated_queryset(self, **lookup):
+        """
+        filter the queryset like the generic views, telling empty archives
+        from the buckets instead of an EXISTS query
+
+        :return: QuerySet
+        """
+        date_field = self.get_date_field()
+        self.archive_range = (
+            lookup.get("%s__gte" % date_field),
+            lookup.get("%s__lt" % date_field),
+        )
+        queryset = self.get_queryset().filter(**lookup)
+        buckets = self.get_archive_buckets()
+        if not buckets and not self.get_allow_empty():
+            raise Http404(
+                _("No %(verbose_name_plural)s available")
+                % {"verbose_name_plural": queryset.model._meta.verbose_name_plural}
+            )
+        if not self.get_allow_future():
+            queryset = queryset.filter(**{"%s__lte" % date_field: timezone.now()})
+        if buckets and lookup:
+            first_id = min(bucket.first_id for bucket in buckets)
+            last_id = max(bucket.last_id for bucket in buckets)
+            count = sum(bucket.question_count for bucket in buckets)
+            # ids follow creation time in practice; otherwise the range
+            # spans most of the table and would only mislead the planner
+            if last_id - first_id < count * ARCHIVE_ID_RANGE_SPREAD:
+                queryset = queryset.filter(id__gte=first_id, id__lte=last_id)
+        return queryset
+
+    def get_paginator(self, queryset, per_page, *args, **kwargs):
+        """
+        take the count from the buckets unless the current month is shown,
+        whose future questions the view hides
+
+        :return: Paginator
+        """
+        paginator = super().get_paginator(queryset, per_page, *args, **kwargs)
+        buckets = self.get_archive_buckets()
+        current = archive_month(timezone.now())
+        if buckets and (
+            self.get_allow_future() or all(bucket.month < current for bucket in buckets)
+        ):
+            paginator.count = sum(bucket.question_count for bucket in buckets)
+        return paginator
+
+    def get_date_list(self, queryset, date_type=None, ordering="ASC"):
+        """
+        list the years or months holding questions from the buckets
+
+        :return: list of date
+        """
+        if date_type is None:
+            date_type = self.get_date_list_period()
+        if date_type == "day":
+            return super().get_date_list(queryset, date_type, ordering)
+        date_list = sorted(
+            {
+                bucket.month.replace(month=1) if date_type == "year" else bucket.month
+                for bucket in self.get_archive_buckets()
+            },
+            reverse=ordering == "DESC",
+        )
+        if not date_list and not self.get_allow_empty():
+            raise Http404(
+                _("No %(verbose_name_plural)s available")
+                % {"verbose_name_plural": queryset.model._meta.verbose_name_plural}
+            )
+        return date_list
+
+    def get_adjacent_archive(self, date, period, is_previous):
+        """
+        first day of the closest year or month holding questions before or
+        after the one of ``date``
+
+        :return: date or None
+        """
+        start = datetime.date(date.year, 1 if period == "year" else date.month, 1)
+        months = [bucket.month for bucket in self.get_all_archive_buckets()]
+        if is_previous:
+            months = [month for month in months if month < start]
+            month = months[-1] if months else None
+        else:
+            if period == "year":
+                start = start.replace(year=start.year + 1)
+            elif start.month == 12:
+                start = start.replace(year=start.year + 1, month=1)
+            else:
+                start = start.replace(month=start.month + 1)
+            months = [month for month in months if month >= start]
+            month = months[0] if months else None
+        if month is None or period == "month":
+            return month
+        return month.replace(month=1)
+
+    def get_next_year(self, date):
+        return self.get_adjacent_archive(date, "year", is_previous=False)
+
+    def get_previous_year(self, date):
+        return self.get_adjacent_archive(date, "year", is_previous=True)
+
+    def get_next_month(self, date):
+        return self.get_adjacent_archive(date, "month", is_previous=False)
+
+    def get_previous_month(self, date):
+        return self.get_adjacent_archive(date, "month", is_previous=True)
+
+
+class QuestionArchiveIndexView(ArchiveBucketMixin, ArchiveIndexView):
+    model = Question
+    date_field = "created"
+    paginate_by = 100
+    context_object_name = "latest"
+
+
+class QuestionYearArchiveView(ArchiveBucketMixin, YearArchiveView):
     queryset = Question.objects.all()
     date_field = "created"
     make_object_list = True
     paginate_by = 10
 
 
-class QuestionMonthArchiveView(MonthArchiveView):
+class QuestionMonthArchiveView(ArchiveBucketMixin, MonthArchiveView):
     queryset = Question.objects.all()
     date_field = "created"
     paginate_by = 10
@@ -160,6 +500,21 @@ class PollsUsers(ListView, FormView):
     form_class = UserGroupEdit
     success_url = "/polls/users"
 
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related("groups")
+
+    def get_form(self, form_class=None):
+        """
+        the form is rendered once per listed user, so read the group choices
+        once instead of on every render
+
+        :return: UserGroupEdit
+        """
+        form = super().get_form(form_class)
+        # iterate, as list() would first COUNT the groups for a length hint
+        form.fields["groups"].choices = list(iter(form.fields["groups"].choices))
+        return form
+
     def form_valid(self, form):
         id = self.request.POST.get("id")
         user = User.objects.get(id=id)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import atexit
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Tuple, TypeVar
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from polls.constants import VOTE_BUFFER_FLUSH_INTERVAL, VOTE_BUFFER_MAX_PENDING
+from polls.counters import grouped_increment
+from polls.models import Choice, Question
+from polls.summaries import votes_added
+
+T = TypeVar("T")
+
+
+class VoteBuffer:
+    """
+    Write-behind buffer for poll votes.
+
+    Votes are counted in memory per question and choice, then applied with one
+    grouped ``UPDATE`` on ``polls_choice`` and one on ``polls_question`` when
+    ``max_pending`` votes are waiting or ``flush_interval`` seconds have passed.
+    Pending votes are flushed on interpreter shutdown and kept in memory if a
+    flush fails, so a graceful stop never drops votes.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = VOTE_BUFFER_FLUSH_INTERVAL,
+        max_pending: int = VOTE_BUFFER_MAX_PENDING,
+    ):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, Counter] = defaultdict(Counter)
+        self._pending_count = 0
+        self._timer = None
+        self._atexit_registered = False
+
+    @classmethod
+    def from_settings(cls) -> "VoteBuffer":
+        options = getattr(settings, "POLLS_VOTE_BUFFER", {})
+        return cls(
+            flush_interval=options.get("FLUSH_INTERVAL", VOTE_BUFFER_FLUSH_INTERVAL),
+            max_pending=options.get("MAX_PENDING", VOTE_BUFFER_MAX_PENDING),
+        )
+
+    def add(self, question_id: int, choice_id: int) -> None:
+        """
+        Record one vote, flushing right away once the size threshold is hit.
+
+        :param question_id: The ID of the voted Question.
+        :param choice_id: The ID of the voted Choice.
+        """
+        with self._lock:
+            self._pending[question_id][choice_id] += 1
+            self._pending_count += 1
+            full = self._pending_count >= self.max_pending
+            if not full:
+                self._schedule()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Apply every pending vote to the database in one transaction.
+
+        :return: The number of votes written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._cancel_timer()
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, defaultdict(Counter)
+                written, self._pending_count = self._pending_count, 0
+            try:
+                self._write(batch)
+            except Exception:
+                with self._lock:
+                    for question_id, choices in batch.items():
+                        self._pending[question_id].update(choices)
+                    self._pending_count += written
+                    self._schedule()
+                raise
+            return written
+
+    def pending_for_question(self, question_id: int) -> Counter:
+        """
+        Votes for a question that are not yet visible in the database.
+
+        :param question_id: The ID of the Question.
+        :return: Counter of choice id to pending votes.
+        """
+        with self._lock:
+            return Counter(self._pending.get(question_id, ()))
+
+    def merge_pending(
+        self, question_id: int, read: Callable[[], T]
+    ) -> Tuple[T, Counter]:
+        """
+        Run ``read`` and return its result together with the votes for the
+        question that it could not see yet.
+
+        No flush can commit while ``read`` runs, so every vote is counted
+        exactly once: either in the database state or in the returned deltas.
+
+        :param question_id: The ID of the Question being read.
+        :param read: Callable performing the database read.
+        :return: Tuple of the read result and a Counter of pending votes.
+        """
+        with self._flush_lock:
+            result = read()
+            return result, self.pending_for_question(question_id)
+
+    def _write(self, batch: Dict[int, Counter]) -> None:
+        choice_deltas = Counter()
+        question_deltas = {}
+        for question_id, choices in batch.items():
+            choice_deltas.update(choices)
+            question_deltas[question_id] = sum(choices.values())
+        with transaction.atomic():
+            grouped_increment(Choice, "votes", choice_deltas)
+            grouped_increment(Question, "total_votes", question_deltas)
+            votes_added(question_deltas)
+
+    def _schedule(self) -> None:
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+vote_buffer = VoteBuffer.from_settings()
@@ -2,7 +2,8 @@ function submitFilterPollsForm(event) {
   event.preventDefault();
   let orderby = $("#polls-orderby").val();
   let tag = $("#polls-tag").val();
+  let query = encodeURIComponent($("#polls-search").val());
 
-  let updatedPath = `?orderby=${orderby}&tag=${tag}`;
+  let updatedPath = `?orderby=${orderby}&tag=${tag}&q=${query}`;
   window.location.href = updatedPath;
 }
@@ -0,0 +1,30 @@
+/* Live Poll Tallies */
+const LIVE_TALLY_MAX_QUESTIONS = 200;
+let liveTallySource = null;
+
+function updateTally(tally) {
+  for (const choice in tally.choices_data) {
+    const elem = document.getElementById(`${choice}`);
+    if (!elem) continue;
+    elem.setAttribute("value", tally.choices_data[choice]["votes"]);
+    elem.setAttribute("max", tally.question_total_votes);
+  }
+}
+
+function subscribeLiveTallies() {
+  const cards = document.querySelectorAll("[data-live-tally]");
+  if (!cards.length || !window.EventSource) return;
+  const ids = Array.from(cards)
+    .map((card) => card.dataset.questionId)
+    .slice(-LIVE_TALLY_MAX_QUESTIONS);
+  if (liveTallySource) liveTallySource.close();
+  liveTallySource = new EventSource(
+    `${cards[0].dataset.liveTally}?questions=${ids.join(",")}`
+  );
+  liveTallySource.addEventListener("tally", (event) => {
+    updateTally(JSON.parse(event.data));
+  });
+}
+
+$(document).ready(subscribeLiveTallies);
+document.addEventListener("htmx:afterSettle", subscribeLiveTallies);